@@ -0,0 +1,239 @@
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import date, timedelta
+import re
+import unicodedata
+
+# Verbos que piden reservar explícitamente; "cita" o "quiero" por sí solos también aparecen en consultas
+PALABRAS_RESERVA = re.compile(
+    r"\b(agend\w*|reserv\w*|separ\w*|apart\w*|"
+    r"(?:quiero|quisiera|necesito|deseo) (?:sacar |pedir )?(?:una |otra )?cita|(?:sacar|pedir) (?:una )?cita)\b"
+)
+# Preguntan por disponibilidad en lugar de pedir la cita: las responde el agente sin agendar
+PALABRAS_PREGUNTA = re.compile(r"\b(hay|tiene|tienen|libre|libres|disponible|disponibles|atiende|atienden|saber|pregunt\w*)\b")
+# Cualquiera de estas palabras indica otra intención (cancelar, mover, consultar) y la decide el agente
+PALABRAS_EXCLUIDAS = re.compile(
+    r"\b(cancel\w*|anul\w*|reprogram\w*|cambi\w*|mover|muev\w*|modific\w*|no|sugerencias?|"
+    r"opciones|horarios|disponibilidad|minutos|hora y media|dos horas|procedimiento|o)\b"
+)
+# Piden cambiar algo, dependen de una duración o dejan abierta la elección: la respuesta no se reutiliza
+PALABRAS_OTRA_INTENCION = re.compile(
+    r"\b(cancel\w*|anul\w*|reprogram\w*|cambi\w*|mover|muev\w*|modific\w*|no|"
+    r"minutos|hora y media|dos horas|procedimiento|o)\b"
+)
+# Palabras que presentan al profesional en el mensaje
+TRATAMIENTOS = {"doctor", "doctora", "dr", "dra", "medico", "medica", "profesional"}
+
+MESES = {
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6, "julio": 7,
+    "agosto": 8, "septiembre": 9, "setiembre": 9, "octubre": 10, "noviembre": 11, "diciembre": 12
+}
+DIAS_SEMANA = {"lunes": 0, "martes": 1, "miercoles": 2, "jueves": 3, "viernes": 4, "sabado": 5, "domingo": 6}
+
+_FECHA_ISO = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+_FECHA_BARRAS = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2}|\d{4}))?\b")
+_FECHA_TEXTO = re.compile(r"\b(\d{1,2}) de (" + "|".join(MESES) + r")(?: de(?:l)? (\d{4}))?\b")
+_DIA_SEMANA = re.compile(r"\b(" + "|".join(DIAS_SEMANA) + r")\b")
+_MANANA_FECHA = re.compile(r"(?<!la )(?<!pasado )\bmanana\b")
+
+_MERIDIANO = r"(am|a m|pm|p m|de la manana|de la tarde|de la noche|en la manana|en la tarde|por la manana|por la tarde)"
+_HORA_MINUTOS = re.compile(r"\b(\d{1,2}):(\d{2})\s*" + _MERIDIANO + r"?")
+_HORA_A_LAS = re.compile(r"\b(?:a las|a la|las) (\d{1,2})(?: y (media|cuarto))?\s*" + _MERIDIANO + r"?")
+_HORA_SUELTA = re.compile(r"\b(\d{1,2})\s*(am|a m|pm|p m)\b")
+
+
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas, sin tildes y con la puntuación (salvo : / -) convertida en espacios"""
+    sin_tildes = "".join(
+        caracter for caracter in unicodedata.normalize("NFD", texto.lower())
+        if unicodedata.category(caracter) != "Mn"
+    )
+    sin_tildes = re.sub(r"[^\w:/\-]+", " ", sin_tildes)
+    # "a.m." y "p.m." quedan como "a m" / "p m"
+    return re.sub(r"\s+", " ", sin_tildes).strip()
+
+
+class IntencionReserva:
+    """Profesional, fecha y hora extraídos sin ambigüedad de un mensaje de reserva"""
+
+    def __init__(self, profesional: Dict[str, Any], fecha: date, hora: str):
+        self.profesional = profesional
+        self.fecha = fecha
+        self.hora = hora
+
+
+def _fecha_valida(anio: int, mes: int, dia: int) -> Optional[date]:
+    try:
+        return date(anio, mes, dia)
+    except ValueError:
+        return None
+
+
+def _proxima_ocurrencia(hoy: date, mes: int, dia: int) -> Optional[date]:
+    """Fecha sin año: la de este año, o la del siguiente si ya pasó"""
+    fecha = _fecha_valida(hoy.year, mes, dia)
+    if fecha and fecha < hoy:
+        fecha = _fecha_valida(hoy.year + 1, mes, dia)
+    return fecha
+
+
+def extraer_fechas(texto: str, hoy: date) -> List[date]:
+    """Todas las fechas mencionadas en un texto normalizado (relativas a `hoy`)"""
+    fechas = []
+    for anio, mes, dia in _FECHA_ISO.findall(texto):
+        fechas.append(_fecha_valida(int(anio), int(mes), int(dia)))
+    sin_iso = _FECHA_ISO.sub(" ", texto)
+    for dia, mes, anio in _FECHA_BARRAS.findall(sin_iso):
+        if anio:
+            anio = int(anio) + (2000 if len(anio) == 2 else 0)
+            fechas.append(_fecha_valida(anio, int(mes), int(dia)))
+        else:
+            fechas.append(_proxima_ocurrencia(hoy, int(mes), int(dia)))
+    for dia, mes, anio in _FECHA_TEXTO.findall(texto):
+        if anio:
+            fechas.append(_fecha_valida(int(anio), MESES[mes], int(dia)))
+        else:
+            fechas.append(_proxima_ocurrencia(hoy, MESES[mes], int(dia)))
+    if "pasado manana" in texto:
+        fechas.append(hoy + timedelta(days=2))
+    if _MANANA_FECHA.search(texto):
+        fechas.append(hoy + timedelta(days=1))
+    if re.search(r"\bhoy\b", texto):
+        fechas.append(hoy)
+    for nombre in _DIA_SEMANA.findall(texto):
+        # "el lunes" dicho un lunes se refiere al de la semana siguiente
+        dias = (DIAS_SEMANA[nombre] - hoy.weekday()) % 7 or 7
+        fechas.append(hoy + timedelta(days=dias))
+    return fechas
+
+
+def _ajustar_meridiano(hora: int, meridiano: str) -> Optional[int]:
+    """Hora en formato 24h, o None si es ambigua (1 a 7 sin indicar mañana o tarde, o las 12 de la noche)"""
+    if hora == 12 and meridiano.endswith("noche"):
+        # "12 de la noche" es la medianoche, pero no queda claro de qué día
+        return None
+    if meridiano in ("pm", "p m") or meridiano.endswith("tarde") or meridiano.endswith("noche"):
+        return hora + 12 if hora < 12 else hora
+    if meridiano:
+        return 0 if hora == 12 and meridiano in ("am", "a m") else hora
+    if 1 <= hora <= 7:
+        return None
+    return hora
+
+
+def extraer_horas(texto: str) -> List[Optional[str]]:
+    """Horas HH:MM mencionadas en un texto normalizado; None para las que son ambiguas"""
+    horas = []
+    for hora, minutos, meridiano in _HORA_MINUTOS.findall(texto):
+        hora = _ajustar_meridiano(int(hora), meridiano)
+        horas.append(f"{hora:02d}:{int(minutos):02d}" if hora is not None and hora < 24 and int(minutos) < 60 else None)
+    sin_minutos = _HORA_MINUTOS.sub(" ", texto)
+    for hora, fraccion, meridiano in _HORA_A_LAS.findall(sin_minutos):
+        hora = _ajustar_meridiano(int(hora), meridiano)
+        minutos = {"media": 30, "cuarto": 15}.get(fraccion, 0)
+        horas.append(f"{hora:02d}:{minutos:02d}" if hora is not None and hora < 24 else None)
+    for hora, meridiano in _HORA_SUELTA.findall(_HORA_A_LAS.sub(" ", sin_minutos)):
+        hora = _ajustar_meridiano(int(hora), meridiano)
+        horas.append(f"{hora:02d}:00" if hora is not None and hora < 24 else None)
+    if re.search(r"\b(mediodia|medio dia)\b", texto):
+        horas.append("12:00")
+    return horas
+
+
+def _tokens_nombre(profesional: Dict[str, Any]) -> Tuple[set, set]:
+    nombres = {token for token in normalizar_texto(profesional.get('nombre') or "").split() if len(token) >= 3}
+    apellidos = {token for token in normalizar_texto(profesional.get('apellido') or "").split() if len(token) >= 3}
+    return nombres, apellidos
+
+
+def buscar_profesionales_mencionados(texto: str, profesionales: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Profesionales cuyo nombre o apellido aparece en el texto normalizado, quedándose solo con los
+    de mayor coincidencia. El apellido pesa más que el nombre; más de uno significa ambigüedad.
+    """
+    palabras = set(texto.split())
+    mejores = []
+    mejor_puntaje = 0
+    for profesional in profesionales:
+        nombres, apellidos = _tokens_nombre(profesional)
+        coincide_apellido = len(apellidos & palabras)
+        coincide_nombre = len(nombres & palabras)
+        puntaje = coincide_apellido * 2 + coincide_nombre
+        if not puntaje:
+            continue
+        if puntaje > mejor_puntaje:
+            mejores, mejor_puntaje = [profesional], puntaje
+        elif puntaje == mejor_puntaje:
+            mejores.append(profesional)
+    return mejores
+
+
+def _extraer_intencion(texto: str, profesionales: List[Dict[str, Any]], hoy: date, profesional_previo: Optional[Dict[str, Any]] = None, fecha_previa: Optional[date] = None) -> Optional[IntencionReserva]:
+    fechas = set(extraer_fechas(texto, hoy))
+    if not fechas and fecha_previa:
+        fechas = {fecha_previa}
+    if len(fechas) != 1 or None in fechas:
+        return None
+    fecha = fechas.pop()
+    if fecha < hoy:
+        return None
+
+    horas = set(extraer_horas(texto))
+    if len(horas) != 1 or None in horas:
+        return None
+
+    candidatos = buscar_profesionales_mencionados(texto, profesionales)
+    if not candidatos and profesional_previo:
+        candidatos = [profesional_previo]
+    if len(candidatos) != 1:
+        return None
+
+    return IntencionReserva(candidatos[0], fecha, horas.pop())
+
+
+def es_pregunta(mensaje: str) -> bool:
+    """El mensaje pregunta (signos de interrogación o palabras de consulta) en lugar de pedir la cita"""
+    return "?" in mensaje or "¿" in mensaje or bool(PALABRAS_PREGUNTA.search(normalizar_texto(mensaje)))
+
+
+def pide_reserva(mensaje: str) -> bool:
+    """El mensaje pide agendar de forma explícita y no es una pregunta"""
+    return bool(PALABRAS_RESERVA.search(normalizar_texto(mensaje))) and not es_pregunta(mensaje)
+
+
+def interpretar_solicitud(mensaje: str, profesionales: List[Dict[str, Any]], hoy: date) -> Optional[IntencionReserva]:
+    """
+    Extraer profesional, fecha y hora de un mensaje de reserva. Devuelve None si falta alguno,
+    si hay más de un candidato para cualquiera de ellos o si el mensaje pregunta o pide otra cosa.
+    """
+    texto = normalizar_texto(mensaje)
+    if not pide_reserva(mensaje) or PALABRAS_EXCLUIDAS.search(texto):
+        return None
+    if not TRATAMIENTOS & set(texto.split()):
+        return None
+
+    return _extraer_intencion(texto, profesionales, hoy)
+
+
+def interpretar_consulta(mensaje: str, profesionales: List[Dict[str, Any]], hoy: date) -> Optional[IntencionReserva]:
+    """
+    Profesional, fecha y hora de una consulta de disponibilidad o de reserva, sin importar cómo esté
+    redactada. Devuelve None si el mensaje pide cancelar o cambiar algo o si alguno es ambiguo.
+    """
+    texto = normalizar_texto(mensaje)
+    if PALABRAS_OTRA_INTENCION.search(texto):
+        return None
+    return _extraer_intencion(texto, profesionales, hoy)
+
+
+def interpretar_seguimiento(mensaje: str, profesionales: List[Dict[str, Any]], hoy: date, profesional: Dict[str, Any], fecha: date, reserva_previa: bool = False) -> Optional[IntencionReserva]:
+    """
+    Mensaje que continúa una reserva de la sesión ("entonces a las 11"): la hora debe venir en el mensaje,
+    el profesional y la fecha se toman de la sesión si no los menciona. Solo vale si el mensaje pide agendar
+    o si el turno anterior ya era un intento de reserva. None si pregunta, pide otra cosa o es ambiguo.
+    """
+    texto = normalizar_texto(mensaje)
+    if es_pregunta(mensaje) or PALABRAS_EXCLUIDAS.search(texto):
+        return None
+    if not reserva_previa and not PALABRAS_RESERVA.search(texto):
+        return None
+    return _extraer_intencion(texto, profesionales, hoy, profesional, fecha)
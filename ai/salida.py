@@ -0,0 +1,58 @@
+from typing import Any, Dict, Iterator, Optional
+from pydantic import ValidationError
+from schemas.iaasistente_sch import AssistantResponse
+from utils.extraccion_json import objetos_json
+import json
+
+# Decodificar y validar con pydantic es caro; antes se descartan los objetos a los que les falta algún campo
+_CAMPOS_REQUERIDOS = {nombre for nombre, campo in AssistantResponse.model_fields.items() if campo.is_required()}
+_CLAVES_REQUERIDAS = [f'"{nombre}"' for nombre in _CAMPOS_REQUERIDOS]
+
+
+def _diccionarios(datos: Any) -> Iterator[Dict[str, Any]]:
+    """El objeto y los objetos anidados en él, por si el LLM envolvió la respuesta ({"respuesta": {...}})"""
+    if isinstance(datos, dict):
+        yield datos
+        for valor in datos.values():
+            yield from _diccionarios(valor)
+    elif isinstance(datos, list):
+        for valor in datos:
+            yield from _diccionarios(valor)
+
+
+def extraer_respuesta(texto: str) -> Optional[AssistantResponse]:
+    """
+    La última respuesta válida según AssistantResponse entre los objetos JSON del texto (la respuesta
+    final va después de las observaciones de las herramientas). None si ninguno es válido.
+    """
+    respuesta = None
+    for fragmento in objetos_json(texto):
+        if not all(clave in fragmento for clave in _CLAVES_REQUERIDAS):
+            continue
+        try:
+            datos = json.loads(fragmento)
+        except ValueError:
+            continue
+        for objeto in _diccionarios(datos):
+            if not _CAMPOS_REQUERIDOS <= objeto.keys():
+                continue
+            try:
+                respuesta = AssistantResponse(**objeto)
+            except (ValidationError, TypeError):
+                continue
+    return respuesta
+
+
+def extraer_respuesta_parcial(texto: str) -> Optional[Dict[str, Any]]:
+    """El último objeto JSON que trae al menos uno de los campos de la respuesta, aunque le falten otros"""
+    campos = set(AssistantResponse.model_fields)
+    parcial = None
+    for fragmento in objetos_json(texto):
+        try:
+            datos = json.loads(fragmento)
+        except ValueError:
+            continue
+        if isinstance(datos, dict) and campos & datos.keys():
+            parcial = datos
+    return parcial
+
@@ -1,16 +1,152 @@
 from crewai.tools import BaseTool
-from typing import Type, Dict, Any, List
+from typing import Type, Dict, Any, List, Callable, Optional, Tuple
+from contextvars import ContextVar
+from functools import wraps, lru_cache
 from pydantic import BaseModel, Field
+from fastapi import HTTPException
 import logging
 from repositories.medicos_rep import RepositorioMedicos
-from services.disponibilidad_srv import ServicioDisponibilidad
+from services.disponibilidad_srv import ServicioDisponibilidad, invalidar_disponibilidad
+from services.profesionales_srv import buscar_profesionales
 from repositories.citas_rep import RepositorioCitas
 from repositories.pacientes_rep import RepositorioPacientes
 from schemas.citas_sch import CitaCrear
-from datetime import datetime
+from datetime import datetime, timedelta
+import time
 
 logger = logging.getLogger(__name__)
 
+# Receptor de eventos de la ejecución actual del asistente (modo trabajo); None si nadie escucha
+receptor_eventos: ContextVar[Optional[Callable[[str, Dict[str, Any]], None]]] = ContextVar("receptor_eventos", default=None)
+
+def emitir_evento(tipo: str, datos: Dict[str, Any]):
+    receptor = receptor_eventos.get()
+    if receptor is None:
+        return
+    try:
+        receptor(tipo, datos)
+    except Exception as e:
+        logger.warning(f"Error emitiendo evento {tipo}: {e}")
+
+# Repositorios y servicio compartidos por todas las herramientas (el cliente de Supabase ya es único por proceso)
+@lru_cache(maxsize=None)
+def obtener_repositorio_medicos() -> RepositorioMedicos:
+    return RepositorioMedicos()
+
+@lru_cache(maxsize=None)
+def obtener_repositorio_citas() -> RepositorioCitas:
+    return RepositorioCitas()
+
+@lru_cache(maxsize=None)
+def obtener_repositorio_pacientes() -> RepositorioPacientes:
+    return RepositorioPacientes()
+
+@lru_cache(maxsize=None)
+def obtener_servicio_disponibilidad() -> ServicioDisponibilidad:
+    return ServicioDisponibilidad(obtener_repositorio_citas(), obtener_repositorio_medicos())
+
+# Profesionales activos leídos una sola vez para todo un lote de solicitudes; None fuera de un lote
+profesionales_compartidos: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("profesionales_compartidos", default=None)
+
+# Coincidencias que devuelve buscar_profesional_por_nombre
+LIMITE_BUSQUEDA_PROFESIONAL = 5
+
+def obtener_profesionales_activos() -> List[Dict[str, Any]]:
+    """Profesionales activos; dentro de un lote se reutiliza la lista ya leída en lugar de consultar Supabase"""
+    compartidos = profesionales_compartidos.get()
+    if compartidos is not None:
+        return compartidos
+    return obtener_repositorio_medicos().obtener_profesionales_activos()
+
+def con_eventos(metodo):
+    """Emitir herramienta_iniciada / herramienta_finalizada alrededor del _run de una herramienta"""
+    @wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        if receptor_eventos.get() is None:
+            return metodo(self, *args, **kwargs)
+        emitir_evento("herramienta_iniciada", {"herramienta": self.name, "argumentos": kwargs})
+        inicio = time.perf_counter()
+        resultado = metodo(self, *args, **kwargs)
+        emitir_evento("herramienta_finalizada", {
+            "herramienta": self.name,
+            "duracion_segundos": round(time.perf_counter() - inicio, 4),
+            "error": isinstance(resultado, dict) and bool(resultado.get('error'))
+        })
+        return resultado
+    return envoltura
+
+class MemoEjecucion:
+    """
+    Resultados de las herramientas de lectura dentro de una ejecución del crew, por nombre y argumentos.
+    Las herramientas que escriben lo vacían para que las lecturas siguientes vean el cambio.
+    """
+
+    def __init__(self):
+        self._resultados: Dict[Any, Any] = {}
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def obtener(self, clave) -> Tuple[bool, Any]:
+        if clave in self._resultados:
+            self.aciertos += 1
+            return True, self._resultados[clave]
+        self.fallos += 1
+        return False, None
+
+    def guardar(self, clave, resultado: Any):
+        self._resultados[clave] = resultado
+
+    def invalidar(self):
+        self._resultados.clear()
+        self.invalidaciones += 1
+
+    def estadisticas(self) -> Dict[str, Any]:
+        consultas = self.aciertos + self.fallos
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "invalidaciones": self.invalidaciones,
+            "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else 0.0
+        }
+
+# Memo de la ejecución actual del asistente; None fuera de una ejecución (las herramientas no memorizan)
+memo_ejecucion: ContextVar[Optional[MemoEjecucion]] = ContextVar("memo_ejecucion", default=None)
+
+def memorizado(metodo):
+    """Reutilizar el resultado de una herramienta de lectura llamada con los mismos argumentos en la misma ejecución"""
+    @wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        memo = memo_ejecucion.get()
+        if memo is None:
+            return metodo(self, *args, **kwargs)
+        clave = (self.name, args, tuple(sorted(kwargs.items())))
+        try:
+            encontrado, resultado = memo.obtener(clave)
+        except TypeError:
+            # Argumentos no hashables: no se memoriza
+            return metodo(self, *args, **kwargs)
+        if encontrado:
+            return resultado
+        resultado = metodo(self, *args, **kwargs)
+        # Los errores pueden ser transitorios: se vuelven a intentar
+        if not (isinstance(resultado, dict) and resultado.get('error')):
+            memo.guardar(clave, resultado)
+        return resultado
+    return envoltura
+
+def invalida_memo(metodo):
+    """Vaciar el memo de la ejecución después de una herramienta que escribe (aunque falle: pudo escribir a medias)"""
+    @wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        try:
+            return metodo(self, *args, **kwargs)
+        finally:
+            memo = memo_ejecucion.get()
+            if memo is not None:
+                memo.invalidar()
+    return envoltura
+
 class BuscarProfesionalInput(BaseModel):
     nombre: str = Field(..., description="Nombre o apellido del profesional a buscar")
 
@@ -19,24 +155,13 @@ class BuscarProfesionalTool(BaseTool):
     description: str = "Buscar un profesional médico por su nombre o apellido"
     args_schema: Type[BaseModel] = BuscarProfesionalInput
 
+    @con_eventos
+    @memorizado
     def _run(self, nombre: str) -> List[Dict[str, Any]]:
         try:
-            repositorio = RepositorioMedicos()
-            profesionales = repositorio.obtener_profesionales_activos()
-            resultados = []
-            
-            for profesional in profesionales:
-                nombre_completo = f"{profesional['nombre']} {profesional['apellido']}".lower()
-                if nombre.lower() in nombre_completo:
-                    resultados.append({
-                        'id': profesional['id'],
-                        'nombre_completo': f"{profesional['nombre']} {profesional['apellido']}",
-                        'especialidad': profesional['especialidad'],
-                        'email': profesional['email'],
-                        'telefono': profesional['telefono']
-                    })
-            
-            return resultados if resultados else [{'ERROR': 'ERROR No se encontraron profesionales con ese nombre'}]
+            # Índice en memoria: sin distinguir tildes, tolera errores de tipeo y ordena por parecido
+            resultados = buscar_profesionales(nombre, LIMITE_BUSQUEDA_PROFESIONAL, obtener_profesionales_activos)
+            return [r.model_dump() for r in resultados] if resultados else [{'ERROR': 'ERROR No se encontraron profesionales con ese nombre'}]
         except Exception as e:
             logger.error(f"Error buscando profesional por nombre {nombre}: {e}")
             return [{'ERROR': 'ERROR No se encontraron profesionales con ese nombre'}]
@@ -45,10 +170,11 @@ class ObtenerProfesionalesTool(BaseTool):
     name: str = "obtener_profesionales_activos"
     description: str = "Obtener lista de todos los profesionales médicos activos"
 
+    @con_eventos
+    @memorizado
     def _run(self) -> List[Dict[str, Any]]:
         try:
-            repositorio = RepositorioMedicos()
-            profesionales = repositorio.obtener_profesionales_activos()
+            profesionales = obtener_profesionales_activos()
             return [{
                 'id': p['id'],
                 'nombre_completo': f"{p['nombre']} {p['apellido']}",
@@ -69,78 +195,252 @@ class ObtenerHorariosTool(BaseTool):
     description: str = "Obtener horarios disponibles de un profesional en una fecha específica"
     args_schema: Type[BaseModel] = ObtenerHorariosInput
 
+    @con_eventos
+    @memorizado
     def _run(self, profesional_id: int, fecha: str) -> Dict[str, Any]:
         try:
-            repositorio_citas = RepositorioCitas()
-            repositorio_profesionales = RepositorioMedicos()
-            servicio_disponibilidad = ServicioDisponibilidad(repositorio_citas, repositorio_profesionales)
+            servicio_disponibilidad = obtener_servicio_disponibilidad()
             
             # Convertir fecha string a date object
             fecha_obj = datetime.strptime(fecha, "%Y-%m-%d").date()
-            from datetime import timedelta
-            fecha_fin = fecha_obj + timedelta(days=1)
-            
-            disponibilidad = servicio_disponibilidad.obtener_horarios_disponibles(
-                profesional_id, fecha_obj, fecha_fin
-            )
             
-            # Filtrar solo los horarios disponibles para la fecha específica
-            horarios_disponibles_fecha = [
-                horario for horario in disponibilidad.horarios_disponibles 
-                if horario.fecha == fecha_obj and horario.disponible
-            ]
+            # Solo los horarios libres de la fecha, leídos directamente de la máscara de ocupación
+            disponibilidad = servicio_disponibilidad.obtener_horarios_libres_dia(profesional_id, fecha_obj)
+            profesional = disponibilidad['profesional']
             
             return {
                 'profesional_id': profesional_id,
-                'nombre_profesional': disponibilidad.nombre_profesional,
+                'nombre_profesional': f"{profesional['nombre']} {profesional['apellido']}",
                 'fecha': fecha,
                 'horarios_disponibles': [
                     {
+                        'hora_inicio': hora_inicio,
+                        'hora_fin': hora_fin
+                    } for hora_inicio, hora_fin in disponibilidad['horarios']
+                ],
+                'total_disponibles': len(disponibilidad['horarios'])
+            }
+        except Exception as e:
+            logger.error(f"Error obteniendo horarios disponibles: {e}")
+            return {'error': str(e)}
+
+class BuscarProximosHorariosInput(BaseModel):
+    profesional_id: int = Field(..., description="ID del profesional")
+    fecha: str = Field("", description="Fecha de referencia en formato YYYY-MM-DD (opcional)")
+    hora: str = Field("", description="Hora de referencia en formato HH:MM (opcional)")
+    cantidad: int = Field(5, description="Cantidad de horarios libres a devolver")
+
+class BuscarProximosHorariosTool(BaseTool):
+    name: str = "buscar_proximos_horarios_libres"
+    description: str = (
+        "Obtener en una sola llamada los próximos horarios libres de un profesional. "
+        "Si se indica fecha (y opcionalmente hora), devuelve los más cercanos a esa fecha; "
+        "si no, los siguientes a partir de ahora"
+    )
+    args_schema: Type[BaseModel] = BuscarProximosHorariosInput
+
+    @con_eventos
+    @memorizado
+    def _run(self, profesional_id: int, fecha: str = "", hora: str = "", cantidad: int = 5) -> Dict[str, Any]:
+        try:
+            servicio_disponibilidad = obtener_servicio_disponibilidad()
+            
+            alrededor_de = None
+            if fecha:
+                alrededor_de = datetime.strptime(f"{fecha} {hora or '00:00'}", "%Y-%m-%d %H:%M")
+            
+            resultado = servicio_disponibilidad.buscar_proximos_horarios(
+                profesional_id, cantidad, alrededor_de=alrededor_de
+            )
+            
+            return {
+                'profesional_id': profesional_id,
+                'nombre_profesional': resultado.nombre_profesional,
+                'horarios_disponibles': [
+                    {
+                        'fecha': horario.fecha.isoformat(),
                         'hora_inicio': horario.hora_inicio,
                         'hora_fin': horario.hora_fin
-                    } for horario in horarios_disponibles_fecha
+                    } for horario in resultado.horarios
                 ],
-                'total_disponibles': len(horarios_disponibles_fecha)
+                'total_disponibles': resultado.total_encontrados
             }
         except Exception as e:
-            logger.error(f"Error obteniendo horarios disponibles: {e}")
+            logger.error(f"Error buscando próximos horarios libres: {e}")
+            return {'error': str(e)}
+
+class SugerirHorariosInput(BaseModel):
+    fecha: str = Field(..., description="Fecha solicitada en formato YYYY-MM-DD")
+    hora: str = Field(..., description="Hora solicitada en formato HH:MM")
+    profesional_id: int = Field(0, description="ID del profesional solicitado (0 si no se pidió ninguno)")
+    cantidad: int = Field(5, description="Cantidad de sugerencias a devolver")
+
+class SugerirHorariosTool(BaseTool):
+    name: str = "sugerir_horarios_alternativos"
+    description: str = (
+        "Obtener en una sola llamada las sugerencias cuando la hora solicitada no está disponible: "
+        "los horarios libres más cercanos a la fecha y hora pedidas, primero del profesional solicitado "
+        "y luego de otros profesionales de la misma especialidad, ya ordenados y con el texto listo para el mensaje"
+    )
+    args_schema: Type[BaseModel] = SugerirHorariosInput
+
+    @con_eventos
+    @memorizado
+    def _run(self, fecha: str, hora: str, profesional_id: int = 0, cantidad: int = 5) -> Dict[str, Any]:
+        try:
+            servicio_disponibilidad = obtener_servicio_disponibilidad()
+            
+            fecha_obj = datetime.strptime(fecha, "%Y-%m-%d").date()
+            resultado = servicio_disponibilidad.sugerir_horarios(fecha_obj, hora, profesional_id or None, cantidad)
+            
+            return {
+                'sugerencias': [
+                    {
+                        'fecha': sugerencia.fecha.isoformat(),
+                        'hora_inicio': sugerencia.hora_inicio,
+                        'profesional_id': sugerencia.profesional_id,
+                        'nombre_profesional': sugerencia.nombre_profesional
+                    } for sugerencia in resultado.sugerencias
+                ],
+                'texto_sugerencias': "\n".join(
+                    f"{i}) {sugerencia.fecha.isoformat()} {sugerencia.hora_inicio} — Dr. {sugerencia.nombre_profesional} (ID: {sugerencia.profesional_id})"
+                    for i, sugerencia in enumerate(resultado.sugerencias, start=1)
+                ),
+                'total_sugerencias': resultado.total_sugerencias
+            }
+        except HTTPException as e:
+            return {'error': e.detail}
+        except Exception as e:
+            logger.error(f"Error sugiriendo horarios alternativos: {e}")
+            return {'error': str(e)}
+
+class BuscarBloquesLibresInput(BaseModel):
+    profesional_id: int = Field(..., description="ID del profesional")
+    fecha: str = Field(..., description="Primera fecha a revisar en formato YYYY-MM-DD")
+    duracion_minutos: int = Field(..., description="Duración continua requerida en minutos (por ejemplo 60 o 90)")
+    dias: int = Field(1, description="Cantidad de días a revisar desde la fecha indicada")
+
+class BuscarBloquesLibresTool(BaseTool):
+    name: str = "buscar_bloques_libres"
+    description: str = (
+        "Buscar horarios de inicio donde un profesional tiene libre un bloque continuo de la duración indicada. "
+        "Usar para procedimientos de más de 30 minutos en lugar de revisar horario por horario"
+    )
+    args_schema: Type[BaseModel] = BuscarBloquesLibresInput
+
+    @con_eventos
+    @memorizado
+    def _run(self, profesional_id: int, fecha: str, duracion_minutos: int, dias: int = 1) -> Dict[str, Any]:
+        try:
+            servicio_disponibilidad = obtener_servicio_disponibilidad()
+            
+            fecha_obj = datetime.strptime(fecha, "%Y-%m-%d").date()
+            resultado = servicio_disponibilidad.buscar_bloques_libres(
+                profesional_id,
+                duracion_minutos,
+                fecha_obj,
+                fecha_obj + timedelta(days=max(dias, 1) - 1),
+                limite=20
+            )
+            
+            return {
+                'profesional_id': profesional_id,
+                'nombre_profesional': resultado.nombre_profesional,
+                'duracion_minutos': duracion_minutos,
+                'bloques_disponibles': [
+                    {
+                        'fecha': bloque.fecha.isoformat(),
+                        'hora_inicio': bloque.hora_inicio,
+                        'hora_fin': bloque.hora_fin
+                    } for bloque in resultado.bloques
+                ],
+                'total_disponibles': resultado.total_encontrados
+            }
+        except Exception as e:
+            logger.error(f"Error buscando bloques libres: {e}")
+            return {'error': str(e)}
+
+class BuscarHorariosEspecialidadInput(BaseModel):
+    especialidad: str = Field(..., description="Especialidad médica, por ejemplo 'Dermatología'")
+    fecha: str = Field(..., description="Primera fecha a revisar en formato YYYY-MM-DD")
+    dias: int = Field(1, description="Cantidad de días a revisar desde la fecha indicada")
+    cantidad: int = Field(10, description="Máximo de horarios a devolver")
+
+class BuscarHorariosEspecialidadTool(BaseTool):
+    name: str = "buscar_horarios_especialidad"
+    description: str = (
+        "Obtener en una sola llamada los horarios libres de todos los profesionales de una especialidad, "
+        "ordenados por fecha y hora e indicando el profesional de cada uno. Usar cuando el paciente pide "
+        "cualquier profesional de una especialidad"
+    )
+    args_schema: Type[BaseModel] = BuscarHorariosEspecialidadInput
+
+    @con_eventos
+    @memorizado
+    def _run(self, especialidad: str, fecha: str, dias: int = 1, cantidad: int = 10) -> Dict[str, Any]:
+        try:
+            servicio_disponibilidad = obtener_servicio_disponibilidad()
+            
+            fecha_obj = datetime.strptime(fecha, "%Y-%m-%d").date()
+            resultado = servicio_disponibilidad.obtener_disponibilidad_especialidad(
+                especialidad,
+                fecha_obj,
+                fecha_obj + timedelta(days=max(dias, 1) - 1),
+                limite=cantidad
+            )
+            
+            return {
+                'especialidad': resultado.especialidad,
+                'horarios_disponibles': [
+                    {
+                        'fecha': horario.fecha.isoformat(),
+                        'hora_inicio': horario.hora_inicio,
+                        'hora_fin': horario.hora_fin,
+                        'profesional_id': horario.profesional_id,
+                        'nombre_profesional': horario.nombre_profesional
+                    } for horario in resultado.horarios_disponibles
+                ],
+                'total_disponibles': resultado.total_disponibles
+            }
+        except HTTPException as e:
+            return {'error': e.detail}
+        except Exception as e:
+            logger.error(f"Error buscando horarios de {especialidad}: {e}")
             return {'error': str(e)}
 
 class BuscarDisponibleInput(BaseModel):
     fecha: str = Field(..., description="Fecha en formato YYYY-MM-DD")
     hora: str = Field(..., description="Hora en formato HH:MM")
+    especialidad: str = Field("", description="Especialidad requerida (opcional)")
 
 class BuscarDisponibleTool(BaseTool):
     name: str = "buscar_profesional_disponible_fecha"
-    description: str = "Buscar el primer profesional disponible en una fecha y hora específica"
+    description: str = "Buscar el primer profesional disponible en una fecha y hora específica, opcionalmente de una especialidad"
     args_schema: Type[BaseModel] = BuscarDisponibleInput
 
-    def _run(self, fecha: str, hora: str) -> Dict[str, Any]:
+    @con_eventos
+    @memorizado
+    def _run(self, fecha: str, hora: str, especialidad: str = "") -> Dict[str, Any]:
         try:
-            repositorio_profesionales = RepositorioMedicos()
-            repositorio_citas = RepositorioCitas()
-            servicio_disponibilidad = ServicioDisponibilidad(repositorio_citas, repositorio_profesionales)
+            servicio_disponibilidad = obtener_servicio_disponibilidad()
             
-            profesionales = repositorio_profesionales.obtener_profesionales_activos()
             fecha_obj = datetime.strptime(fecha, "%Y-%m-%d").date()
             
-            for profesional in profesionales:
-                # Verificar disponibilidad para este profesional
-                disponibilidad = servicio_disponibilidad.obtener_horarios_disponibles(
-                    profesional['id'], fecha_obj, fecha_obj
-                )
-                
-                if hasattr(disponibilidad, 'horarios_disponibles'):
-                    for horario in disponibilidad.horarios_disponibles:
-                        if horario.hora_inicio == hora and horario.disponible:
-                            return {
-                                'profesional_id': profesional['id'],
-                                'nombre_completo': f"{profesional['nombre']} {profesional['apellido']}",
-                                'especialidad': profesional['especialidad'],
-                                'fecha': fecha,
-                                'hora': hora,
-                                'disponible': True
-                            }
+            # Una sola consulta de citas para todos los profesionales activos
+            disponibilidad = servicio_disponibilidad.obtener_profesionales_disponibles(
+                fecha_obj, hora, especialidad=especialidad or None
+            )
+            
+            if disponibilidad.profesionales:
+                profesional = disponibilidad.profesionales[0]
+                return {
+                    'profesional_id': profesional.profesional_id,
+                    'nombre_completo': profesional.nombre_profesional,
+                    'especialidad': profesional.especialidad,
+                    'fecha': fecha,
+                    'hora': disponibilidad.hora,
+                    'disponible': True
+                }
             
             return {
                 'disponible': False,
@@ -150,78 +450,93 @@ class BuscarDisponibleTool(BaseTool):
             logger.error(f"Error buscando profesional disponible: {e}")
             return {'error': str(e)}
 
+def crear_cita_medica(paciente_id: int, profesional_id: int, fecha: str, hora: str, notas: str = "", duracion_minutos: int = 30) -> Dict[str, Any]:
+    """Crear la cita verificando paciente y profesional; lo usan CrearCitaTool y la vía rápida del asistente"""
+    try:
+        repositorio_pacientes = obtener_repositorio_pacientes()
+        repositorio_profesionales = obtener_repositorio_medicos()
+        repositorio_citas = obtener_repositorio_citas()
+        
+        # Verificar que el paciente existe
+        paciente = repositorio_pacientes.obtener_paciente(paciente_id)
+        if not paciente:
+            return {
+                'success': False,
+                'error': f'Paciente con ID {paciente_id} no encontrado'
+            }
+        
+        # Verificar que el profesional existe
+        profesional = repositorio_profesionales.obtener_profesional(profesional_id)
+        if not profesional:
+            return {
+                'success': False,
+                'error': f'Profesional con ID {profesional_id} no encontrado'
+            }
+        
+        # Combinar fecha y hora
+        fecha_hora = datetime.strptime(f"{fecha} {hora}", "%Y-%m-%d %H:%M")
+        
+        # El cache de ocupación es local al proceso: la base decide si el horario sigue libre
+        if not repositorio_citas.verificar_disponibilidad(profesional_id, fecha_hora, duracion_minutos):
+            return {
+                'success': False,
+                'error': f'El profesional no está disponible el {fecha} a las {hora}'
+            }
+        
+        # Crear la cita
+        cita_data = CitaCrear(
+            paciente_id=paciente_id,
+            profesional_id=profesional_id,
+            nombre_profesional=f"{profesional['nombre']} {profesional['apellido']}",
+            fecha_cita=fecha_hora,
+            duracion_minutos=duracion_minutos,
+            notas=notas,
+            tipo_cita="consulta_general"
+        )
+        
+        cita_creada = repositorio_citas.crear_cita(cita_data)
+        
+        if cita_creada:
+            invalidar_disponibilidad(profesional_id, fecha_hora, duracion_minutos)
+            return {
+                'success': True,
+                'cita_id': cita_creada['id'],
+                'mensaje': f'Cita creada exitosamente con {profesional["nombre"]} {profesional["apellido"]}',
+                'fecha': fecha,
+                'hora': hora,
+                'paciente_nombre': f"{paciente['nombre']} {paciente['apellido']}",
+                'profesional_nombre': f"{profesional['nombre']} {profesional['apellido']}"
+            }
+        else:
+            return {
+                'success': False,
+                'error': 'Error al crear la cita en la base de datos'
+            }
+            
+    except Exception as e:
+        logger.error(f"Error creando cita médica: {e}")
+        return {
+            'success': False,
+            'error': f'Error del sistema: {str(e)}'
+        }
+
 class CrearCitaInput(BaseModel):
     paciente_id: int = Field(..., description="ID del paciente")
     profesional_id: int = Field(..., description="ID del profesional")
     fecha: str = Field(..., description="Fecha en formato YYYY-MM-DD")
     hora: str = Field(..., description="Hora en formato HH:MM")
     notas: str = Field("", description="Notas adicionales para la cita")
+    duracion_minutos: int = Field(30, description="Duración de la cita en minutos (30 por defecto)")
 
 class CrearCitaTool(BaseTool):
     name: str = "crear_cita_medica"
     description: str = "Crear una cita médica para un paciente con un profesional en una fecha y hora específica"
     args_schema: Type[BaseModel] = CrearCitaInput
 
-    def _run(self, paciente_id: int, profesional_id: int, fecha: str, hora: str, notas: str = "") -> Dict[str, Any]:
-        try:
-            repositorio_pacientes = RepositorioPacientes()
-            repositorio_profesionales = RepositorioMedicos()
-            repositorio_citas = RepositorioCitas()
-            
-            # Verificar que el paciente existe
-            paciente = repositorio_pacientes.obtener_paciente(paciente_id)
-            if not paciente:
-                return {
-                    'success': False,
-                    'error': f'Paciente con ID {paciente_id} no encontrado'
-                }
-            
-            # Verificar que el profesional existe
-            profesional = repositorio_profesionales.obtener_profesional(profesional_id)
-            if not profesional:
-                return {
-                    'success': False,
-                    'error': f'Profesional con ID {profesional_id} no encontrado'
-                }
-            
-            # Combinar fecha y hora
-            fecha_hora = datetime.strptime(f"{fecha} {hora}", "%Y-%m-%d %H:%M")
-            
-            # Crear la cita
-            cita_data = CitaCrear(
-                paciente_id=paciente_id,
-                profesional_id=profesional_id,
-                nombre_profesional=f"{profesional['nombre']} {profesional['apellido']}",
-                fecha_cita=fecha_hora,
-                duracion_minutos=30,
-                notas=notas,
-                tipo_cita="consulta_general"
-            )
-            
-            cita_creada = repositorio_citas.crear_cita(cita_data)
-            
-            if cita_creada:
-                return {
-                    'success': True,
-                    'cita_id': cita_creada['id'],
-                    'mensaje': f'Cita creada exitosamente con {profesional["nombre"]} {profesional["apellido"]}',
-                    'fecha': fecha,
-                    'hora': hora,
-                    'paciente_nombre': f"{paciente['nombre']} {paciente['apellido']}",
-                    'profesional_nombre': f"{profesional['nombre']} {profesional['apellido']}"
-                }
-            else:
-                return {
-                    'success': False,
-                    'error': 'Error al crear la cita en la base de datos'
-                }
-                
-        except Exception as e:
-            logger.error(f"Error creando cita médica: {e}")
-            return {
-                'success': False,
-                'error': f'Error del sistema: {str(e)}'
-            }
+    @con_eventos
+    @invalida_memo
+    def _run(self, paciente_id: int, profesional_id: int, fecha: str, hora: str, notas: str = "", duracion_minutos: int = 30) -> Dict[str, Any]:
+        return crear_cita_medica(paciente_id, profesional_id, fecha, hora, notas, duracion_minutos)
 
 class VerificarPacienteInput(BaseModel):
     paciente_id: int = Field(..., description="ID del paciente a verificar")
@@ -231,9 +546,11 @@ class VerificarPacienteTool(BaseTool):
     description: str = "Verificar si un paciente existe en el sistema"
     args_schema: Type[BaseModel] = VerificarPacienteInput
 
+    @con_eventos
+    @memorizado
     def _run(self, paciente_id: int) -> Dict[str, Any]:
         try:
-            repositorio = RepositorioPacientes()
+            repositorio = obtener_repositorio_pacientes()
             paciente = repositorio.obtener_paciente(paciente_id)
             if paciente:
                 return {
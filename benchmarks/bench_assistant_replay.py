@@ -0,0 +1,674 @@
+"""
+Harness de regresión del asistente sin red.
+
+Ejecuta ServicioAssistant.procesar_solicitud sobre un corpus de mensajes de reserva contra:
+  - un endpoint local compatible con OpenAI (127.0.0.1) que reproduce completions guionadas o
+    grabadas, así que el LLM pasa por el mismo camino de crewAI y litellm que con Groq;
+  - repositorios en memoria de médicos, citas y pacientes que cuentan cada consulta a Supabase.
+
+Por solicitud reporta tiempo, vueltas con el LLM, tokens de prompt estimados, llamadas por herramienta
+y consultas por método de repositorio. Cualquier conexión fuera de loopback se bloquea y hace fallar
+la ejecución.
+
+Uso:
+    python -m benchmarks.bench_assistant_replay
+    python -m benchmarks.bench_assistant_replay --guardar base.json
+    python -m benchmarks.bench_assistant_replay --comparar base.json
+    python -m benchmarks.bench_assistant_replay --corpus grabado.json
+
+El corpus (incluido o en JSON) es una lista de casos con nombre, mensaje, paciente_id, completions
+(el texto que devolvería el LLM en cada vuelta) y esperado (campos que debe tener la respuesta).
+Los casos con el mismo valor en "sesion" continúan la misma conversación del asistente.
+$hoy, $dia1 y $dia2 (próximos días hábiles) y $dia1_texto / $dia2_texto ("20 de octubre") se
+reemplazan al cargar el corpus.
+"""
+import argparse
+import contextlib
+import io
+import ipaddress
+import json
+import os
+import socket
+import sys
+import threading
+import time as reloj
+from collections import Counter, deque
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import Template
+from typing import Any, Callable, Dict, List, Optional
+from unittest import mock
+
+for variable, valor in {
+    "SUPABASE_URL": "http://localhost",
+    "SUPABASE_API_KEY": "benchmark",
+    "GROQ_API_KEY": "benchmark",
+    "AI_MODEL_NAME": "groq/llama-3.1-8b-instant",
+    "SECRET_KEY": "benchmark",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "ALLOWED_ORIGINS": '["*"]',
+    "CREWAI_DISABLE_TELEMETRY": "true",
+    "OTEL_SDK_DISABLED": "true",
+    "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+}.items():
+    os.environ.setdefault(variable, valor)
+
+from crewai import LLM  # noqa: E402
+import ai.tools as herramientas_asistente  # noqa: E402
+import services.iaasistente_srv as servicio_asistente  # noqa: E402
+from ai.intencion import MESES  # noqa: E402
+from services.disponibilidad_srv import ServicioDisponibilidad, cache_disponibilidad, cache_plantillas  # noqa: E402
+from services.iaasistente_srv import PoolAgentes, ServicioAssistant, cache_respuestas_assistant  # noqa: E402
+from services.profesionales_srv import indice_profesionales  # noqa: E402
+from schemas.citas_sch import CitaCrear  # noqa: E402
+from utils.sesiones import AlmacenSesionesMemoria  # noqa: E402
+
+# Tolerancias de --comparar
+TOLERANCIA_TIEMPO = 1.5
+TOLERANCIA_TOKENS = 0.02
+
+
+# ---------------------------------------------------------------- red
+
+class ConexionBloqueada(RuntimeError):
+    pass
+
+
+@contextlib.contextmanager
+def sin_red(intentos: List[str]):
+    """Rechazar conexiones que no sean a loopback o sockets Unix, anotando cada intento en `intentos`"""
+    conectar_original = socket.socket.connect
+
+    def conectar(sock, direccion):
+        if sock.family in (socket.AF_INET, socket.AF_INET6):
+            host = direccion[0]
+            try:
+                local = ipaddress.ip_address(host).is_loopback
+            except ValueError:
+                local = host == "localhost"
+            if not local:
+                intentos.append(f"{host}:{direccion[1]}")
+                raise ConexionBloqueada(f"Conexión de red bloqueada hacia {host}:{direccion[1]}")
+        return conectar_original(sock, direccion)
+
+    with mock.patch.object(socket.socket, "connect", conectar):
+        yield
+
+
+# ---------------------------------------------------------------- LLM
+
+def accion(pensamiento: str, herramienta: str, argumentos: Dict[str, Any]) -> str:
+    """Completion que llama una herramienta en el formato ReAct que parsea crewAI"""
+    return f"Thought: {pensamiento}\nAction: {herramienta}\nAction Input: {json.dumps(argumentos, ensure_ascii=False)}"
+
+
+def respuesta_final(datos: Dict[str, Any]) -> str:
+    return f"Thought: Ya tengo la respuesta\nFinal Answer: {json.dumps(datos, ensure_ascii=False)}"
+
+
+# Lo que responde el endpoint si el asistente pide más vueltas de las guionadas
+FUERA_DE_GUION = respuesta_final({
+    "nombre_doctor": "Fuera de guion",
+    "fecha": "",
+    "hora": "",
+    "profesional_id": 0,
+    "disponible": False,
+    "cita_creada": False,
+    "cita_id": None,
+    "mensaje": "El asistente pidió más vueltas con el LLM que las del guion"
+})
+
+
+def estimar_tokens(mensajes: List[Dict[str, Any]]) -> int:
+    """~4 caracteres por token: sin red ni tokenizador, suficiente para notar si el prompt crece"""
+    return sum(len(str(mensaje.get("content") or "")) for mensaje in mensajes) // 4
+
+
+class ServidorLLMReplay:
+    """
+    Endpoint /v1/chat/completions en 127.0.0.1 que devuelve las completions cargadas, una por vuelta.
+    Los tokens de prompt se cuentan con `contar_tokens` (por defecto estimar_tokens).
+    """
+
+    def __init__(self, contar_tokens: Callable[[List[Dict[str, Any]]], int] = estimar_tokens):
+        self._contar_tokens = contar_tokens
+        self._lock = threading.Lock()
+        self._guion: "deque[str]" = deque()
+        self.llamadas = 0
+        self.tokens_prompt = 0
+        self.fuera_de_guion = 0
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_POST(self):
+                cuerpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                datos = json.dumps(servidor._responder(cuerpo)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, *args):
+                pass
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self.url = f"http://127.0.0.1:{self._http.server_port}/v1"
+
+    def __enter__(self) -> "ServidorLLMReplay":
+        threading.Thread(target=self._http.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._http.shutdown()
+        self._http.server_close()
+
+    def cargar(self, completions: List[str]):
+        with self._lock:
+            self._guion = deque(completions)
+            self.llamadas = 0
+            self.tokens_prompt = 0
+            self.fuera_de_guion = 0
+
+    def _responder(self, cuerpo: Dict[str, Any]) -> Dict[str, Any]:
+        tokens_prompt = self._contar_tokens(cuerpo.get("messages", []))
+        with self._lock:
+            if self._guion:
+                texto = self._guion.popleft()
+            else:
+                texto = FUERA_DE_GUION
+                self.fuera_de_guion += 1
+            self.llamadas += 1
+            self.tokens_prompt += tokens_prompt
+        uso = {"prompt_tokens": tokens_prompt, "completion_tokens": len(texto) // 4}
+        return {
+            "id": f"replay-{self.llamadas}",
+            "object": "chat.completion",
+            "created": int(reloj.time()),
+            "model": cuerpo.get("model", "replay"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": texto}, "finish_reason": "stop"}],
+            "usage": {**uso, "total_tokens": uso["prompt_tokens"] + uso["completion_tokens"]}
+        }
+
+
+# ---------------------------------------------------------------- repositorios
+
+class RepositorioMemoria:
+    """Base de los repositorios en memoria: cuenta cada consulta como la haría Supabase"""
+
+    def __init__(self, nombre: str, consultas: Counter):
+        self._nombre = nombre
+        self.consultas = consultas
+
+    def _consulta(self, metodo: str):
+        self.consultas[f"{self._nombre}.{metodo}"] += 1
+
+
+class RepositorioMedicosMemoria(RepositorioMemoria):
+    def __init__(self, profesionales: List[Dict[str, Any]], consultas: Counter):
+        super().__init__("medicos", consultas)
+        self.profesionales = {p['id']: p for p in profesionales}
+
+    def obtener_profesional(self, profesional_id: int) -> Optional[Dict[str, Any]]:
+        self._consulta("obtener_profesional")
+        return self.profesionales.get(profesional_id)
+
+    def obtener_profesionales_activos(self) -> List[Dict[str, Any]]:
+        self._consulta("obtener_profesionales_activos")
+        return [p for p in self.profesionales.values() if p['activo']]
+
+    def obtener_profesionales_por_especialidad(self, especialidad: str) -> List[Dict[str, Any]]:
+        self._consulta("obtener_profesionales_por_especialidad")
+        return [
+            p for p in self.profesionales.values()
+            if p['activo'] and p['especialidad'].lower() == especialidad.lower()
+        ]
+
+
+class RepositorioCitasMemoria(RepositorioMemoria):
+    def __init__(self, consultas: Counter):
+        super().__init__("citas", consultas)
+        self.citas: List[Dict[str, Any]] = []
+
+    def _en_rango(self, cita: Dict[str, Any], fecha_inicio: datetime, fecha_fin: datetime) -> bool:
+        """Citas programadas dentro del rango; las canceladas no ocupan el horario"""
+        fecha = datetime.fromisoformat(cita['fecha_cita']).replace(tzinfo=None)
+        return cita.get('estado', "programada") == "programada" and fecha_inicio.replace(tzinfo=None) <= fecha <= fecha_fin.replace(tzinfo=None)
+
+    def obtener_citas_por_profesional(self, id_profesional: int, fecha_inicio: datetime, fecha_fin: datetime) -> List[Dict[str, Any]]:
+        self._consulta("obtener_citas_por_profesional")
+        return [c for c in self.citas if c['profesional_id'] == id_profesional and self._en_rango(c, fecha_inicio, fecha_fin)]
+
+    def obtener_citas_por_profesionales(self, ids_profesionales: List[int], fecha_inicio: datetime, fecha_fin: datetime) -> Dict[int, List[Dict[str, Any]]]:
+        citas_agrupadas = {id_profesional: [] for id_profesional in ids_profesionales}
+        if not ids_profesionales:
+            return citas_agrupadas
+        self._consulta("obtener_citas_por_profesionales")
+        for cita in self.citas:
+            if cita['profesional_id'] in citas_agrupadas and self._en_rango(cita, fecha_inicio, fecha_fin):
+                citas_agrupadas[cita['profesional_id']].append(cita)
+        return citas_agrupadas
+
+    def verificar_disponibilidad(self, id_profesional: int, fecha_cita: datetime, duracion_minutos: int = 30) -> bool:
+        self._consulta("verificar_disponibilidad")
+        inicio = fecha_cita.replace(tzinfo=None)
+        fin = inicio + timedelta(minutes=duracion_minutos)
+        for cita in self.citas:
+            if cita['profesional_id'] != id_profesional or cita.get('estado', "programada") != "programada":
+                continue
+            inicio_existente = datetime.fromisoformat(cita['fecha_cita']).replace(tzinfo=None)
+            if inicio < inicio_existente + timedelta(minutes=cita.get('duracion_minutos', 30)) and inicio_existente < fin:
+                return False
+        return True
+
+    def crear_cita(self, cita: CitaCrear) -> Optional[Dict[str, Any]]:
+        self._consulta("crear_cita")
+        creada = {
+            **cita.model_dump(),
+            "id": len(self.citas) + 1,
+            "fecha_cita": cita.fecha_cita.isoformat(),
+            "estado": "programada"
+        }
+        self.citas.append(creada)
+        return creada
+
+
+class RepositorioPacientesMemoria(RepositorioMemoria):
+    def __init__(self, pacientes: List[Dict[str, Any]], consultas: Counter):
+        super().__init__("pacientes", consultas)
+        self.pacientes = {p['id']: p for p in pacientes}
+
+    def obtener_paciente(self, id_paciente: int) -> Optional[Dict[str, Any]]:
+        self._consulta("obtener_paciente")
+        return self.pacientes.get(id_paciente)
+
+
+PROFESIONALES = [
+    {"id": 1, "nombre": "Carlos", "apellido": "Pérez", "especialidad": "Medicina General", "email": "cperez@ips.test", "telefono": "3000000001", "activo": True},
+    {"id": 2, "nombre": "Ana", "apellido": "Martínez", "especialidad": "Dermatología", "email": "amartinez@ips.test", "telefono": "3000000002", "activo": True},
+    {"id": 3, "nombre": "Laura", "apellido": "Gómez", "especialidad": "Dermatología", "email": "lgomez@ips.test", "telefono": "3000000003", "activo": True},
+    {"id": 4, "nombre": "Jorge", "apellido": "Ramírez", "especialidad": "Pediatría", "email": "jramirez@ips.test", "telefono": "3000000004", "activo": True},
+]
+
+PACIENTES = [
+    {"id": i, "nombre": nombre, "apellido": apellido, "email": f"paciente{i}@ips.test"}
+    for i, (nombre, apellido) in enumerate([("María", "López"), ("Juan", "Torres"), ("Sofía", "Rojas"), ("Andrés", "Castro")], start=1)
+]
+
+
+@contextlib.contextmanager
+def backend_en_memoria(consultas: Counter):
+    """Sustituir los repositorios compartidos del asistente y de sus herramientas por los de memoria"""
+    medicos = RepositorioMedicosMemoria(PROFESIONALES, consultas)
+    citas = RepositorioCitasMemoria(consultas)
+    pacientes = RepositorioPacientesMemoria(PACIENTES, consultas)
+    disponibilidad = ServicioDisponibilidad(citas, medicos)
+    reemplazos = [
+        (herramientas_asistente, "obtener_repositorio_medicos", medicos),
+        (herramientas_asistente, "obtener_repositorio_citas", citas),
+        (herramientas_asistente, "obtener_repositorio_pacientes", pacientes),
+        (herramientas_asistente, "obtener_servicio_disponibilidad", disponibilidad),
+        (servicio_asistente, "obtener_servicio_disponibilidad", disponibilidad),
+    ]
+    with contextlib.ExitStack() as pila:
+        for modulo, nombre, valor in reemplazos:
+            pila.enter_context(mock.patch.object(modulo, nombre, lambda valor=valor: valor))
+        yield citas
+
+
+# ---------------------------------------------------------------- corpus
+
+def _respuesta(nombre_doctor: str, fecha: str, hora: str, profesional_id: int, disponible: bool, cita_creada: bool, mensaje: str, cita_id: Optional[int] = None) -> Dict[str, Any]:
+    return {
+        "nombre_doctor": nombre_doctor,
+        "fecha": fecha,
+        "hora": hora,
+        "profesional_id": profesional_id,
+        "disponible": disponible,
+        "cita_creada": cita_creada,
+        "cita_id": cita_id,
+        "mensaje": mensaje
+    }
+
+
+CORPUS = [
+    {
+        # Doctor, fecha y hora explícitos: vía rápida, sin LLM
+        "nombre": "reserva_explicita",
+        "mensaje": "Quiero agendar una cita con el doctor Pérez el $dia1_texto a las 10 de la mañana",
+        "paciente_id": 1,
+        "completions": [],
+        "esperado": {"cita_creada": True, "profesional_id": 1, "fecha": "$dia1", "hora": "10:00"}
+    },
+    {
+        "nombre": "consulta_disponibilidad",
+        "mensaje": "¿Tiene disponibilidad la doctora Martínez el $dia1 a las 3 de la tarde?",
+        "paciente_id": None,
+        "sesion": "martinez",
+        "completions": [
+            accion("Busco el ID de la doctora Martínez", "buscar_profesional_por_nombre", {"nombre": "Martínez"}),
+            accion("Reviso los horarios del $dia1", "obtener_horarios_disponibles", {"profesional_id": 2, "fecha": "$dia1"}),
+            respuesta_final(_respuesta("Ana Martínez", "$dia1", "15:00", 2, True, False, "La doctora Martínez tiene libre el $dia1 a las 15:00")),
+        ],
+        "esperado": {"disponible": True, "cita_creada": False, "profesional_id": 2}
+    },
+    {
+        # Misma consulta redactada de otra forma: se responde desde el cache de respuestas
+        "nombre": "consulta_repetida",
+        "mensaje": "La doctora Martínez atiende el $dia1_texto a las 15:00?",
+        "paciente_id": None,
+        "sesion": "martinez",
+        "completions": [],
+        "esperado": {"disponible": True, "cita_creada": False, "profesional_id": 2}
+    },
+    {
+        # Seguimiento con otra fecha: prompt corto con el contexto de la sesión, sin volver a buscar al profesional
+        "nombre": "seguimiento_fecha",
+        "mensaje": "¿Y el $dia2_texto a las 4 de la tarde?",
+        "paciente_id": None,
+        "sesion": "martinez",
+        "completions": [
+            accion("Reviso los horarios del $dia2", "obtener_horarios_disponibles", {"profesional_id": 2, "fecha": "$dia2"}),
+            respuesta_final(_respuesta("Ana Martínez", "$dia2", "16:00", 2, True, False, "La doctora Martínez tiene libre el $dia2 a las 16:00")),
+        ],
+        "esperado": {"disponible": True, "cita_creada": False, "profesional_id": 2, "fecha": "$dia2"}
+    },
+    {
+        "nombre": "reserva_especialidad",
+        "mensaje": "Necesito una cita de dermatología para el $dia2 en la mañana",
+        "paciente_id": 2,
+        "completions": [
+            accion("Busco horarios de dermatología", "buscar_horarios_especialidad", {"especialidad": "Dermatología", "fecha": "$dia2"}),
+            accion("Agendo el primer horario libre", "crear_cita_medica", {"paciente_id": 2, "profesional_id": 2, "fecha": "$dia2", "hora": "08:00"}),
+            respuesta_final(_respuesta("Ana Martínez", "$dia2", "08:00", 2, True, True, "Cita creada con la doctora Martínez el $dia2 a las 08:00", cita_id=2)),
+        ],
+        "esperado": {"cita_creada": True, "profesional_id": 2}
+    },
+    {
+        # La vía rápida declina porque el horario ya está ocupado; el agente sugiere alternativas
+        "nombre": "horario_ocupado",
+        "mensaje": "Agéndame con el doctor Pérez el $dia1_texto a las 10 de la mañana",
+        "paciente_id": 3,
+        "sesion": "ocupado",
+        "completions": [
+            accion("Reviso la disponibilidad del doctor Pérez", "obtener_horarios_disponibles", {"profesional_id": 1, "fecha": "$dia1"}),
+            accion("Las 10:00 están ocupadas, busco alternativas", "sugerir_horarios_alternativos", {"fecha": "$dia1", "hora": "10:00", "profesional_id": 1}),
+            respuesta_final(_respuesta("Carlos Pérez", "$dia1", "10:00", 1, False, False, "Las 10:00 no están disponibles; hay cupo a las 09:30 o a las 10:30")),
+        ],
+        "esperado": {"disponible": False, "cita_creada": False}
+    },
+    {
+        # Doctor y fecha vienen de la sesión: vía rápida, sin LLM
+        "nombre": "seguimiento_hora",
+        "mensaje": "Entonces a las 11",
+        "paciente_id": 3,
+        "sesion": "ocupado",
+        "completions": [],
+        "esperado": {"cita_creada": True, "profesional_id": 1, "fecha": "$dia1", "hora": "11:00"}
+    },
+    {
+        "nombre": "procedimiento_largo",
+        "mensaje": "Necesito un procedimiento de 90 minutos con la doctora Gómez el $dia2",
+        "paciente_id": 4,
+        "completions": [
+            accion("Busco un bloque continuo de 90 minutos", "buscar_bloques_libres", {"profesional_id": 3, "fecha": "$dia2", "duracion_minutos": 90}),
+            accion("Agendo el primer bloque", "crear_cita_medica", {"paciente_id": 4, "profesional_id": 3, "fecha": "$dia2", "hora": "08:00", "duracion_minutos": 90}),
+            respuesta_final(_respuesta("Laura Gómez", "$dia2", "08:00", 3, True, True, "Procedimiento agendado con la doctora Gómez el $dia2 a las 08:00", cita_id=3)),
+        ],
+        "esperado": {"cita_creada": True, "profesional_id": 3}
+    },
+    {
+        "nombre": "cancelacion",
+        "mensaje": "Quiero cancelar mi cita con el doctor Pérez",
+        "paciente_id": 1,
+        "completions": [
+            respuesta_final(_respuesta("Carlos Pérez", "No especificada", "No especificada", 1, False, False, "Por ahora no puedo cancelar citas; comunícate con la IPS")),
+        ],
+        "esperado": {"cita_creada": False}
+    },
+    {
+        # Preguntas de disponibilidad con paciente: no son reservas, la vía rápida no agenda
+        "nombre": "pregunta_hay_cita",
+        "mensaje": "¿Hay cita con la doctora Gómez el $dia1_texto a las 10?",
+        "paciente_id": 4,
+        "completions": [
+            accion("Reviso los horarios de la doctora Gómez", "obtener_horarios_disponibles", {"profesional_id": 3, "fecha": "$dia1"}),
+            respuesta_final(_respuesta("Laura Gómez", "$dia1", "10:00", 3, True, False, "La doctora Gómez tiene libre el $dia1 a las 10:00")),
+        ],
+        "esperado": {"disponible": True, "cita_creada": False, "profesional_id": 3}
+    },
+    {
+        "nombre": "pregunta_tiene_cita",
+        "mensaje": "¿La doctora Gómez tiene cita disponible el $dia1_texto a las 10?",
+        "paciente_id": 4,
+        "completions": [
+            accion("Reviso los horarios de la doctora Gómez", "obtener_horarios_disponibles", {"profesional_id": 3, "fecha": "$dia1"}),
+            respuesta_final(_respuesta("Laura Gómez", "$dia1", "10:00", 3, True, False, "La doctora Gómez tiene libre el $dia1 a las 10:00")),
+        ],
+        "esperado": {"disponible": True, "cita_creada": False, "profesional_id": 3}
+    },
+    {
+        "nombre": "pregunta_saber_si_atiende",
+        "mensaje": "Quiero saber si la doctora Gómez atiende el $dia1_texto a las 10",
+        "paciente_id": 4,
+        "sesion": "gomez",
+        "completions": [
+            accion("Reviso los horarios de la doctora Gómez", "obtener_horarios_disponibles", {"profesional_id": 3, "fecha": "$dia1"}),
+            respuesta_final(_respuesta("Laura Gómez", "$dia1", "10:00", 3, True, False, "La doctora Gómez tiene libre el $dia1 a las 10:00")),
+        ],
+        "esperado": {"disponible": True, "cita_creada": False, "profesional_id": 3}
+    },
+    {
+        # Seguimientos de una sesión que solo preguntaba: los responde el agente, no se agenda
+        "nombre": "seguimiento_pregunta",
+        "mensaje": "¿Y a las 11?",
+        "paciente_id": 4,
+        "sesion": "gomez",
+        "completions": [
+            accion("Reviso las 11:00 del $dia1", "obtener_horarios_disponibles", {"profesional_id": 3, "fecha": "$dia1"}),
+            respuesta_final(_respuesta("Laura Gómez", "$dia1", "11:00", 3, True, False, "La doctora Gómez también tiene libre el $dia1 a las 11:00")),
+        ],
+        "esperado": {"disponible": True, "cita_creada": False, "hora": "11:00"}
+    },
+    {
+        "nombre": "seguimiento_pregunta_libre",
+        "mensaje": "¿Y a las 11 está libre?",
+        "paciente_id": 4,
+        "sesion": "gomez",
+        "completions": [
+            accion("Reviso las 11:00 del $dia1", "obtener_horarios_disponibles", {"profesional_id": 3, "fecha": "$dia1"}),
+            respuesta_final(_respuesta("Laura Gómez", "$dia1", "11:00", 3, True, False, "La doctora Gómez también tiene libre el $dia1 a las 11:00")),
+        ],
+        "esperado": {"disponible": True, "cita_creada": False, "hora": "11:00"}
+    },
+    {
+        "nombre": "seguimiento_solo_pregunto",
+        "mensaje": "¿Qué tal a las 11? Solo pregunto",
+        "paciente_id": 4,
+        "sesion": "gomez",
+        "completions": [
+            accion("Reviso las 11:00 del $dia1", "obtener_horarios_disponibles", {"profesional_id": 3, "fecha": "$dia1"}),
+            respuesta_final(_respuesta("Laura Gómez", "$dia1", "11:00", 3, True, False, "La doctora Gómez también tiene libre el $dia1 a las 11:00")),
+        ],
+        "esperado": {"disponible": True, "cita_creada": False, "hora": "11:00"}
+    },
+]
+
+
+def _dia_habil(desde: date, saltos: int) -> date:
+    fecha = desde
+    while saltos:
+        fecha += timedelta(days=1)
+        if fecha.weekday() < 5:
+            saltos -= 1
+    return fecha
+
+
+def _fecha_texto(fecha: date) -> str:
+    nombre_mes = next(nombre for nombre, numero in MESES.items() if numero == fecha.month)
+    return f"{fecha.day} de {nombre_mes}"
+
+
+def preparar_corpus(casos: List[Dict[str, Any]], hoy: date) -> List[Dict[str, Any]]:
+    """Reemplazar las fechas relativas del corpus; los valores no llevan comillas, así que el JSON sigue válido"""
+    dia1, dia2 = _dia_habil(hoy, 1), _dia_habil(hoy, 2)
+    variables = {
+        "hoy": hoy.isoformat(),
+        "dia1": dia1.isoformat(),
+        "dia2": dia2.isoformat(),
+        "dia1_texto": _fecha_texto(dia1),
+        "dia2_texto": _fecha_texto(dia2),
+    }
+    return json.loads(Template(json.dumps(casos, ensure_ascii=False)).safe_substitute(variables))
+
+
+# ---------------------------------------------------------------- ejecución
+
+def ejecutar_caso(servicio: ServicioAssistant, servidor: ServidorLLMReplay, consultas: Counter, sesiones: Dict[str, str], caso: Dict[str, Any]) -> Dict[str, Any]:
+    servidor.cargar(caso["completions"])
+    consultas.clear()
+    herramientas: Counter = Counter()
+    rutas = []
+
+    def al_evento(tipo: str, datos: Dict[str, Any]):
+        if tipo == "herramienta_iniciada":
+            herramientas[datos["herramienta"]] += 1
+        elif tipo in ("via_rapida", "respuesta_en_cache"):
+            rutas.append(tipo)
+
+    inicio = reloj.perf_counter()
+    respuesta = servicio.procesar_solicitud(caso["mensaje"], caso.get("paciente_id"), al_evento, sesiones.get(caso.get("sesion")))
+    tiempo_ms = (reloj.perf_counter() - inicio) * 1000
+    if caso.get("sesion"):
+        sesiones[caso["sesion"]] = respuesta["sesion_id"]
+
+    diferencias = {
+        campo: {"esperado": valor, "obtenido": respuesta.get(campo)}
+        for campo, valor in caso.get("esperado", {}).items() if respuesta.get(campo) != valor
+    }
+    return {
+        "nombre": caso["nombre"],
+        "ruta": rutas[0] if rutas else "crew",
+        "tiempo_ms": round(tiempo_ms, 2),
+        "llamadas_llm": servidor.llamadas,
+        "tokens_prompt": servidor.tokens_prompt,
+        "fuera_de_guion": servidor.fuera_de_guion,
+        "herramientas": dict(herramientas),
+        "consultas": dict(consultas),
+        "diferencias": diferencias
+    }
+
+
+def ejecutar_corpus(casos: List[Dict[str, Any]], version_prompt: Optional[str] = None, contar_tokens: Callable[[List[Dict[str, Any]]], int] = estimar_tokens) -> Dict[str, Any]:
+    intentos_red: List[str] = []
+    consultas: Counter = Counter()
+    for cache in (cache_disponibilidad, cache_plantillas, cache_respuestas_assistant):
+        cache.limpiar()
+    indice_profesionales.invalidar()
+
+    with sin_red(intentos_red), ServidorLLMReplay(contar_tokens) as servidor, backend_en_memoria(consultas):
+        pool = PoolAgentes(
+            max_agentes=1,
+            fabrica_llm=lambda: LLM(model="openai/replay", base_url=servidor.url, api_key="replay", temperature=0.1),
+            version_prompt=version_prompt
+        )
+        pool.precalentar()
+        servicio = ServicioAssistant(pool, AlmacenSesionesMemoria(max_entradas=100, ttl_segundos=3600))
+        sesiones: Dict[str, str] = {}
+        resultados = []
+        # Los agentes son verbose: su salida por consola no se mezcla con el reporte
+        with contextlib.redirect_stdout(io.StringIO()):
+            for caso in casos:
+                resultados.append(ejecutar_caso(servicio, servidor, consultas, sesiones, caso))
+
+    return {"casos": resultados, "conexiones_bloqueadas": intentos_red}
+
+
+def _total(conteo: Dict[str, int]) -> int:
+    return sum(conteo.values())
+
+
+def imprimir_reporte(reporte: Dict[str, Any]):
+    print(f"{'caso':<26} {'ruta':<19} {'ms':>9} {'LLM':>4} {'tokens':>7} {'herram.':>8} {'consultas':>10}  ok")
+    for caso in reporte["casos"]:
+        ok = "sí" if not caso["diferencias"] and not caso["fuera_de_guion"] else "NO"
+        print(f"{caso['nombre']:<26} {caso['ruta']:<19} {caso['tiempo_ms']:>9.1f} {caso['llamadas_llm']:>4} "
+              f"{caso['tokens_prompt']:>7} {_total(caso['herramientas']):>8} {_total(caso['consultas']):>10}  {ok}")
+    print()
+    for caso in reporte["casos"]:
+        herramientas = ", ".join(f"{nombre}={n}" for nombre, n in sorted(caso["herramientas"].items())) or "-"
+        consultas = ", ".join(f"{nombre}={n}" for nombre, n in sorted(caso["consultas"].items())) or "-"
+        print(f"{caso['nombre']}\n  herramientas: {herramientas}\n  consultas:    {consultas}")
+        for campo, diferencia in caso["diferencias"].items():
+            print(f"  {campo}: esperado {diferencia['esperado']!r}, obtenido {diferencia['obtenido']!r}")
+        if caso["fuera_de_guion"]:
+            print(f"  {caso['fuera_de_guion']} vueltas con el LLM fuera del guion")
+
+
+def fallas(reporte: Dict[str, Any], base: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Motivos para rechazar el cambio: respuestas distintas, red, o más trabajo que en la ejecución base"""
+    motivos = [f"conexión de red bloqueada hacia {destino}" for destino in reporte["conexiones_bloqueadas"]]
+    for caso in reporte["casos"]:
+        if caso["diferencias"]:
+            motivos.append(f"{caso['nombre']}: respuesta distinta a la esperada en {sorted(caso['diferencias'])}")
+        if caso["fuera_de_guion"]:
+            motivos.append(f"{caso['nombre']}: {caso['fuera_de_guion']} vueltas con el LLM fuera del guion")
+    if base is None:
+        return motivos
+
+    anteriores = {caso["nombre"]: caso for caso in base["casos"]}
+    for caso in reporte["casos"]:
+        anterior = anteriores.get(caso["nombre"])
+        if anterior is None:
+            continue
+        for metrica, actual, previo in [
+            ("vueltas con el LLM", caso["llamadas_llm"], anterior["llamadas_llm"]),
+            ("llamadas a herramientas", _total(caso["herramientas"]), _total(anterior["herramientas"])),
+            ("consultas a Supabase", _total(caso["consultas"]), _total(anterior["consultas"])),
+        ]:
+            if actual > previo:
+                motivos.append(f"{caso['nombre']}: {metrica} {previo} -> {actual}")
+        if caso["tokens_prompt"] > anterior["tokens_prompt"] * (1 + TOLERANCIA_TOKENS):
+            motivos.append(f"{caso['nombre']}: tokens de prompt {anterior['tokens_prompt']} -> {caso['tokens_prompt']}")
+
+    tiempo_actual = sum(caso["tiempo_ms"] for caso in reporte["casos"])
+    tiempo_base = sum(caso["tiempo_ms"] for caso in base["casos"])
+    if tiempo_actual > tiempo_base * TOLERANCIA_TIEMPO:
+        motivos.append(f"tiempo total {tiempo_base:.1f} ms -> {tiempo_actual:.1f} ms")
+    return motivos
+
+
+def main(argumentos: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Harness de regresión del asistente sin red")
+    parser.add_argument("--corpus", help="JSON con los casos (por defecto el corpus incluido)")
+    parser.add_argument("--guardar", help="Guardar el reporte como base para --comparar")
+    parser.add_argument("--comparar", help="Reporte base: falla si algún caso hace más trabajo que en él")
+    opciones = parser.parse_args(argumentos)
+
+    casos = CORPUS
+    if opciones.corpus:
+        with open(opciones.corpus, encoding="utf-8") as archivo:
+            casos = json.load(archivo)
+    reporte = ejecutar_corpus(preparar_corpus(casos, date.today()))
+    imprimir_reporte(reporte)
+
+    if opciones.guardar:
+        with open(opciones.guardar, "w", encoding="utf-8") as archivo:
+            json.dump(reporte, archivo, ensure_ascii=False, indent=2)
+
+    base = None
+    if opciones.comparar:
+        with open(opciones.comparar, encoding="utf-8") as archivo:
+            base = json.load(archivo)
+    motivos = fallas(reporte, base)
+    if motivos:
+        print("\nRegresiones:")
+        for motivo in motivos:
+            print(f"  - {motivo}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Benchmark de la preparación por solicitud de ServicioAssistant.
+
+Compara construir LLM, herramientas y agente en cada solicitud (comportamiento anterior)
+contra tomar un agente del pool y crear solo la tarea y el crew. Usa un LLM simulado que
+responde de inmediato, así que no se conecta a Groq ni a Supabase.
+
+Uso:
+    python -m benchmarks.bench_assistant_setup
+"""
+import contextlib
+import io
+import os
+import json
+import statistics
+import time as reloj
+from unittest import mock
+
+for variable, valor in {
+    "SUPABASE_URL": "http://localhost",
+    "SUPABASE_API_KEY": "benchmark",
+    "GROQ_API_KEY": "benchmark",
+    "AI_MODEL_NAME": "groq/llama-3.1-8b-instant",
+    "SECRET_KEY": "benchmark",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "ALLOWED_ORIGINS": '["*"]',
+    "CREWAI_DISABLE_TELEMETRY": "true",
+    "OTEL_SDK_DISABLED": "true",
+    "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+}.items():
+    os.environ.setdefault(variable, valor)
+
+from crewai.llms.base_llm import BaseLLM  # noqa: E402
+from groq import Groq  # noqa: E402
+from services.iaasistente_srv import PoolAgentes, ServicioAssistant  # noqa: E402
+
+RESPUESTA = json.dumps({
+    "nombre_doctor": "Carlos Pérez",
+    "fecha": "2025-01-16",
+    "hora": "10:00",
+    "profesional_id": 2,
+    "disponible": True,
+    "cita_creada": False,
+    "cita_id": None,
+    "mensaje": "Horario disponible"
+}, ensure_ascii=False)
+
+MENSAJE = "quiero agendar cita con el doctor Pérez mañana a las 10 de la mañana"
+
+
+class LLMSimulado(BaseLLM):
+    """Responde la respuesta final en la primera vuelta, sin llamar herramientas"""
+
+    def __init__(self):
+        super().__init__(model="simulado")
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None, from_agent=None, response_model=None):
+        return f"Thought: Ya tengo la respuesta\nFinal Answer: {RESPUESTA}"
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Mediana en milisegundos"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = reloj.perf_counter()
+        funcion()
+        tiempos.append((reloj.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    servicio = ServicioAssistant(PoolAgentes(max_agentes=1, fabrica_llm=LLMSimulado))
+    servicio.pool.precalentar()
+
+    def preparar_antes():
+        # Antes: cliente de Groq, LLM, herramientas y agente nuevos en cada solicitud
+        Groq(api_key=os.environ["GROQ_API_KEY"])
+        pool = PoolAgentes(max_agentes=1)
+        return servicio._crear_crew(pool.crear_agente_asistente(), MENSAJE, 1)
+
+    def preparar_despues():
+        with servicio.pool.prestar() as agente:
+            return servicio._crear_crew(agente, MENSAJE, 1)
+
+    def solicitud_antes():
+        Groq(api_key=os.environ["GROQ_API_KEY"])
+        pool = PoolAgentes(max_agentes=1, fabrica_llm=LLMSimulado)
+        return ServicioAssistant(pool).procesar_solicitud(MENSAJE, 1)
+
+    def solicitud_despues():
+        return servicio.procesar_solicitud(MENSAJE, 1)
+
+    repeticiones = 30
+    filas = []
+    # Los agentes son verbose: su salida por consola no se mezcla con la tabla. Sin profesionales activos,
+    # la vía rápida y la clave del cache de respuestas no consultan Supabase y no entran en la medición.
+    with contextlib.redirect_stdout(io.StringIO()), \
+            mock.patch("services.iaasistente_srv.obtener_profesionales_activos", return_value=[]):
+        assert solicitud_despues()["nombre_doctor"] == "Carlos Pérez"
+        for nombre, antes, despues in [
+            ("preparación (agente + tarea + crew)", preparar_antes, preparar_despues),
+            ("solicitud completa, LLM simulado", solicitud_antes, solicitud_despues),
+        ]:
+            filas.append((nombre, medir(antes, repeticiones), medir(despues, repeticiones)))
+
+    print(f"{'medición':<36} {'antes (ms)':>11} {'después (ms)':>13} {'mejora':>8}")
+    for nombre, t_antes, t_despues in filas:
+        print(f"{nombre:<36} {t_antes:>11.2f} {t_despues:>13.2f} {t_antes / t_despues:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark del generador de horarios de ServicioDisponibilidad.
+
+Compara el recorrido por intervalos ordenados contra el escaneo original
+(cada horario recorría y re-parseaba todas las citas) sobre agendas densas.
+
+Uso:
+    python -m benchmarks.bench_disponibilidad
+"""
+import os
+import random
+import time as reloj
+from datetime import date, datetime, time, timedelta, timezone
+
+# La configuración se carga al importar los repositorios; el benchmark no se conecta a Supabase
+for variable, valor in {
+    "SUPABASE_URL": "http://localhost",
+    "SUPABASE_API_KEY": "benchmark",
+    "GROQ_API_KEY": "benchmark",
+    "AI_MODEL_NAME": "benchmark",
+    "SECRET_KEY": "benchmark",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "ALLOWED_ORIGINS": '["*"]',
+}.items():
+    os.environ.setdefault(variable, valor)
+
+from services.disponibilidad_srv import ServicioDisponibilidad  # noqa: E402
+from schemas.disponibilidad_sch import HorarioDisponible  # noqa: E402
+from utils.ocupacion import MapaOcupacion  # noqa: E402
+
+
+def generar_citas(fecha_inicio: date, dias: int, citas_por_dia: int, semilla: int = 42):
+    """Genera citas aleatorias dentro del horario laboral"""
+    aleatorio = random.Random(semilla)
+    citas = []
+    for desplazamiento in range(dias):
+        fecha = fecha_inicio + timedelta(days=desplazamiento)
+        for _ in range(citas_por_dia):
+            hora = aleatorio.choice([8, 9, 10, 11, 14, 15, 16, 17])
+            minuto = aleatorio.choice([0, 15, 30, 45])
+            inicio = datetime.combine(fecha, time(hora, minuto), tzinfo=timezone.utc)
+            citas.append({
+                "fecha_cita": inicio.isoformat(),
+                "duracion_minutos": aleatorio.choice([15, 30, 45, 60]),
+            })
+    aleatorio.shuffle(citas)
+    return citas
+
+
+def generar_original(profesional_id, fecha_inicio, fecha_fin, citas_existentes):
+    """Implementación anterior: escaneo completo de citas por cada horario"""
+    def verificar(horario):
+        for cita in citas_existentes:
+            cita_inicio = datetime.fromisoformat(cita['fecha_cita'].replace('Z', '+00:00'))
+            cita_fin = cita_inicio + timedelta(minutes=cita.get('duracion_minutos', 30))
+            if horario < cita_fin and (horario + timedelta(minutes=30)) > cita_inicio:
+                return False
+        return True
+
+    horarios = []
+    bloques = [(time(8, 0), time(12, 0)), (time(14, 0), time(18, 0))]
+    actual = fecha_inicio
+    while actual <= fecha_fin:
+        if actual.weekday() < 5:
+            for hora_inicio, hora_fin in bloques:
+                inicio = datetime.combine(actual, hora_inicio, tzinfo=timezone.utc)
+                fin = datetime.combine(actual, hora_fin, tzinfo=timezone.utc)
+                while inicio + timedelta(minutes=30) <= fin:
+                    horarios.append(HorarioDisponible(
+                        fecha=actual,
+                        hora_inicio=inicio.strftime("%H:%M"),
+                        hora_fin=(inicio + timedelta(minutes=30)).strftime("%H:%M"),
+                        profesional_id=profesional_id,
+                        disponible=verificar(inicio)
+                    ))
+                    inicio += timedelta(minutes=30)
+        actual += timedelta(days=1)
+    return horarios
+
+
+def generar_mascaras(servicio, profesional_id, fecha_inicio, fecha_fin, citas_existentes):
+    """Implementación actual: máscaras de bits por día y HorarioDisponible solo al final"""
+    mapa = MapaOcupacion.construir({profesional_id: citas_existentes}, fecha_inicio, fecha_fin)
+    return servicio._construir_horarios(mapa, profesional_id)
+
+
+def primer_dia_original(horarios, minimo):
+    """Primer día con al menos `minimo` horarios libres contando objeto por objeto"""
+    libres_por_dia = {}
+    for horario in horarios:
+        libres_por_dia[horario.fecha] = libres_por_dia.get(horario.fecha, 0) + horario.disponible
+    return next((fecha for fecha, libres in sorted(libres_por_dia.items()) if libres >= minimo), None)
+
+
+def medir(funcion, repeticiones: int = 3) -> float:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = reloj.perf_counter()
+        funcion()
+        mejor = min(mejor, reloj.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    servicio = ServicioDisponibilidad(None, None)
+    fecha_inicio = date(2025, 1, 6)
+
+    print(f"{'dias':>5} {'citas/dia':>10} {'citas':>7} {'original (ms)':>14} {'barrido (ms)':>13} {'mejora':>8}")
+    for dias, citas_por_dia in [(7, 4), (30, 8), (60, 8), (60, 16), (60, 32)]:
+        fecha_fin = fecha_inicio + timedelta(days=dias)
+        citas = generar_citas(fecha_inicio, dias, citas_por_dia)
+
+        esperado = generar_original(1, fecha_inicio, fecha_fin, citas)
+        obtenido = generar_mascaras(servicio, 1, fecha_inicio, fecha_fin, citas)
+        assert esperado == obtenido, "Los resultados difieren de la implementación original"
+        mapa = MapaOcupacion.construir({1: citas}, fecha_inicio, fecha_fin)
+        for minimo in (1, 3, 8, 16):
+            assert mapa.primer_dia_con_libres(1, minimo) == primer_dia_original(esperado, minimo), \
+                f"El primer día con {minimo} horarios libres difiere de la implementación original"
+
+        t_original = medir(lambda: generar_original(1, fecha_inicio, fecha_fin, citas))
+        t_barrido = medir(lambda: generar_mascaras(servicio, 1, fecha_inicio, fecha_fin, citas))
+        print(f"{dias:>5} {citas_por_dia:>10} {len(citas):>7} {t_original * 1000:>14.1f} "
+              f"{t_barrido * 1000:>13.1f} {t_original / t_barrido:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
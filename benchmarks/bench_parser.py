@@ -0,0 +1,106 @@
+"""
+Extracción de la respuesta JSON del asistente: casos conocidos, fuzzing y límites de tiempo.
+
+Compara la extracción de una pasada (utils/extraccion_json.py + ai/salida.py) con el regex
+anidado que usaba _parsear_respuesta_crewai. Falla con AssertionError si la extracción no
+encuentra la respuesta correcta o si supera el tiempo permitido por tamaño de entrada.
+
+Uso:
+    python -m benchmarks.bench_parser
+"""
+import json
+import random
+import re
+import time as reloj
+
+from ai.salida import extraer_respuesta
+
+RESPUESTA = {
+    "nombre_doctor": "Ana Martínez",
+    "fecha": "2025-10-27",
+    "hora": "10:00",
+    "profesional_id": 2,
+    "disponible": False,
+    "cita_creada": False,
+    "cita_id": None,
+    "mensaje": "La hora 10:00 no está disponible. Sugerencias:\n1) 2025-10-28 09:30 — Dr. Ana Martínez (ID: 2) {ver \"agenda\"}"
+}
+FINAL = json.dumps(RESPUESTA, ensure_ascii=False)
+OBSERVACION = json.dumps({"profesional_id": 2, "horarios_disponibles": [{"fecha": "2025-10-27", "hora_inicio": "09:00"}]})
+
+CASOS = {
+    "solo JSON": FINAL,
+    "bloque ```json con prosa": f"Thought: ya tengo todo\nFinal Answer: ```json\n{FINAL}\n```\nGracias.",
+    "observaciones antes de la respuesta": f"Observation: {OBSERVACION}\nObservation: {OBSERVACION}\nFinal Answer: {FINAL}",
+    "respuesta envuelta": json.dumps({"respuesta": RESPUESTA}, ensure_ascii=False),
+    "prosa con llaves y comillas": f'Uso la plantilla {{nombre}}, el doctor dijo "hola}}" y {{ otra }}. Final Answer: {FINAL}',
+    # crewAI recorta las observaciones largas: el objeto truncado no debe ocultar la respuesta que le sigue
+    "observación truncada": f"Observation: {OBSERVACION[:-3]}\nThought: ya tengo todo\nFinal Answer: {FINAL}",
+    "cadena truncada": f'Observation: {{"profesional_id": 2, "resultado": "Horarios: 09:00, 09:3\nFinal Answer: {FINAL}',
+}
+
+# Entradas patológicas para el regex anidado y para cualquier búsqueda que reintente desde cada llave
+ADVERSARIAS = {
+    "llaves abiertas": lambda n: "{" * n,
+    "claves sin cerrar": lambda n: '{"a":' * (n // 5),
+    "cadena sin cerrar": lambda n: '{"' + "a" * n,
+    "escapes": lambda n: '{"' + '\\"' * (n // 2),
+    "llaves cerradas": lambda n: "}" * n,
+    "anidado abierto": lambda n: '{"a":{"b":[' * (n // 11),
+    "objetos vacíos": lambda n: "{}" * (n // 2),
+}
+
+# Segundos máximos por millón de caracteres: holgado para máquinas lentas, pero muy lejos del crecimiento cuadrático
+LIMITE_SEGUNDOS_POR_MILLON = 5.0
+
+
+def parser_regex(texto: str):
+    """El regex que usaba _parsear_respuesta_crewai"""
+    coincidencia = re.search(r'\{[^{}]*\{.*\}[^{}]*\}|\{[^{}]*\}', texto, re.DOTALL)
+    return coincidencia.group() if coincidencia else None
+
+
+def medir(funcion, texto: str) -> float:
+    inicio = reloj.perf_counter()
+    funcion(texto)
+    return reloj.perf_counter() - inicio
+
+
+def ruido(generador: random.Random, longitud: int, alfabeto: str) -> str:
+    return "".join(generador.choice(alfabeto) for _ in range(longitud))
+
+
+def main():
+    print("casos conocidos")
+    for nombre, texto in CASOS.items():
+        respuesta = extraer_respuesta(texto)
+        # sesion_id no viene del agente: lo agrega el servicio después de parsear
+        assert respuesta is not None and respuesta.model_dump(exclude={"sesion_id"}) == RESPUESTA, nombre
+        print(f"  ok  {nombre}")
+
+    generador = random.Random(2024)
+    # Prosa con comillas, cierres, escapes y llaves que no abren objeto: la respuesta siempre debe aparecer
+    for _ in range(500):
+        prosa = re.sub(r'\{(?=\s*["}])', "{ x", ruido(generador, generador.randint(0, 2000), 'ab "}\\:,[]\n{ '))
+        texto = prosa + " Final Answer: " + FINAL
+        assert extraer_respuesta(texto).model_dump(exclude={"sesion_id"}) == RESPUESTA, texto[:200]
+    # Ruido arbitrario: puede ocultar la respuesta dentro de un objeto sin cerrar, pero nunca falla ni tarda
+    for _ in range(500):
+        texto = ruido(generador, generador.randint(0, 5000), '{}":,[]\\ab0 ') + FINAL
+        assert medir(extraer_respuesta, texto) < 0.05
+    print("  ok  fuzzing (1000 entradas)")
+
+    print(f"\n{'entrada adversaria':<22} {'tamaño':>9} {'una pasada (s)':>15} {'regex (s)':>10}")
+    for nombre, construir in ADVERSARIAS.items():
+        for tamano in (10_000, 100_000, 1_000_000):
+            texto = construir(tamano) + FINAL
+            segundos = medir(extraer_respuesta, texto)
+            assert segundos < LIMITE_SEGUNDOS_POR_MILLON * max(tamano, 100_000) / 1_000_000, (nombre, tamano, segundos)
+            # Sin la respuesta al final el regex no encuentra un cierre y retrocede desde cada llave
+            # (cuadrático): no se mide con un millón de caracteres
+            regex = f"{medir(parser_regex, construir(tamano)):>10.4f}" if tamano <= 100_000 else f"{'-':>10}"
+            print(f"{nombre:<22} {tamano:>9} {segundos:>15.4f} {regex}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Comparación A/B de las versiones del prompt del asistente sin red.
+
+Cada vuelta con el LLM reenvía el prompt (más las observaciones de las herramientas), así que su
+tamaño multiplica el costo y la latencia de toda la solicitud. Ejecuta el corpus fijo de
+bench_assistant_replay (LLM guionado en 127.0.0.1 y repositorios en memoria) una vez por versión de
+plantilla y reporta vueltas con el LLM y tokens de prompt.
+
+Por defecto los tokens se estiman con ~4 caracteres por token. Con --tokenizador se cuentan con un
+archivo tokenizer.json local (por ejemplo el del modelo de Groq descargado una vez a mano).
+
+Uso:
+    python -m benchmarks.bench_prompts
+    python -m benchmarks.bench_prompts --tokenizador tokenizer.json
+"""
+import argparse
+import sys
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.bench_assistant_replay import CORPUS, ejecutar_corpus, estimar_tokens, preparar_corpus
+from ai.prompts import PLANTILLAS
+
+
+def contador_tokenizador(ruta: str) -> Callable[[List[Dict[str, Any]]], int]:
+    """Contar tokens con un tokenizer.json local (formato de HuggingFace tokenizers)"""
+    from tokenizers import Tokenizer
+
+    tokenizador = Tokenizer.from_file(ruta)
+    return lambda mensajes: sum(len(tokenizador.encode(str(mensaje.get("content") or "")).ids) for mensaje in mensajes)
+
+
+def main(argumentos: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Tokens de prompt por versión de plantilla, sin red")
+    parser.add_argument("--tokenizador", help="tokenizer.json local (por defecto se estiman ~4 caracteres por token)")
+    opciones = parser.parse_args(argumentos)
+
+    contar_tokens = contador_tokenizador(opciones.tokenizador) if opciones.tokenizador else estimar_tokens
+    casos = preparar_corpus(CORPUS, date.today())
+
+    filas = []
+    for version in PLANTILLAS:
+        reporte = ejecutar_corpus(casos, version, contar_tokens)
+        if reporte["conexiones_bloqueadas"]:
+            print(f"{version}: conexiones fuera de loopback: {reporte['conexiones_bloqueadas']}")
+            return 1
+        vueltas = sum(caso["llamadas_llm"] for caso in reporte["casos"])
+        tokens = sum(caso["tokens_prompt"] for caso in reporte["casos"])
+        correctos = sum(1 for caso in reporte["casos"] if not caso["diferencias"] and not caso["fuera_de_guion"])
+        filas.append((version, vueltas, tokens, tokens // vueltas if vueltas else 0, f"{correctos}/{len(casos)}"))
+
+    print(f"{'versión':<8} {'vueltas LLM':>12} {'tokens':>8} {'tokens/vuelta':>14} {'casos ok':>9}")
+    for version, vueltas, tokens, por_vuelta, correctos in filas:
+        print(f"{version:<8} {vueltas:>12} {tokens:>8} {por_vuelta:>14} {correctos:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,6 +13,27 @@ class Settings(BaseSettings):
     
     ALLOWED_ORIGINS: List[str]
     
+    AVAILABILITY_CACHE_MAX_ENTRIES: int = 5000
+    AVAILABILITY_CACHE_TTL_SECONDS: int = 300
+    
+    ASSISTANT_MAX_WORKERS: int = 4
+    ASSISTANT_MAX_QUEUE: int = 16
+    ASSISTANT_RETRY_AFTER_SECONDS: int = 10
+    ASSISTANT_JOB_MAX_ENTRIES: int = 1000
+    ASSISTANT_JOB_TTL_SECONDS: int = 3600
+    ASSISTANT_FAST_PATH_ENABLED: bool = True
+    ASSISTANT_PROMPT_VERSION: str = "v1"
+    ASSISTANT_RESPONSE_CACHE_MAX_ENTRIES: int = 1000
+    ASSISTANT_RESPONSE_CACHE_TTL_SECONDS: int = 300
+    ASSISTANT_SESSION_MAX_ENTRIES: int = 1000
+    ASSISTANT_SESSION_TTL_SECONDS: int = 1800
+    ASSISTANT_BATCH_MAX_ITEMS: int = 100
+    ASSISTANT_BATCH_CONCURRENCY: int = 2
+    
+    PROFESSIONAL_CACHE_TTL_SECONDS: int = 300
+    PROFESSIONAL_CACHE_RETRY_SECONDS: int = 10
+    PROFESSIONAL_INDEX_TTL_SECONDS: int = 300
+    
     class Config:
         env_file = ".env"
 
@@ -1,9 +1,15 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from utils.security import obtener_usuario_actual
 from config import settings
-from routers import pacientes, citas, disponibilidad, iaasistente, auth
+from routers import pacientes, citas, disponibilidad, iaasistente, auth, profesionales
+from services.iaasistente_srv import ejecutor_assistant, pool_agentes
+from utils.cache import FuenteNoDisponibleError
+import logging
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Medical Appointment API",
@@ -26,6 +32,26 @@ async def root():
     return {"message": "Medical Appointment API"}
 
 
+@app.exception_handler(FuenteNoDisponibleError)
+async def fuente_no_disponible(request: Request, error: FuenteNoDisponibleError):
+    # Supabase no respondió y no hay datos anteriores: no se responde como si no existieran
+    return JSONResponse(status_code=503, content={"detail": "Base de datos no disponible, intenta de nuevo más tarde"})
+
+
+@app.on_event("startup")
+def precalentar_assistant():
+    # El primer agente se construye al arrancar; si falla, se intentará de nuevo en la primera solicitud
+    try:
+        pool_agentes.precalentar()
+    except Exception as e:
+        logger.error(f"Error precalentando el asistente: {e}")
+
+
+@app.on_event("shutdown")
+def cerrar_ejecutor_assistant():
+    ejecutor_assistant.cerrar()
+
+
 app.include_router(
     auth.router,
     prefix="/auth",
@@ -54,6 +80,13 @@ app.include_router(
     ,dependencies=[Depends(obtener_usuario_actual)]
 )
 
+app.include_router(
+    profesionales.router,
+    prefix="/professionals",
+    tags=["Profesionales"]
+    ,dependencies=[Depends(obtener_usuario_actual)]
+)
+
 app.include_router(
     iaasistente.router,
     prefix="/assistant",
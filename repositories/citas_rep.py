@@ -1,8 +1,9 @@
 from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
-from supabase import Client
+from datetime import datetime, timedelta, timezone
+from supabase import Client, AsyncClient
 from repositories.supabase_client import obtener_cliente_supabase
 from schemas.citas_sch import CitaCrear, CitaActualizar
+from utils.cache import FuenteNoDisponibleError
 import logging
 
 logger = logging.getLogger(__name__)
@@ -40,6 +41,7 @@ class RepositorioCitas:
             respuesta = (self.cliente.table(self.tabla)
                        .select("*")
                        .eq("profesional_id", id_profesional)
+                       .eq("estado", "programada")
                        .gte("fecha_cita", fecha_inicio.isoformat())
                        .lte("fecha_cita", fecha_fin.isoformat())
                        .execute())
@@ -48,6 +50,29 @@ class RepositorioCitas:
             logger.error(f"Error obteniendo citas para profesional {id_profesional}: {e}")
             return []
     
+    def obtener_citas_por_profesionales(self, ids_profesionales: List[int], fecha_inicio: datetime, fecha_fin: datetime) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Obtener en una sola consulta las citas de varios profesionales, agrupadas por profesional.
+        Lanza FuenteNoDisponibleError si Supabase falla: un resultado vacío marcaría todo como libre.
+        """
+        citas_agrupadas = {id_profesional: [] for id_profesional in ids_profesionales}
+        if not ids_profesionales:
+            return citas_agrupadas
+        try:
+            respuesta = (self.cliente.table(self.tabla)
+                       .select("*")
+                       .in_("profesional_id", ids_profesionales)
+                       .eq("estado", "programada")
+                       .gte("fecha_cita", fecha_inicio.isoformat())
+                       .lte("fecha_cita", fecha_fin.isoformat())
+                       .execute())
+        except Exception as e:
+            logger.error(f"Error obteniendo citas para profesionales {ids_profesionales}: {e}")
+            raise FuenteNoDisponibleError("No se pudieron leer las citas de los profesionales") from e
+        for cita in respuesta.data:
+            citas_agrupadas.setdefault(cita["profesional_id"], []).append(cita)
+        return citas_agrupadas
+    
     def obtener_todas_citas(self, saltar: int = 0, limite: int = 100) -> List[Dict[str, Any]]:
         try:
             respuesta = (self.cliente.table(self.tabla)
@@ -80,6 +105,9 @@ class RepositorioCitas:
     
     def verificar_disponibilidad(self, id_profesional: int, fecha_cita: datetime, duracion_minutos: int = 30) -> bool:
         try:
+            # Sin zona horaria se asume UTC, igual que en el cálculo de disponibilidad
+            if fecha_cita.tzinfo is None:
+                fecha_cita = fecha_cita.replace(tzinfo=timezone.utc)
             hora_fin = fecha_cita + timedelta(minutes=duracion_minutos)
             
             # Buscar citas que se superpongan con el horario solicitado
@@ -93,6 +121,135 @@ class RepositorioCitas:
             # Verificar superposición para cada cita existente
             for cita in respuesta.data:
                 inicio_existente = datetime.fromisoformat(cita["fecha_cita"].replace('Z', '+00:00'))
+                if inicio_existente.tzinfo is None:
+                    inicio_existente = inicio_existente.replace(tzinfo=timezone.utc)
+                fin_existente = inicio_existente + timedelta(minutes=cita.get("duracion_minutos", 30))
+                
+                # Verificar si hay superposición
+                if fecha_cita < fin_existente and inicio_existente < hora_fin:
+                    return False
+            
+            return True
+        except Exception as e:
+            logger.error(f"Error verificando disponibilidad: {e}")
+            return False
+
+class RepositorioCitasAsync:
+    """Versión asíncrona de RepositorioCitas; el cliente se obtiene con obtener_cliente_supabase_async"""
+    def __init__(self, cliente: AsyncClient):
+        self.cliente = cliente
+        self.tabla = "citas"
+    
+    async def obtener_cita(self, id_cita: int) -> Optional[Dict[str, Any]]:
+        try:
+            respuesta = await (self.cliente.table(self.tabla)
+                       .select("*, pacientes(*)")
+                       .eq("id", id_cita)
+                       .execute())
+            return respuesta.data[0] if respuesta.data else None
+        except Exception as e:
+            logger.error(f"Error obteniendo cita {id_cita}: {e}")
+            return None
+    
+    async def obtener_citas_por_paciente(self, id_paciente: int, saltar: int = 0, limite: int = 100) -> List[Dict[str, Any]]:
+        try:
+            respuesta = await (self.cliente.table(self.tabla)
+                       .select("*, pacientes(*)")
+                       .eq("paciente_id", id_paciente)
+                       .range(saltar, saltar + limite - 1)
+                       .execute())
+            return respuesta.data
+        except Exception as e:
+            logger.error(f"Error obteniendo citas para paciente {id_paciente}: {e}")
+            return []
+    
+    async def obtener_citas_por_profesional(self, id_profesional: int, fecha_inicio: datetime, fecha_fin: datetime) -> List[Dict[str, Any]]:
+        try:
+            respuesta = await (self.cliente.table(self.tabla)
+                       .select("*")
+                       .eq("profesional_id", id_profesional)
+                       .eq("estado", "programada")
+                       .gte("fecha_cita", fecha_inicio.isoformat())
+                       .lte("fecha_cita", fecha_fin.isoformat())
+                       .execute())
+            return respuesta.data
+        except Exception as e:
+            logger.error(f"Error obteniendo citas para profesional {id_profesional}: {e}")
+            return []
+    
+    async def obtener_citas_por_profesionales(self, ids_profesionales: List[int], fecha_inicio: datetime, fecha_fin: datetime) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Obtener en una sola consulta las citas de varios profesionales, agrupadas por profesional.
+        Lanza FuenteNoDisponibleError si Supabase falla: un resultado vacío marcaría todo como libre.
+        """
+        citas_agrupadas = {id_profesional: [] for id_profesional in ids_profesionales}
+        if not ids_profesionales:
+            return citas_agrupadas
+        try:
+            respuesta = await (self.cliente.table(self.tabla)
+                       .select("*")
+                       .in_("profesional_id", ids_profesionales)
+                       .eq("estado", "programada")
+                       .gte("fecha_cita", fecha_inicio.isoformat())
+                       .lte("fecha_cita", fecha_fin.isoformat())
+                       .execute())
+        except Exception as e:
+            logger.error(f"Error obteniendo citas para profesionales {ids_profesionales}: {e}")
+            raise FuenteNoDisponibleError("No se pudieron leer las citas de los profesionales") from e
+        for cita in respuesta.data:
+            citas_agrupadas.setdefault(cita["profesional_id"], []).append(cita)
+        return citas_agrupadas
+    
+    async def obtener_todas_citas(self, saltar: int = 0, limite: int = 100) -> List[Dict[str, Any]]:
+        try:
+            respuesta = await (self.cliente.table(self.tabla)
+                       .select("*, pacientes(*)")
+                       .range(saltar, saltar + limite - 1)
+                       .execute())
+            return respuesta.data
+        except Exception as e:
+            logger.error(f"Error obteniendo todas las citas: {e}")
+            return []
+    
+    async def crear_cita(self, cita: CitaCrear) -> Optional[Dict[str, Any]]:
+        try:
+            cita.fecha_cita = cita.fecha_cita.isoformat()
+            datos_cita = cita.dict()
+            respuesta = await self.cliente.table(self.tabla).insert(datos_cita).execute()
+            return respuesta.data[0] if respuesta.data else None
+        except Exception as e:
+            logger.error(f"Error creando cita: {e}")
+            return None
+    
+    async def actualizar_cita(self, id_cita: int, cita_actualizar: CitaActualizar) -> Optional[Dict[str, Any]]:
+        try:
+            datos_actualizar = cita_actualizar.dict(exclude_unset=True)
+            respuesta = await self.cliente.table(self.tabla).update(datos_actualizar).eq("id", id_cita).execute()
+            return respuesta.data[0] if respuesta.data else None
+        except Exception as e:
+            logger.error(f"Error actualizando cita {id_cita}: {e}")
+            return None
+    
+    async def verificar_disponibilidad(self, id_profesional: int, fecha_cita: datetime, duracion_minutos: int = 30) -> bool:
+        try:
+            # Sin zona horaria se asume UTC, igual que en el cálculo de disponibilidad
+            if fecha_cita.tzinfo is None:
+                fecha_cita = fecha_cita.replace(tzinfo=timezone.utc)
+            hora_fin = fecha_cita + timedelta(minutes=duracion_minutos)
+            
+            # Buscar citas que se superpongan con el horario solicitado
+            respuesta = await (self.cliente.table(self.tabla)
+                       .select("*")
+                       .eq("profesional_id", id_profesional)
+                       .eq("estado", "programada")
+                       .lt("fecha_cita", hora_fin.isoformat())
+                       .execute())
+            
+            # Verificar superposición para cada cita existente
+            for cita in respuesta.data:
+                inicio_existente = datetime.fromisoformat(cita["fecha_cita"].replace('Z', '+00:00'))
+                if inicio_existente.tzinfo is None:
+                    inicio_existente = inicio_existente.replace(tzinfo=timezone.utc)
                 fin_existente = inicio_existente + timedelta(minutes=cita.get("duracion_minutos", 30))
                 
                 # Verificar si hay superposición
@@ -102,4 +259,4 @@ class RepositorioCitas:
             return True
         except Exception as e:
             logger.error(f"Error verificando disponibilidad: {e}")
-            return False
\ No newline at end of file
+            return False
@@ -1,16 +1,56 @@
-from typing import List, Optional, Dict, Any
-from supabase import Client
+from typing import List, Optional, Dict, Any, Callable
+from supabase import Client, AsyncClient
 from repositories.supabase_client import obtener_cliente_supabase
+from utils.cache import CacheInstantanea, FuenteNoDisponibleError
+from config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Profesionales activos compartidos por los repositorios síncrono y asíncrono. El listado cambia pocas
+# veces al día: se relee en segundo plano al vencer y, si Supabase falla, se sigue usando el último.
+cache_profesionales = CacheInstantanea(
+    ttl_segundos=settings.PROFESSIONAL_CACHE_TTL_SECONDS,
+    reintento_segundos=settings.PROFESSIONAL_CACHE_RETRY_SECONDS
+)
+
+# Funciones a llamar cuando cambia el listado de profesionales (índices derivados, etc.)
+_suscriptores_invalidacion: List[Callable[[], None]] = []
+
+def al_invalidar_profesionales(funcion: Callable[[], None]):
+    _suscriptores_invalidacion.append(funcion)
+    return funcion
+
+def invalidar_profesionales():
+    """Releer los profesionales en la próxima consulta (tras crear, editar o desactivar uno)"""
+    cache_profesionales.invalidar()
+    for funcion in _suscriptores_invalidacion:
+        try:
+            funcion()
+        except Exception as e:
+            logger.warning(f"Error notificando invalidación de profesionales: {e}")
+
+def _de_especialidad(profesionales: List[Dict[str, Any]], especialidad: str) -> List[Dict[str, Any]]:
+    """Coincidencia exacta sin distinguir mayúsculas: `%` y `_` se comparan como texto, no como comodines"""
+    buscada = (especialidad or "").strip().casefold()
+    return [p for p in profesionales if (p.get('especialidad') or "").strip().casefold() == buscada]
+
+def _buscar_por_id(profesionales: List[Dict[str, Any]], profesional_id: int) -> Optional[Dict[str, Any]]:
+    return next((p for p in profesionales if p['id'] == profesional_id), None)
+
 class RepositorioMedicos:
     def __init__(self, cliente: Client = None):
         self.cliente = cliente or obtener_cliente_supabase()
         self.tabla = "profesionales"
     
     def obtener_profesional(self, profesional_id: int) -> Optional[Dict[str, Any]]:
+        # Los activos salen del cache; los inactivos, inexistentes o sin listado cargado van a Supabase
+        try:
+            profesional = _buscar_por_id(cache_profesionales.obtener(self._leer_profesionales_activos), profesional_id)
+        except FuenteNoDisponibleError:
+            profesional = None
+        if profesional is not None:
+            return profesional
         try:
             respuesta = self.cliente.table(self.tabla).select("*").eq("id", profesional_id).execute()
             return respuesta.data[0] if respuesta.data else None
@@ -19,9 +59,48 @@ class RepositorioMedicos:
             return None
         
     def obtener_profesionales_activos(self) -> List[Dict[str, Any]]:
+        """
+        Profesionales activos desde el cache del proceso (los diccionarios son compartidos: no modificarlos).
+        Lanza FuenteNoDisponibleError si Supabase falla y nunca se pudo leer el listado.
+        """
+        return list(cache_profesionales.obtener(self._leer_profesionales_activos))
+
+    def _leer_profesionales_activos(self) -> List[Dict[str, Any]]:
+        return self.cliente.table(self.tabla).select("*").eq("activo", True).execute().data
+    
+    def obtener_profesionales_por_especialidad(self, especialidad: str) -> List[Dict[str, Any]]:
+        """
+        Profesionales activos de una especialidad (sin distinguir mayúsculas), desde el cache del proceso.
+        Lanza FuenteNoDisponibleError como obtener_profesionales_activos: una caída no es una especialidad vacía.
+        """
+        return _de_especialidad(cache_profesionales.obtener(self._leer_profesionales_activos), especialidad)
+
+class RepositorioMedicosAsync:
+    """Versión asíncrona de RepositorioMedicos; el cliente se obtiene con obtener_cliente_supabase_async"""
+    def __init__(self, cliente: AsyncClient):
+        self.cliente = cliente
+        self.tabla = "profesionales"
+    
+    async def obtener_profesional(self, profesional_id: int) -> Optional[Dict[str, Any]]:
         try:
-            respuesta = self.cliente.table(self.tabla).select("*").eq("activo", True).execute()
-            return respuesta.data
+            profesional = _buscar_por_id(await cache_profesionales.obtener_async(self._leer_profesionales_activos), profesional_id)
+        except FuenteNoDisponibleError:
+            profesional = None
+        if profesional is not None:
+            return profesional
+        try:
+            respuesta = await self.cliente.table(self.tabla).select("*").eq("id", profesional_id).execute()
+            return respuesta.data[0] if respuesta.data else None
         except Exception as e:
-            logger.error(f"Error obteniendo medicos activos: {e}")
-            return []
\ No newline at end of file
+            logger.error(f"Error obteniendo medico {profesional_id}: {e}")
+            return None
+    
+    async def obtener_profesionales_activos(self) -> List[Dict[str, Any]]:
+        return list(await cache_profesionales.obtener_async(self._leer_profesionales_activos))
+
+    async def _leer_profesionales_activos(self) -> List[Dict[str, Any]]:
+        respuesta = await self.cliente.table(self.tabla).select("*").eq("activo", True).execute()
+        return respuesta.data
+    
+    async def obtener_profesionales_por_especialidad(self, especialidad: str) -> List[Dict[str, Any]]:
+        return _de_especialidad(await cache_profesionales.obtener_async(self._leer_profesionales_activos), especialidad)
@@ -1,5 +1,5 @@
 from typing import List, Optional, Dict, Any
-from supabase import Client
+from supabase import Client, AsyncClient
 from repositories.supabase_client import obtener_cliente_supabase
 from schemas.paciente_sch import PacienteCrear, PacienteActualizar
 import logging
@@ -60,4 +60,71 @@ class RepositorioPacientes:
             return len(respuesta.data) > 0
         except Exception as e:
             logger.error(f"Error eliminando paciente {id_paciente}: {e}")
-            return False
\ No newline at end of file
+            return False
+
+class RepositorioPacientesAsync:
+    """Versión asíncrona de RepositorioPacientes; el cliente se obtiene con obtener_cliente_supabase_async"""
+    def __init__(self, cliente: AsyncClient):
+        self.cliente = cliente
+        self.tabla = "pacientes"
+    
+    async def obtener_paciente(self, id_paciente: int) -> Optional[Dict[str, Any]]:
+        try:
+            respuesta = await self.cliente.table(self.tabla).select("*").eq("id", id_paciente).execute()
+            return respuesta.data[0] if respuesta.data else None
+        except Exception as e:
+            logger.error(f"Error obteniendo paciente {id_paciente}: {e}")
+            return None
+    
+    async def obtener_pacientes_por_ids(self, ids_pacientes: List[int]) -> List[Dict[str, Any]]:
+        """
+        Obtener en una sola consulta los pacientes existentes entre los ids indicados. Los errores de Supabase
+        se propagan: una lista vacía significaría que ninguno existe.
+        """
+        if not ids_pacientes:
+            return []
+        respuesta = await self.cliente.table(self.tabla).select("*").in_("id", ids_pacientes).execute()
+        return respuesta.data
+    
+    async def obtener_paciente_por_email(self, email: str) -> Optional[Dict[str, Any]]:
+        try:
+            respuesta = await self.cliente.table(self.tabla).select("*").eq("email", email).execute()
+            return respuesta.data[0] if respuesta.data else None
+        except Exception as e:
+            logger.error(f"Error obteniendo paciente por email {email}: {e}")
+            return None
+    
+    async def obtener_pacientes(self, saltar: int = 0, limite: int = 100) -> List[Dict[str, Any]]:
+        try:
+            respuesta = await self.cliente.table(self.tabla).select("*").range(saltar, saltar + limite - 1).execute()
+            return respuesta.data
+        except Exception as e:
+            logger.error(f"Error obteniendo pacientes: {e}")
+            return []
+    
+    async def crear_paciente(self, paciente: PacienteCrear) -> Optional[Dict[str, Any]]:
+        try:
+            paciente.fecha_nacimiento = paciente.fecha_nacimiento.isoformat()
+            datos_paciente = paciente.dict()
+            respuesta = await self.cliente.table(self.tabla).insert(datos_paciente).execute()
+            return respuesta.data[0] if respuesta.data else None
+        except Exception as e:
+            logger.error(f"Error creando paciente: {e}")
+            return None
+    
+    async def actualizar_paciente(self, id_paciente: int, paciente_actualizar: PacienteActualizar) -> Optional[Dict[str, Any]]:
+        try:
+            datos_actualizar = paciente_actualizar.dict(exclude_unset=True)
+            respuesta = await self.cliente.table(self.tabla).update(datos_actualizar).eq("id", id_paciente).execute()
+            return respuesta.data[0] if respuesta.data else None
+        except Exception as e:
+            logger.error(f"Error actualizando paciente {id_paciente}: {e}")
+            return None
+    
+    async def eliminar_paciente(self, id_paciente: int) -> bool:
+        try:
+            respuesta = await self.cliente.table(self.tabla).delete().eq("id", id_paciente).execute()
+            return len(respuesta.data) > 0
+        except Exception as e:
+            logger.error(f"Error eliminando paciente {id_paciente}: {e}")
+            return False
@@ -1,5 +1,6 @@
-from supabase import create_client, Client
+from supabase import create_client, acreate_client, Client, AsyncClient
 from config import settings
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,5 +19,26 @@ class ClienteSupabase:
                 raise
         return cls._instancia
 
+class ClienteSupabaseAsync:
+    """Cliente asíncrono (httpx) compartido por los routers; no bloquea el event loop mientras espera a Supabase"""
+    _instancia: AsyncClient = None
+    _lock = asyncio.Lock()
+    
+    @classmethod
+    async def obtener_cliente(cls) -> AsyncClient:
+        if cls._instancia is None:
+            async with cls._lock:
+                if cls._instancia is None:
+                    try:
+                        cls._instancia = await acreate_client(settings.SUPABASE_URL, settings.SUPABASE_API_KEY)
+                        logger.info("Cliente asíncrono de Supabase inicializado correctamente")
+                    except Exception as e:
+                        logger.error(f"Error inicializando cliente asíncrono de Supabase: {e}")
+                        raise
+        return cls._instancia
+
 def obtener_cliente_supabase():
-    return ClienteSupabase.obtener_cliente()
\ No newline at end of file
+    return ClienteSupabase.obtener_cliente()
+
+async def obtener_cliente_supabase_async() -> AsyncClient:
+    return await ClienteSupabaseAsync.obtener_cliente()
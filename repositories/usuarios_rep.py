@@ -1,7 +1,8 @@
 from typing import List, Optional, Dict, Any
-from supabase import Client
+from supabase import Client, AsyncClient
 from repositories.supabase_client import obtener_cliente_supabase
 from schemas.auth_sch import UsuarioCrear
+import asyncio
 import logging
 import bcrypt
 
@@ -79,4 +80,81 @@ class RepositorioUsuarios:
             return respuesta.data
         except Exception as e:
             logger.error(f"Error obteniendo usuarios: {e}")
-            return []
\ No newline at end of file
+            return []
+
+class RepositorioUsuariosAsync:
+    """
+    Versión asíncrona de RepositorioUsuarios; el cliente se obtiene con obtener_cliente_supabase_async.
+    bcrypt es costoso a propósito, así que el hash y la verificación corren en un hilo aparte.
+    """
+    def __init__(self, cliente: AsyncClient):
+        self.cliente = cliente
+        self.tabla = "usuarios"
+    
+    async def obtener_usuario_por_email(self, email: str) -> Optional[Dict[str, Any]]:
+        try:
+            respuesta = await self.cliente.table(self.tabla).select("*").eq("email", email).execute()
+            return respuesta.data[0] if respuesta.data else None
+        except Exception as e:
+            logger.error(f"Error obteniendo usuario por email {email}: {e}")
+            return None
+    
+    async def obtener_usuario_por_id(self, id_usuario: int) -> Optional[Dict[str, Any]]:
+        try:
+            respuesta = await self.cliente.table(self.tabla).select("*").eq("id", id_usuario).execute()
+            return respuesta.data[0] if respuesta.data else None
+        except Exception as e:
+            logger.error(f"Error obteniendo usuario {id_usuario}: {e}")
+            return None
+    
+    async def crear_usuario(self, usuario: UsuarioCrear) -> Optional[Dict[str, Any]]:
+        try:
+            # Verificar y limpiar la contraseña
+            contraseña = usuario.contraseña.strip()
+            
+            # Validar longitud máxima para bcrypt
+            if len(contraseña) > 72:
+                logger.warning("Contraseña demasiado larga, truncando a 72 caracteres")
+                contraseña = contraseña[:72]
+            
+            # Validar que la contraseña no esté vacía
+            if not contraseña:
+                logger.error("La contraseña no puede estar vacía")
+                return None
+            
+            contraseña_hash = await asyncio.to_thread(
+                lambda: bcrypt.hashpw(contraseña.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            )
+            
+            # Preparar datos del usuario
+            datos_usuario = {
+                "email": usuario.email,
+                "contraseña_hash": contraseña_hash,
+                "nombre": usuario.nombre,
+                "apellido": usuario.apellido,
+                "activo": True
+            }
+            
+            respuesta = await self.cliente.table(self.tabla).insert(datos_usuario).execute()
+            return respuesta.data[0] if respuesta.data else None
+            
+        except Exception as e:
+            logger.error(f"Error creando usuario: {e}")
+            return None
+    
+    async def verificar_contraseña(self, contraseña_plano: str, contraseña_hash: str) -> bool:
+        try:
+            return await asyncio.to_thread(
+                bcrypt.checkpw, contraseña_plano.encode('utf-8'), contraseña_hash.encode('utf-8')
+            )
+        except Exception as e:
+            logger.error(f"Error verificando contraseña: {e}")
+            return False
+    
+    async def obtener_usuarios(self, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        try:
+            respuesta = await self.cliente.table(self.tabla).select("*").range(skip, skip + limit - 1).execute()
+            return respuesta.data
+        except Exception as e:
+            logger.error(f"Error obteniendo usuarios: {e}")
+            return []
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from repositories.usuarios_rep import RepositorioUsuarios
+from repositories.usuarios_rep import RepositorioUsuariosAsync
+from repositories.supabase_client import obtener_cliente_supabase_async
 from services.auth_srv import ServicioAutenticacion
 from schemas.auth_sch import Token, UsuarioLogin, UsuarioCrear, Usuario
 from utils.security import obtener_usuario_actual
@@ -10,26 +11,26 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-def obtener_repositorio_usuarios() -> RepositorioUsuarios:
-    return RepositorioUsuarios()
+async def obtener_repositorio_usuarios() -> RepositorioUsuariosAsync:
+    return RepositorioUsuariosAsync(await obtener_cliente_supabase_async())
 
 def obtener_servicio_autenticacion(
-    repositorio_usuarios: RepositorioUsuarios = Depends(obtener_repositorio_usuarios)
+    repositorio_usuarios: RepositorioUsuariosAsync = Depends(obtener_repositorio_usuarios)
 ) -> ServicioAutenticacion:
     return ServicioAutenticacion(repositorio_usuarios)
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     datos_login: UsuarioLogin,
     servicio: ServicioAutenticacion = Depends(obtener_servicio_autenticacion)
 ):
     """
     Iniciar sesión y obtener token de acceso
     """
-    return servicio.login(datos_login)
+    return await servicio.login(datos_login)
 
 @router.post("/login-formulario", response_model=Token)
-def login_formulario(
+async def login_formulario(
     form_data: OAuth2PasswordRequestForm = Depends(),
     servicio: ServicioAutenticacion = Depends(obtener_servicio_autenticacion)
 ):
@@ -37,18 +38,18 @@ def login_formulario(
     Iniciar sesión usando OAuth2 form data (compatible con Postman)
     """
     datos_login = UsuarioLogin(email=form_data.username, contraseña=form_data.password)
-    return servicio.login(datos_login)
+    return await servicio.login(datos_login)
 
 @router.post("/registro", response_model=Usuario)
-def registrar_usuario(
+async def registrar_usuario(
     usuario: UsuarioCrear,
-    repositorio_usuarios: RepositorioUsuarios = Depends(obtener_repositorio_usuarios)
+    repositorio_usuarios: RepositorioUsuariosAsync = Depends(obtener_repositorio_usuarios)
 ):
     """
     Registrar nuevo usuario
     """
     # Verificar si el usuario ya existe
-    usuario_existente = repositorio_usuarios.obtener_usuario_por_email(usuario.email)
+    usuario_existente = await repositorio_usuarios.obtener_usuario_por_email(usuario.email)
     if usuario_existente:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -56,7 +57,7 @@ def registrar_usuario(
         )
     
     # Crear usuario
-    usuario_creado = repositorio_usuarios.crear_usuario(usuario)
+    usuario_creado = await repositorio_usuarios.crear_usuario(usuario)
     if not usuario_creado:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -70,7 +71,7 @@ def registrar_usuario(
     return Usuario(**usuario_creado)
 
 @router.get("/verificar-token")
-def verificar_token(usuario_actual: dict = Depends(obtener_usuario_actual)):
+async def verificar_token(usuario_actual: dict = Depends(obtener_usuario_actual)):
     """
     Verificar si el token es válido (endpoint básico)
     """
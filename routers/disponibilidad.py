@@ -1,44 +1,175 @@
-from fastapi import APIRouter, Depends, Query
-from typing import Optional
-from datetime import date
-from repositories.citas_rep import RepositorioCitas
-from repositories.medicos_rep import RepositorioMedicos
-from services.disponibilidad_srv import ServicioDisponibilidad
-from schemas.disponibilidad_sch import DisponibilidadResponse, DisponibilidadRequest
+from fastapi import APIRouter, Depends, Query, Header
+from typing import List, Optional, Union
+from datetime import date, datetime
+from repositories.citas_rep import RepositorioCitasAsync
+from repositories.medicos_rep import RepositorioMedicosAsync
+from repositories.supabase_client import obtener_cliente_supabase_async
+from services.disponibilidad_srv import ServicioDisponibilidadAsync, cache_disponibilidad
+from schemas.disponibilidad_sch import DisponibilidadResponse, DisponibilidadCompactaResponse, DisponibilidadPaginadaResponse, BloquesLibresResponse, DisponibilidadEspecialidadResponse, DisponibilidadRequest, ProfesionalesDisponiblesResponse, ProximosHorariosResponse, PrimerDiaDisponibleResponse, SugerenciasResponse
 from utils.security import obtener_usuario_actual
 
 router = APIRouter()
 
-def obtener_servicio_disponibilidad() -> ServicioDisponibilidad:
-    repositorio_citas = RepositorioCitas()
-    repositorio_profesionales = RepositorioMedicos()
-    return ServicioDisponibilidad(repositorio_citas, repositorio_profesionales)
+async def obtener_servicio_disponibilidad() -> ServicioDisponibilidadAsync:
+    cliente = await obtener_cliente_supabase_async()
+    repositorio_citas = RepositorioCitasAsync(cliente)
+    repositorio_profesionales = RepositorioMedicosAsync(cliente)
+    return ServicioDisponibilidadAsync(repositorio_citas, repositorio_profesionales)
 
-@router.get("/profesional/{profesional_id}", response_model=DisponibilidadResponse)
-def obtener_disponibilidad_profesional(
+# Tipo de contenido con el que los clientes pueden pedir el formato compacto vía Accept
+TIPO_CONTENIDO_COMPACTO = "application/vnd.ips.disponibilidad-compacta+json"
+
+def _usar_formato_compacto(formato: Optional[str], accept: Optional[str]) -> bool:
+    if formato:
+        return formato.lower() == "compacto"
+    return bool(accept) and TIPO_CONTENIDO_COMPACTO in accept
+
+@router.get("/profesional/{profesional_id}", response_model=Union[DisponibilidadResponse, DisponibilidadCompactaResponse])
+async def obtener_disponibilidad_profesional(
     profesional_id: int,
     fecha_inicio: Optional[date] = Query(None, description="Fecha de inicio (por defecto: hoy)"),
     fecha_fin: Optional[date] = Query(None, description="Fecha de fin (por defecto: 4 semanas desde hoy)"),
-    servicio: ServicioDisponibilidad = Depends(obtener_servicio_disponibilidad)
+    formato: Optional[str] = Query(None, description="'completo' (por defecto) o 'compacto': grilla única y una máscara de horarios libres por día"),
+    solo_disponibles: bool = Query(False, description="Omitir los horarios ocupados (o los días sin horarios libres en formato compacto)"),
+    accept: Optional[str] = Header(None),
+    servicio: ServicioDisponibilidadAsync = Depends(obtener_servicio_disponibilidad)
     # ,usuario_actual: dict = Depends(obtener_usuario_actual)
 ):
     """
     Obtener horarios disponibles de un profesional en las próximas 4 semanas
     """
-    return servicio.obtener_horarios_disponibles(profesional_id, fecha_inicio, fecha_fin)
+    if _usar_formato_compacto(formato, accept):
+        return await servicio.obtener_disponibilidad_compacta(profesional_id, fecha_inicio, fecha_fin, solo_disponibles)
+    return await servicio.obtener_horarios_disponibles(profesional_id, fecha_inicio, fecha_fin, solo_disponibles)
 
-@router.post("/profesional/{profesional_id}", response_model=DisponibilidadResponse)
-def obtener_disponibilidad_profesional_post(
+@router.post("/profesional/{profesional_id}", response_model=Union[DisponibilidadResponse, DisponibilidadCompactaResponse])
+async def obtener_disponibilidad_profesional_post(
     profesional_id: int,
     request: DisponibilidadRequest,
-    servicio: ServicioDisponibilidad = Depends(obtener_servicio_disponibilidad)
+    formato: Optional[str] = Query(None, description="'completo' (por defecto) o 'compacto'"),
+    solo_disponibles: bool = Query(False, description="Omitir los horarios ocupados"),
+    accept: Optional[str] = Header(None),
+    servicio: ServicioDisponibilidadAsync = Depends(obtener_servicio_disponibilidad)
     # ,usuario_actual: dict = Depends(obtener_usuario_actual)
 ):
     """
     Obtener horarios disponibles de un profesional con parámetros en el body
     """
-    return servicio.obtener_horarios_disponibles(
+    if _usar_formato_compacto(formato, accept):
+        return await servicio.obtener_disponibilidad_compacta(
+            profesional_id, request.fecha_inicio, request.fecha_fin, solo_disponibles
+        )
+    return await servicio.obtener_horarios_disponibles(
         profesional_id, 
         request.fecha_inicio, 
-        request.fecha_fin
+        request.fecha_fin,
+        solo_disponibles
+    )
+
+@router.get("/profesional/{profesional_id}/paginas", response_model=DisponibilidadPaginadaResponse)
+async def obtener_disponibilidad_profesional_paginada(
+    profesional_id: int,
+    fecha_inicio: Optional[date] = Query(None, description="Fecha de inicio (por defecto: hoy)"),
+    fecha_fin: Optional[date] = Query(None, description="Fecha de fin, hasta un año después del inicio (por defecto: 4 semanas desde hoy)"),
+    dias_por_pagina: int = Query(14, ge=1, le=60, description="Días calculados en cada página"),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto por la página anterior; si se envía, reemplaza los demás parámetros"),
+    solo_disponibles: bool = Query(False, description="Omitir los horarios ocupados"),
+    servicio: ServicioDisponibilidadAsync = Depends(obtener_servicio_disponibilidad)
+):
+    """
+    Recorrer la disponibilidad de un profesional por páginas para rangos mayores a 60 días
+    """
+    return await servicio.obtener_horarios_paginados(
+        profesional_id, fecha_inicio, fecha_fin, dias_por_pagina, cursor, solo_disponibles
     )
+
+@router.get("/profesional/{profesional_id}/bloques", response_model=BloquesLibresResponse)
+async def obtener_bloques_libres(
+    profesional_id: int,
+    duracion_minutos: int = Query(..., ge=5, le=600, description="Duración del bloque continuo requerido"),
+    fecha_inicio: Optional[date] = Query(None, description="Fecha de inicio (por defecto: hoy)"),
+    fecha_fin: Optional[date] = Query(None, description="Fecha de fin (por defecto: 4 semanas desde hoy)"),
+    limite: Optional[int] = Query(None, ge=1, description="Máximo de bloques a devolver"),
+    paso_minutos: Optional[int] = Query(None, ge=5, description="Separación entre inicios candidatos (por defecto: la de la grilla)"),
+    servicio: ServicioDisponibilidadAsync = Depends(obtener_servicio_disponibilidad)
+):
+    """
+    Buscar bloques continuos libres de la duración indicada (procedimientos de 60, 90... minutos)
+    """
+    return await servicio.buscar_bloques_libres(
+        profesional_id, duracion_minutos, fecha_inicio, fecha_fin, limite, paso_minutos
+    )
+
+@router.get("/profesional/{profesional_id}/primer-dia", response_model=PrimerDiaDisponibleResponse)
+async def obtener_primer_dia_disponible(
+    profesional_id: int,
+    minimo_libres: int = Query(1, ge=1, le=48, description="Horarios libres que debe tener el día como mínimo"),
+    fecha_inicio: Optional[date] = Query(None, description="Fecha de inicio (por defecto: hoy)"),
+    fecha_fin: Optional[date] = Query(None, description="Fecha de fin (por defecto: 4 semanas desde hoy)"),
+    servicio: ServicioDisponibilidadAsync = Depends(obtener_servicio_disponibilidad)
+):
+    """
+    Primer día del rango con al menos `minimo_libres` horarios libres, con esos horarios
+    """
+    return await servicio.buscar_primer_dia_disponible(profesional_id, minimo_libres, fecha_inicio, fecha_fin)
+
+@router.get("/especialidad/{especialidad}", response_model=DisponibilidadEspecialidadResponse)
+async def obtener_disponibilidad_especialidad(
+    especialidad: str,
+    fecha_inicio: Optional[date] = Query(None, description="Fecha de inicio (por defecto: hoy)"),
+    fecha_fin: Optional[date] = Query(None, description="Fecha de fin (por defecto: 4 semanas desde hoy)"),
+    limite: Optional[int] = Query(None, ge=1, description="Máximo de horarios a devolver"),
+    servicio: ServicioDisponibilidadAsync = Depends(obtener_servicio_disponibilidad)
+):
+    """
+    Horarios libres de todos los profesionales activos de una especialidad, ordenados por fecha y hora
+    """
+    return await servicio.obtener_disponibilidad_especialidad(especialidad, fecha_inicio, fecha_fin, limite)
+
+@router.get("/profesionales", response_model=ProfesionalesDisponiblesResponse)
+async def obtener_profesionales_disponibles(
+    fecha: date = Query(..., description="Fecha de la cita (YYYY-MM-DD)"),
+    hora: str = Query(..., description="Hora de inicio en formato HH:MM"),
+    profesional_ids: Optional[List[int]] = Query(None, description="Limitar la búsqueda a estos profesionales"),
+    especialidad: Optional[str] = Query(None, description="Limitar la búsqueda a una especialidad"),
+    servicio: ServicioDisponibilidadAsync = Depends(obtener_servicio_disponibilidad)
+):
+    """
+    Obtener todos los profesionales activos libres en una fecha y hora
+    """
+    return await servicio.obtener_profesionales_disponibles(fecha, hora, profesional_ids, especialidad)
+
+@router.get("/next", response_model=ProximosHorariosResponse)
+async def obtener_proximos_horarios(
+    profesional_id: int = Query(..., description="ID del profesional"),
+    cantidad: int = Query(5, ge=1, le=50, description="Cantidad de horarios libres a devolver"),
+    desde: Optional[datetime] = Query(None, description="No devolver horarios anteriores a este momento (por defecto: ahora)"),
+    alrededor_de: Optional[datetime] = Query(None, description="Ordenar por cercanía a esta fecha y hora en lugar de cronológicamente"),
+    servicio: ServicioDisponibilidadAsync = Depends(obtener_servicio_disponibilidad)
+):
+    """
+    Obtener los próximos horarios libres de un profesional, consultando solo los días necesarios
+    """
+    return await servicio.buscar_proximos_horarios(profesional_id, cantidad, desde, alrededor_de)
+
+@router.get("/sugerencias", response_model=SugerenciasResponse)
+async def obtener_sugerencias(
+    fecha: date = Query(..., description="Fecha pedida (YYYY-MM-DD)"),
+    hora: str = Query(..., description="Hora pedida en formato HH:MM"),
+    profesional_id: Optional[int] = Query(None, description="Profesional pedido; sus horarios van primero"),
+    cantidad: int = Query(5, ge=1, le=20, description="Cantidad de sugerencias a devolver"),
+    dias_ventana: int = Query(7, ge=1, le=30, description="Días antes y después de la fecha pedida en los que buscar"),
+    misma_especialidad: bool = Query(True, description="Completar solo con profesionales de la especialidad del pedido"),
+    servicio: ServicioDisponibilidadAsync = Depends(obtener_servicio_disponibilidad)
+):
+    """
+    Horarios alternativos más cercanos a la fecha y hora pedidas, primero del profesional pedido y luego de los demás
+    """
+    return await servicio.sugerir_horarios(fecha, hora, profesional_id, cantidad, dias_ventana, misma_especialidad)
+
+@router.get("/cache/estadisticas")
+async def obtener_estadisticas_cache():
+    """
+    Aciertos, fallos y tamaño del cache de disponibilidad
+    """
+    return cache_disponibilidad.estadisticas()
@@ -1,7 +1,14 @@
-from fastapi import APIRouter, HTTPException
-from services.iaasistente_srv import ServicioAssistant
-from schemas.iaasistente_sch import AssistantRequest, AssistantResponse
-from repositories.pacientes_rep import RepositorioPacientes
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, status
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from services.iaasistente_srv import ServicioAssistant, ejecutor_assistant, pool_agentes, registro_consumo, cache_respuestas_assistant, almacen_sesiones
+from services.trabajos_srv import ServicioTrabajosAssistant, almacen_trabajos
+from services.lotes_srv import ServicioLotesAssistant
+from schemas.iaasistente_sch import AssistantRequest, AssistantResponse, AssistantBatchRequest, TrabajoAssistantCreado, TrabajoAssistant
+from repositories.pacientes_rep import RepositorioPacientesAsync
+from repositories.medicos_rep import RepositorioMedicosAsync
+from repositories.supabase_client import obtener_cliente_supabase_async
+from utils.ejecutor import ColaLlenaError
 
 import logging
 
@@ -12,6 +19,25 @@ router = APIRouter()
 def obtener_servicio_assistant() -> ServicioAssistant:
     return ServicioAssistant()
 
+def obtener_servicio_trabajos() -> ServicioTrabajosAssistant:
+    return ServicioTrabajosAssistant(almacen_trabajos)
+
+async def obtener_servicio_lotes() -> ServicioLotesAssistant:
+    cliente = await obtener_cliente_supabase_async()
+    return ServicioLotesAssistant(RepositorioPacientesAsync(cliente), RepositorioMedicosAsync(cliente))
+
+async def _verificar_paciente(paciente_id: int):
+    repositorio = RepositorioPacientesAsync(await obtener_cliente_supabase_async())
+    if not await repositorio.obtener_paciente(paciente_id):
+        raise HTTPException(status_code=404, detail="Paciente no encontrado")
+
+def _cola_llena(error: ColaLlenaError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="El asistente está atendiendo demasiadas solicitudes, intenta de nuevo más tarde",
+        headers={"Retry-After": str(error.reintentar_en)}
+    )
+
 @router.post("/", response_model=AssistantResponse)
 async def procesar_solicitud_assistant(
     request: AssistantRequest
@@ -20,13 +46,13 @@ async def procesar_solicitud_assistant(
     Endpoint del asistente virtual para agendar citas médicas
     """
     try:
-        paciente_srv = RepositorioPacientes()
-        paciente = paciente_srv.obtener_paciente(request.paciente_id)
-        if not paciente:
-            raise HTTPException(status_code=404, detail="Paciente no encontrado")
+        await _verificar_paciente(request.paciente_id)
         
+        # crewAI y sus herramientas son síncronos: se ejecutan en el pool acotado del asistente
         servicio = obtener_servicio_assistant()
-        resultado = servicio.procesar_solicitud(request.mensaje, request.paciente_id)
+        resultado = await ejecutor_assistant.ejecutar(
+            servicio.procesar_solicitud, request.mensaje, request.paciente_id, None, request.sesion_id
+        )
         
         return AssistantResponse(
             nombre_doctor=resultado["nombre_doctor"],
@@ -36,16 +62,102 @@ async def procesar_solicitud_assistant(
             disponible=resultado["disponible"],
             mensaje=resultado["mensaje"],
             cita_creada=resultado["cita_creada"],
-            cita_id=resultado.get("cita_id")
+            cita_id=resultado.get("cita_id"),
+            sesion_id=resultado.get("sesion_id")
         )
         
+    except ColaLlenaError as e:
+        raise _cola_llena(e)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error en endpoint assistant: {e}")
         raise HTTPException(status_code=500, detail=f"Error del asistente: {str(e)}")
 
+@router.post("/batch")
+async def procesar_lote_assistant(
+    request: AssistantBatchRequest,
+    servicio: ServicioLotesAssistant = Depends(obtener_servicio_lotes)
+):
+    """
+    Procesar varias solicitudes al asistente con paralelismo acotado. Responde un stream NDJSON con
+    una línea por solicitud (indice, paciente_id y resultado o error) a medida que van terminando
+    """
+    resultados = await servicio.procesar(request.items)
+    return StreamingResponse(
+        resultados,
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/jobs", response_model=TrabajoAssistantCreado, status_code=status.HTTP_202_ACCEPTED)
+async def crear_trabajo_assistant(
+    request: AssistantRequest,
+    peticion: Request,
+    servicio: ServicioTrabajosAssistant = Depends(obtener_servicio_trabajos)
+):
+    """
+    Encolar la solicitud al asistente y devolver de inmediato el id del trabajo
+    """
+    await _verificar_paciente(request.paciente_id)
+    try:
+        trabajo = servicio.enviar(request.mensaje, request.paciente_id, request.sesion_id)
+    except ColaLlenaError as e:
+        raise _cola_llena(e)
+    
+    trabajo_id = trabajo["trabajo_id"]
+    return TrabajoAssistantCreado(
+        trabajo_id=trabajo_id,
+        estado=trabajo["estado"],
+        url_estado=str(peticion.url_for("obtener_trabajo_assistant", trabajo_id=trabajo_id)),
+        url_eventos=str(peticion.url_for("obtener_eventos_trabajo_assistant", trabajo_id=trabajo_id))
+    )
+
+@router.get("/jobs/{trabajo_id}", response_model=TrabajoAssistant)
+async def obtener_trabajo_assistant(
+    trabajo_id: str,
+    servicio: ServicioTrabajosAssistant = Depends(obtener_servicio_trabajos)
+):
+    """
+    Estado, eventos y resultado (cuando termina) de un trabajo del asistente
+    """
+    return servicio.obtener(trabajo_id)
+
+@router.get("/jobs/{trabajo_id}/events")
+async def obtener_eventos_trabajo_assistant(
+    trabajo_id: str,
+    last_event_id: Optional[str] = Header(None),
+    servicio: ServicioTrabajosAssistant = Depends(obtener_servicio_trabajos)
+):
+    """
+    Stream SSE con el progreso del trabajo (herramientas iniciadas y finalizadas) y el JSON final
+    """
+    servicio.obtener(trabajo_id)
+    desde = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else 0
+    return StreamingResponse(
+        servicio.eventos_sse(trabajo_id, desde),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/health")
 async def health_check():
     """
     Verificar que el asistente esté funcionando
     """
-    return {"status": "healthy", "service": "medical_assistant"}
\ No newline at end of file
+    return {"status": "healthy", "service": "medical_assistant"}
+
+@router.get("/metricas")
+async def obtener_metricas():
+    """
+    Profundidad de la cola, tiempos de espera y rechazos del pool del asistente,
+    tokens y vueltas con el LLM por versión de prompt, aciertos del cache de respuestas y sesiones abiertas
+    """
+    return {
+        **ejecutor_assistant.estadisticas(),
+        "agentes": pool_agentes.estadisticas(),
+        "version_prompt": pool_agentes.plantilla.version,
+        "consumo_llm": registro_consumo.estadisticas(),
+        "cache_respuestas": cache_respuestas_assistant.estadisticas(),
+        "sesiones": almacen_sesiones.estadisticas()
+    }
\ No newline at end of file
@@ -1,48 +1,49 @@
 from fastapi import APIRouter, Depends
 from typing import List
-from repositories.pacientes_rep import RepositorioPacientes
+from repositories.pacientes_rep import RepositorioPacientesAsync
+from repositories.supabase_client import obtener_cliente_supabase_async
 from services.pacientes_srv import ServicioPacientes
 from schemas.paciente_sch import Paciente, PacienteCrear, PacienteActualizar
 
 router = APIRouter()
 
-def obtener_servicio_pacientes() -> ServicioPacientes:
-    repositorio = RepositorioPacientes()
+async def obtener_servicio_pacientes() -> ServicioPacientes:
+    repositorio = RepositorioPacientesAsync(await obtener_cliente_supabase_async())
     return ServicioPacientes(repositorio)
 
 @router.get("/", response_model=List[Paciente])
-def obtener_pacientes(
+async def obtener_pacientes(
     saltar: int = 0,
     limite: int = 100,
     servicio: ServicioPacientes = Depends(obtener_servicio_pacientes)
 ):
-    return servicio.obtener_pacientes(saltar, limite)
+    return await servicio.obtener_pacientes(saltar, limite)
 
 @router.get("/{id_paciente}", response_model=Paciente)
-def obtener_paciente(
+async def obtener_paciente(
     id_paciente: int,
     servicio: ServicioPacientes = Depends(obtener_servicio_pacientes)
 ):
-    return servicio.obtener_paciente(id_paciente)
+    return await servicio.obtener_paciente(id_paciente)
 
 @router.post("/", response_model=Paciente)
-def crear_paciente(
+async def crear_paciente(
     paciente: PacienteCrear,
     servicio: ServicioPacientes = Depends(obtener_servicio_pacientes)
 ):
-    return servicio.crear_paciente(paciente)
+    return await servicio.crear_paciente(paciente)
 
 @router.put("/{id_paciente}", response_model=Paciente)
-def actualizar_paciente(
+async def actualizar_paciente(
     id_paciente: int,
     paciente_actualizar: PacienteActualizar,
     servicio: ServicioPacientes = Depends(obtener_servicio_pacientes)
 ):
-    return servicio.actualizar_paciente(id_paciente, paciente_actualizar)
+    return await servicio.actualizar_paciente(id_paciente, paciente_actualizar)
 
 @router.delete("/{id_paciente}")
-def eliminar_paciente(
+async def eliminar_paciente(
     id_paciente: int,
     servicio: ServicioPacientes = Depends(obtener_servicio_pacientes)
 ):
-    return servicio.eliminar_paciente(id_paciente)
\ No newline at end of file
+    return await servicio.eliminar_paciente(id_paciente)
\ No newline at end of file
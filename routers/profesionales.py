@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, Query
+from typing import Optional
+from repositories.medicos_rep import RepositorioMedicosAsync, cache_profesionales, invalidar_profesionales
+from repositories.supabase_client import obtener_cliente_supabase_async
+from services.disponibilidad_srv import invalidar_plantilla
+from services.profesionales_srv import ServicioProfesionalesAsync, indice_profesionales, LIMITE_BUSQUEDA_MAXIMO
+from schemas.profesionales_sch import BusquedaProfesionalesResponse
+
+router = APIRouter()
+
+async def obtener_servicio_profesionales() -> ServicioProfesionalesAsync:
+    cliente = await obtener_cliente_supabase_async()
+    return ServicioProfesionalesAsync(RepositorioMedicosAsync(cliente))
+
+@router.get("/search", response_model=BusquedaProfesionalesResponse)
+async def buscar_profesionales(
+    nombre: str = Query(..., description="Nombre, apellido o parte de ellos (sin importar tildes ni pequeños errores de tipeo)"),
+    limite: int = Query(10, ge=1, le=LIMITE_BUSQUEDA_MAXIMO, description="Máximo de resultados"),
+    servicio: ServicioProfesionalesAsync = Depends(obtener_servicio_profesionales)
+):
+    """
+    Buscar profesionales activos por nombre, ordenados del más parecido al menos
+    """
+    return await servicio.buscar(nombre, limite)
+
+@router.get("/search/estadisticas")
+async def obtener_estadisticas_indice():
+    """
+    Tamaño y vigencia del índice de nombres de profesionales
+    """
+    return indice_profesionales.estadisticas()
+
+@router.get("/cache/estadisticas")
+async def obtener_estadisticas_cache():
+    """
+    Aciertos, lecturas en segundo plano y fallos de Supabase del cache de profesionales activos
+    """
+    return cache_profesionales.estadisticas()
+
+@router.post("/cache/invalidar")
+async def invalidar_cache_profesionales(
+    profesional_id: Optional[int] = Query(None, description="Profesional cuyo horario laboral cambió (recompila su plantilla y descarta su disponibilidad)")
+):
+    """
+    Releer los profesionales en la próxima consulta (por ejemplo tras editarlos directamente en Supabase)
+    """
+    if profesional_id is not None:
+        invalidar_plantilla(profesional_id)
+        return {"mensaje": f"Cache de profesionales y plantilla del profesional {profesional_id} invalidados"}
+    invalidar_profesionales()
+    return {"mensaje": "Cache de profesionales invalidado"}
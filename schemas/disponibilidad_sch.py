@@ -21,4 +21,108 @@ class DisponibilidadResponse(BaseModel):
     fecha_inicio: date
     fecha_fin: date
     horarios_disponibles: List[HorarioDisponible]
-    total_disponibles: int
\ No newline at end of file
+    total_disponibles: int
+
+class DisponibilidadPaginadaResponse(BaseModel):
+    profesional_id: int
+    nombre_profesional: str
+    especialidad: str
+    fecha_inicio: date
+    fecha_fin: date
+    horarios_disponibles: List[HorarioDisponible]
+    total_disponibles: int
+    siguiente_cursor: Optional[str] = None
+
+class GrillaCompacta(BaseModel):
+    dias_semana: List[int]  # 0=Lunes, 6=Domingo
+    duracion_minutos: int
+    horarios: List[str]
+
+class DiaDisponibilidadCompacta(BaseModel):
+    fecha: date
+    libres: int  # Bit i encendido = horario i de la grilla de su día de la semana libre
+
+class DisponibilidadCompactaResponse(BaseModel):
+    profesional_id: int
+    nombre_profesional: str
+    especialidad: str
+    fecha_inicio: date
+    fecha_fin: date
+    # Grilla única (formato original), solo si todos los días laborales comparten la misma
+    duracion_minutos: Optional[int] = None
+    grilla: Optional[List[str]] = None
+    grillas: List[GrillaCompacta]
+    dias: List[DiaDisponibilidadCompacta]
+    total_disponibles: int
+
+class ProfesionalDisponible(BaseModel):
+    profesional_id: int
+    nombre_profesional: str
+    especialidad: str
+
+class ProfesionalesDisponiblesResponse(BaseModel):
+    fecha: date
+    hora: str
+    profesionales: List[ProfesionalDisponible]
+    total_disponibles: int
+
+class ProximosHorariosResponse(BaseModel):
+    profesional_id: int
+    nombre_profesional: str
+    especialidad: str
+    horarios: List[HorarioDisponible]
+    total_encontrados: int
+
+class PrimerDiaDisponibleResponse(BaseModel):
+    profesional_id: int
+    nombre_profesional: str
+    especialidad: str
+    minimo_libres: int
+    fecha_inicio: date
+    fecha_fin: date
+    fecha: Optional[date] = None  # None si ningún día del rango tiene `minimo_libres` horarios libres
+    horarios: List[HorarioDisponible]
+
+class HorarioEspecialidad(BaseModel):
+    fecha: date
+    hora_inicio: str
+    hora_fin: str
+    profesional_id: int
+    nombre_profesional: str
+
+class DisponibilidadEspecialidadResponse(BaseModel):
+    especialidad: str
+    fecha_inicio: date
+    fecha_fin: date
+    profesionales: List[ProfesionalDisponible]
+    horarios_disponibles: List[HorarioEspecialidad]
+    total_disponibles: int
+
+class BloqueLibre(BaseModel):
+    fecha: date
+    hora_inicio: str
+    hora_fin: str
+
+class BloquesLibresResponse(BaseModel):
+    profesional_id: int
+    nombre_profesional: str
+    especialidad: str
+    duracion_minutos: int
+    bloques: List[BloqueLibre]
+    total_encontrados: int
+
+class SugerenciaHorario(BaseModel):
+    fecha: date
+    hora_inicio: str
+    hora_fin: str
+    profesional_id: int
+    nombre_profesional: str
+    especialidad: str
+    distancia_minutos: int
+
+class SugerenciasResponse(BaseModel):
+    profesional_id: Optional[int] = None
+    fecha: date
+    hora: str
+    sugerencias: List[SugerenciaHorario]
+    total_sugerencias: int
@@ -1,10 +1,11 @@
 from pydantic import BaseModel
-from typing import Optional
-from datetime import date, time
+from typing import Optional, List, Dict, Any
+from datetime import date, time, datetime
 
 class AssistantRequest(BaseModel):
     mensaje: str
     paciente_id: int
+    sesion_id: Optional[str] = None  # el devuelto por la respuesta anterior, para continuar la conversación
 
 class AssistantResponse(BaseModel):
     nombre_doctor: str
@@ -14,4 +15,36 @@ class AssistantResponse(BaseModel):
     disponible: bool
     cita_creada: bool
     cita_id: Optional[int] = None
-    mensaje: str
\ No newline at end of file
+    mensaje: str
+    sesion_id: Optional[str] = None
+
+class AssistantBatchRequest(BaseModel):
+    items: List[AssistantRequest]
+
+class ResultadoLoteAssistant(BaseModel):
+    """Una línea del stream de POST /assistant/batch, en el orden en que terminan las solicitudes"""
+    indice: int  # posición de la solicitud en `items`
+    paciente_id: int
+    resultado: Optional[AssistantResponse] = None
+    error: Optional[str] = None
+    reintentar_en: Optional[int] = None  # segundos, si el asistente no admitía más trabajos
+
+class TrabajoAssistantCreado(BaseModel):
+    trabajo_id: str
+    estado: str
+    url_estado: str
+    url_eventos: str
+
+class EventoTrabajo(BaseModel):
+    tipo: str  # iniciado, herramienta_iniciada, herramienta_finalizada, resultado, error
+    datos: Dict[str, Any]
+    momento: datetime
+
+class TrabajoAssistant(BaseModel):
+    trabajo_id: str
+    estado: str  # pendiente, en_ejecucion, completado, fallido
+    creado: datetime
+    actualizado: datetime
+    resultado: Optional[AssistantResponse] = None
+    error: Optional[str] = None
+    eventos: List[EventoTrabajo]
\ No newline at end of file
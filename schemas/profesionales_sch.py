@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class ProfesionalEncontrado(BaseModel):
+    id: int
+    nombre_completo: str
+    especialidad: Optional[str] = None
+    email: Optional[str] = None
+    telefono: Optional[str] = None
+    puntaje: float
+
+class BusquedaProfesionalesResponse(BaseModel):
+    consulta: str
+    resultados: List[ProfesionalEncontrado]
+    total: int
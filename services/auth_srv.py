@@ -2,21 +2,21 @@ from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from fastapi import HTTPException, status
 from config import settings
-from repositories.usuarios_rep import RepositorioUsuarios
+from repositories.usuarios_rep import RepositorioUsuariosAsync
 from schemas.auth_sch import UsuarioLogin, Token
 import logging
 
 logger = logging.getLogger(__name__)
 
 class ServicioAutenticacion:
-    def __init__(self, repositorio_usuarios: RepositorioUsuarios):
+    def __init__(self, repositorio_usuarios: RepositorioUsuariosAsync):
         self.repositorio_usuarios = repositorio_usuarios
     
-    def autenticar_usuario(self, email: str, contraseña: str):
-        usuario = self.repositorio_usuarios.obtener_usuario_por_email(email)
+    async def autenticar_usuario(self, email: str, contraseña: str):
+        usuario = await self.repositorio_usuarios.obtener_usuario_por_email(email)
         if not usuario:
             return False
-        if not self.repositorio_usuarios.verificar_contraseña(contraseña, usuario['contraseña_hash']):
+        if not await self.repositorio_usuarios.verificar_contraseña(contraseña, usuario['contraseña_hash']):
             return False
         return usuario
     
@@ -30,8 +30,8 @@ class ServicioAutenticacion:
         encoded_jwt = jwt.encode(datos_codificar, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
         return encoded_jwt
     
-    def login(self, datos_login: UsuarioLogin) -> Token:
-        usuario = self.autenticar_usuario(datos_login.email, datos_login.contraseña)
+    async def login(self, datos_login: UsuarioLogin) -> Token:
+        usuario = await self.autenticar_usuario(datos_login.email, datos_login.contraseña)
         if not usuario:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
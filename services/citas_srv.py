@@ -1,62 +1,73 @@
 from typing import List, Optional
 from datetime import datetime
 from fastapi import HTTPException
-from repositories.citas_rep import RepositorioCitas
-from repositories.pacientes_rep import RepositorioPacientes
+from repositories.citas_rep import RepositorioCitasAsync
+from repositories.pacientes_rep import RepositorioPacientesAsync
 from schemas.citas_sch import CitaCrear, CitaActualizar, Cita, VerificacionDisponibilidad
+from services.disponibilidad_srv import invalidar_disponibilidad
 
 class ServicioCitas:
-    def __init__(self, repositorio_citas: RepositorioCitas, repositorio_pacientes: RepositorioPacientes):
+    def __init__(self, repositorio_citas: RepositorioCitasAsync, repositorio_pacientes: RepositorioPacientesAsync):
         self.repositorio_citas = repositorio_citas
         self.repositorio_pacientes = repositorio_pacientes
     
-    def obtener_cita(self, id_cita: int) -> Cita:
-        datos_cita = self.repositorio_citas.obtener_cita(id_cita)
+    async def obtener_cita(self, id_cita: int) -> Cita:
+        datos_cita = await self.repositorio_citas.obtener_cita(id_cita)
         if not datos_cita:
             raise HTTPException(status_code=404, detail="Cita no encontrada")
         return Cita(**datos_cita)
     
-    def obtener_citas_por_paciente(self, id_paciente: int, saltar: int = 0, limite: int = 100) -> List[Cita]:
+    async def obtener_citas_por_paciente(self, id_paciente: int, saltar: int = 0, limite: int = 100) -> List[Cita]:
         # Verificar que el paciente existe
-        paciente = self.repositorio_pacientes.obtener_paciente(id_paciente)
+        paciente = await self.repositorio_pacientes.obtener_paciente(id_paciente)
         if not paciente:
             raise HTTPException(status_code=404, detail="Paciente no encontrado")
         
-        datos_citas = self.repositorio_citas.obtener_citas_por_paciente(id_paciente, saltar, limite)
+        datos_citas = await self.repositorio_citas.obtener_citas_por_paciente(id_paciente, saltar, limite)
         return [Cita(**cita) for cita in datos_citas]
     
-    def obtener_todas_citas(self, saltar: int = 0, limite: int = 100) -> List[Cita]:
-        datos_citas = self.repositorio_citas.obtener_todas_citas(saltar, limite)
+    async def obtener_todas_citas(self, saltar: int = 0, limite: int = 100) -> List[Cita]:
+        datos_citas = await self.repositorio_citas.obtener_todas_citas(saltar, limite)
         return [Cita(**cita) for cita in datos_citas]
     
-    def crear_cita(self, cita: CitaCrear) -> Cita:
+    async def crear_cita(self, cita: CitaCrear) -> Cita:
         # Verificar que el paciente existe
-        paciente = self.repositorio_pacientes.obtener_paciente(cita.paciente_id)
+        paciente = await self.repositorio_pacientes.obtener_paciente(cita.paciente_id)
         if not paciente:
             raise HTTPException(status_code=404, detail="Paciente no encontrado")
         
         # Verificar disponibilidad
-        if not self.repositorio_citas.verificar_disponibilidad(
+        if not await self.repositorio_citas.verificar_disponibilidad(
             cita.profesional_id, 
             cita.fecha_cita, 
             cita.duracion_minutos
         ):
             raise HTTPException(status_code=400, detail="El profesional no está disponible en ese horario")
         
-        cita_creada = self.repositorio_citas.crear_cita(cita)
+        fecha_cita = cita.fecha_cita
+        cita_creada = await self.repositorio_citas.crear_cita(cita)
         if not cita_creada:
             raise HTTPException(status_code=500, detail="Error al crear la cita")
         
+        invalidar_disponibilidad(cita.profesional_id, fecha_cita, cita.duracion_minutos)
         return Cita(**cita_creada)
     
-    def actualizar_cita(self, id_cita: int, cita_actualizar: CitaActualizar) -> Cita:
-        cita_actualizada = self.repositorio_citas.actualizar_cita(id_cita, cita_actualizar)
+    async def actualizar_cita(self, id_cita: int, cita_actualizar: CitaActualizar) -> Cita:
+        # La cita anterior indica qué día deja de estar ocupado si se reprograma o cancela
+        cita_anterior = await self.repositorio_citas.obtener_cita(id_cita)
+        if not cita_anterior:
+            raise HTTPException(status_code=404, detail="Cita no encontrada")
+        
+        cita_actualizada = await self.repositorio_citas.actualizar_cita(id_cita, cita_actualizar)
         if not cita_actualizada:
             raise HTTPException(status_code=404, detail="Cita no encontrada")
+        
+        for datos in (cita_anterior, cita_actualizada):
+            invalidar_disponibilidad(datos['profesional_id'], datos['fecha_cita'], datos.get('duracion_minutos'))
         return Cita(**cita_actualizada)
     
-    def verificar_disponibilidad(self, disponibilidad: VerificacionDisponibilidad) -> dict:
-        esta_disponible = self.repositorio_citas.verificar_disponibilidad(
+    async def verificar_disponibilidad(self, disponibilidad: VerificacionDisponibilidad) -> dict:
+        esta_disponible = await self.repositorio_citas.verificar_disponibilidad(
             disponibilidad.profesional_id,
             disponibilidad.fecha,
             disponibilidad.duracion_minutos
@@ -1,24 +1,156 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple, Union, Iterator, Callable, Generator, TypeVar
 from datetime import datetime, date, time, timedelta, timezone
+from itertools import islice
 from fastapi import HTTPException
-from repositories.citas_rep import RepositorioCitas
-from repositories.medicos_rep import RepositorioMedicos
-from schemas.disponibilidad_sch import HorarioDisponible, DisponibilidadResponse
+from repositories.citas_rep import RepositorioCitas, RepositorioCitasAsync
+from repositories.medicos_rep import RepositorioMedicos, RepositorioMedicosAsync, al_invalidar_profesionales, invalidar_profesionales
+from schemas.disponibilidad_sch import HorarioDisponible, DisponibilidadResponse, ProfesionalDisponible, ProfesionalesDisponiblesResponse, ProximosHorariosResponse, PrimerDiaDisponibleResponse, DisponibilidadCompactaResponse, DiaDisponibilidadCompacta, GrillaCompacta, DisponibilidadPaginadaResponse, BloqueLibre, BloquesLibresResponse, HorarioEspecialidad, DisponibilidadEspecialidadResponse, SugerenciaHorario, SugerenciasResponse
+from utils.ocupacion import MapaOcupacion, GrillaHorarios, PlantillaSemanal, PLANTILLA_ESTANDAR, agrupar_intervalos_por_dia, compilar_plantilla, intervalos_libres, inicios_bloque, formatear_minutos
+from utils.cache import CacheLRU
+from config import settings
+import base64
+import functools
+import hashlib
+import heapq
+import hmac
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
-class ServicioDisponibilidad:
-    def __init__(self, repositorio_citas: RepositorioCitas, repositorio_profesionales: RepositorioMedicos):
+# Búsqueda incremental: tamaño del primer bloque de días consultado y horizonte máximo
+DIAS_BLOQUE_BUSQUEDA = 7
+DIAS_MAXIMOS_BUSQUEDA = 90
+
+# Intervalos ocupados por (profesional_id, fecha). Se invalida al crear o modificar citas.
+cache_disponibilidad = CacheLRU(
+    max_entradas=settings.AVAILABILITY_CACHE_MAX_ENTRIES,
+    ttl_segundos=settings.AVAILABILITY_CACHE_TTL_SECONDS
+)
+
+# Sugerencias de horarios alternativos: días hacia cada lado de la fecha pedida
+DIAS_VENTANA_SUGERENCIAS = 7
+
+# Paginación de rangos largos
+DIAS_POR_PAGINA = 14
+DIAS_POR_PAGINA_MAXIMO = 60
+DIAS_MAXIMOS_PAGINADO = 366
+
+def _base64(contenido: bytes) -> str:
+    return base64.urlsafe_b64encode(contenido).decode('ascii').rstrip('=')
+
+def _desde_base64(texto: str) -> bytes:
+    return base64.urlsafe_b64decode(texto + '=' * (-len(texto) % 4))
+
+def _firmar_cursor(contenido: bytes) -> bytes:
+    """Firma HMAC-SHA256 con SECRET_KEY: un cursor editado por el cliente se rechaza"""
+    return hmac.new(settings.SECRET_KEY.encode('utf-8'), contenido, hashlib.sha256).digest()
+
+def _codificar_cursor(datos: Dict[str, Any]) -> str:
+    contenido = json.dumps({
+        'p': datos['profesional_id'],
+        'd': datos['desde'].isoformat(),
+        'h': datos['hasta'].isoformat(),
+        'n': datos['dias_por_pagina'],
+        's': int(datos['solo_disponibles'])
+    }, separators=(',', ':')).encode('utf-8')
+    return f"{_base64(contenido)}.{_base64(_firmar_cursor(contenido))}"
+
+def _decodificar_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        datos, firma = cursor.split('.')
+        contenido = _desde_base64(datos)
+        if not hmac.compare_digest(_desde_base64(firma), _firmar_cursor(contenido)):
+            raise ValueError("Firma del cursor inválida")
+        contenido = json.loads(contenido)
+        return {
+            'profesional_id': int(contenido['p']),
+            'desde': date.fromisoformat(contenido['d']),
+            'hasta': date.fromisoformat(contenido['h']),
+            'dias_por_pagina': int(contenido['n']),
+            'solo_disponibles': bool(contenido['s'])
+        }
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+# Plantillas semanales compiladas por profesional_id. Releer el listado de profesionales las descarta todas.
+cache_plantillas = CacheLRU(max_entradas=1000, ttl_segundos=3600)
+al_invalidar_profesionales(cache_plantillas.limpiar)
+
+# Funciones (profesional_id, días afectados o None si son todos) que se llaman con cada invalidación,
+# para que otros caches derivados de la disponibilidad se descarten a la vez
+_suscriptores_invalidacion: List[Callable[[int, Optional[List[date]]], None]] = []
+
+def al_invalidar_disponibilidad(funcion: Callable[[int, Optional[List[date]]], None]):
+    _suscriptores_invalidacion.append(funcion)
+    return funcion
+
+def _notificar_invalidacion(profesional_id: int, dias: Optional[List[date]]):
+    for funcion in _suscriptores_invalidacion:
+        try:
+            funcion(profesional_id, dias)
+        except Exception as e:
+            logger.warning(f"Error notificando invalidación de disponibilidad: {e}")
+
+def invalidar_plantilla(profesional_id: int):
+    """Descartar la plantilla compilada de un profesional tras editar su horario laboral"""
+    cache_plantillas.invalidar(profesional_id)
+    # El horario laboral viene en la fila del profesional: también se relee el listado
+    invalidar_profesionales()
+    _notificar_invalidacion(profesional_id, None)
+
+def invalidar_disponibilidad(profesional_id: int, fecha_cita: Union[datetime, str], duracion_minutos: int = 30):
+    """Invalidar los días del cache de disponibilidad afectados por una cita"""
+    if isinstance(fecha_cita, str):
+        fecha_cita = datetime.fromisoformat(fecha_cita.replace('Z', '+00:00'))
+    if fecha_cita.tzinfo is None:
+        fecha_cita = fecha_cita.replace(tzinfo=timezone.utc)
+    inicio = fecha_cita.astimezone(timezone.utc)
+    fin = inicio + timedelta(minutes=duracion_minutos or 30)
+    dias = []
+    dia = inicio.date()
+    while dia <= fin.date():
+        cache_disponibilidad.invalidar((profesional_id, dia))
+        dias.append(dia)
+        dia += timedelta(days=1)
+    _notificar_invalidacion(profesional_id, dias)
+
+class Consulta:
+    """Lectura que un plan le pide a su servicio: `funcion` es un método de un repositorio"""
+    __slots__ = ('funcion', 'argumentos')
+    
+    def __init__(self, funcion: Callable[..., Any], *argumentos: Any):
+        self.funcion = funcion
+        self.argumentos = argumentos
+
+T = TypeVar('T')
+
+# Generador que entrega las Consulta que necesita, recibe cada resultado con send() y retorna el valor final
+Plan = Generator[Consulta, Any, T]
+
+def _operacion(plan: Callable[..., Plan[Any]]) -> Callable[..., Any]:
+    """Método público a partir de un plan: lo ejecuta el `_ejecutar` del servicio (síncrono o asíncrono)"""
+    @functools.wraps(plan)
+    def operacion(self, *args, **kwargs):
+        return self._ejecutar(plan(self, *args, **kwargs))
+    return operacion
+
+class BaseDisponibilidad:
+    """
+    Disponibilidad común a ServicioDisponibilidad y ServicioDisponibilidadAsync. Cada operación se
+    escribe una sola vez como un plan que pide sus lecturas (profesionales y citas) con `yield Consulta(...)`;
+    lo único que cambia entre los dos servicios es `_ejecutar`, que hace esas lecturas con o sin await.
+    """
+    def __init__(self, repositorio_citas, repositorio_profesionales):
         self.repositorio_citas = repositorio_citas
         self.repositorio_profesionales = repositorio_profesionales
     
-    def obtener_horarios_disponibles(self, profesional_id: int, fecha_inicio: date = None, fecha_fin: date = None) -> DisponibilidadResponse:
-        # Verificar que el profesional existe
-        profesional = self.repositorio_profesionales.obtener_profesional(profesional_id)
+    def _validar_profesional(self, profesional: Optional[Dict[str, Any]]) -> Dict[str, Any]:
         if not profesional:
             raise HTTPException(status_code=404, detail="Profesional no encontrado")
-        
+        return profesional
+    
+    def _validar_rango(self, fecha_inicio: Optional[date], fecha_fin: Optional[date], dias_maximos: int = 60) -> Tuple[date, date]:
         # Establecer fechas por defecto (4 semanas desde hoy)
         hoy = date.today()
         if not fecha_inicio:
@@ -27,107 +159,663 @@ class ServicioDisponibilidad:
             fecha_fin = hoy + timedelta(weeks=4)
         
         # Validar que el rango de fechas no sea demasiado grande
-        if (fecha_fin - fecha_inicio).days > 60:  # Máximo 2 meses
-            raise HTTPException(status_code=400, detail="El rango de fechas no puede ser mayor a 60 días")
-        
-        # Obtener citas existentes del profesional en el rango de fechas
-        fecha_inicio_dt = datetime.combine(fecha_inicio, time.min)
-        fecha_fin_dt = datetime.combine(fecha_fin, time.max)
+        if (fecha_fin - fecha_inicio).days > dias_maximos:
+            raise HTTPException(status_code=400, detail=f"El rango de fechas no puede ser mayor a {dias_maximos} días")
         
-        citas_existentes = self.repositorio_citas.obtener_citas_por_profesional(
-            profesional_id, fecha_inicio_dt, fecha_fin_dt
+        return fecha_inicio, fecha_fin
+    
+    def _armar_horarios(self, profesional: Dict[str, Any], fecha_inicio: date, fecha_fin: date, mapa: MapaOcupacion, solo_disponibles: bool) -> DisponibilidadResponse:
+        return DisponibilidadResponse(
+            profesional_id=profesional['id'],
+            nombre_profesional=f"{profesional['nombre']} {profesional['apellido']}",
+            especialidad=profesional['especialidad'],
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            horarios_disponibles=self._construir_horarios(mapa, profesional['id'], solo_disponibles),
+            total_disponibles=mapa.total_libres(profesional['id'])
         )
-        
-        # Generar horarios disponibles
-        horarios_disponibles = self._generar_horarios_disponibles(
-            profesional_id, fecha_inicio, fecha_fin, citas_existentes
+    
+    def _armar_compacta(self, profesional: Dict[str, Any], fecha_inicio: date, fecha_fin: date, mapa: MapaOcupacion, solo_disponibles: bool) -> DisponibilidadCompactaResponse:
+        grillas = self._agrupar_grillas(self.obtener_plantilla(profesional))
+        unica = grillas[0] if len(grillas) == 1 else None
+        return DisponibilidadCompactaResponse(
+            profesional_id=profesional['id'],
+            nombre_profesional=f"{profesional['nombre']} {profesional['apellido']}",
+            especialidad=profesional['especialidad'],
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            duracion_minutos=unica.duracion_minutos if unica else None,
+            grilla=unica.horarios if unica else None,
+            grillas=grillas,
+            dias=[
+                DiaDisponibilidadCompacta(fecha=fecha, libres=libres)
+                for fecha, libres in mapa.dias(profesional['id'])
+                if libres or not solo_disponibles
+            ],
+            total_disponibles=mapa.total_libres(profesional['id'])
         )
+    
+    def _leer_paginacion(self, profesional_id: int, fecha_inicio: Optional[date], fecha_fin: Optional[date], dias_por_pagina: int, cursor: Optional[str], solo_disponibles: bool) -> Tuple[Optional[date], Optional[date], int, bool]:
+        """Parámetros efectivos de una página: los del cursor si se envió, si no los de la consulta"""
+        if cursor:
+            datos_cursor = _decodificar_cursor(cursor)
+            if datos_cursor['profesional_id'] != profesional_id:
+                raise HTTPException(status_code=400, detail="El cursor no corresponde a este profesional")
+            fecha_inicio = datos_cursor['desde']
+            fecha_fin = datos_cursor['hasta']
+            dias_por_pagina = datos_cursor['dias_por_pagina']
+            solo_disponibles = datos_cursor['solo_disponibles']
         
-        return DisponibilidadResponse(
+        if dias_por_pagina < 1:
+            raise HTTPException(status_code=400, detail="dias_por_pagina debe ser mayor a 0")
+        return fecha_inicio, fecha_fin, min(dias_por_pagina, DIAS_POR_PAGINA_MAXIMO), solo_disponibles
+    
+    def _armar_pagina(self, profesional: Dict[str, Any], fecha_inicio: date, fin_pagina: date, fecha_fin: date, mapa: MapaOcupacion, dias_por_pagina: int, solo_disponibles: bool) -> DisponibilidadPaginadaResponse:
+        profesional_id = profesional['id']
+        siguiente_cursor = None
+        if fin_pagina < fecha_fin:
+            siguiente_cursor = _codificar_cursor({
+                'profesional_id': profesional_id,
+                'desde': fin_pagina + timedelta(days=1),
+                'hasta': fecha_fin,
+                'dias_por_pagina': dias_por_pagina,
+                'solo_disponibles': solo_disponibles
+            })
+        
+        return DisponibilidadPaginadaResponse(
             profesional_id=profesional_id,
             nombre_profesional=f"{profesional['nombre']} {profesional['apellido']}",
             especialidad=profesional['especialidad'],
             fecha_inicio=fecha_inicio,
-            fecha_fin=fecha_fin,
-            horarios_disponibles=horarios_disponibles,
-            total_disponibles=len([h for h in horarios_disponibles if h.disponible])
+            fecha_fin=fin_pagina,
+            horarios_disponibles=self._construir_horarios(mapa, profesional_id, solo_disponibles),
+            total_disponibles=mapa.total_libres(profesional_id),
+            siguiente_cursor=siguiente_cursor
         )
     
-    def _generar_horarios_disponibles(self, profesional_id: int, fecha_inicio: date, fecha_fin: date, citas_existentes: List[Dict[str, Any]]) -> List[HorarioDisponible]:
-        horarios = []
+    def _armar_bloques(self, profesional: Dict[str, Any], duracion_minutos: int, fecha_inicio: date, fecha_fin: date, intervalos: Dict[date, List[Tuple[int, int]]], limite: Optional[int], paso_minutos: Optional[int]) -> BloquesLibresResponse:
+        """
+        Restar las citas de los bloques laborales de cada día en lugar de probar horario por horario.
+        Los inicios se alinean a la grilla del día (o a `paso_minutos`), además del comienzo de cada intervalo libre.
+        """
+        plantilla = self.obtener_plantilla(profesional)
         
-        # Configuración de horario laboral (puedes hacer esto configurable)
-        horario_laboral = {
-            'inicio_manana': time(8, 0),   # 8:00 AM
-            'fin_manana': time(12, 0),     # 12:00 PM
-            'inicio_tarde': time(14, 0),   # 2:00 PM
-            'fin_tarde': time(18, 0),      # 6:00 PM
-        }
+        bloques = []
+        fecha = fecha_inicio
+        while fecha <= fecha_fin and (limite is None or len(bloques) < limite):
+            grilla = plantilla.grilla(fecha.weekday())
+            if grilla is not None:
+                libres = intervalos_libres(grilla.bloques, intervalos.get(fecha, []))
+                paso = paso_minutos or grilla.duracion
+                for inicio in inicios_bloque(libres, duracion_minutos, grilla.inicios[0], paso):
+                    bloques.append(BloqueLibre(
+                        fecha=fecha,
+                        hora_inicio=formatear_minutos(inicio),
+                        hora_fin=formatear_minutos(inicio + duracion_minutos)
+                    ))
+                    if limite is not None and len(bloques) >= limite:
+                        break
+            fecha += timedelta(days=1)
         
-        # Días laborales (0=Lunes, 6=Domingo)
-        dias_laborales = [0, 1, 2, 3, 4]  # Lunes a Viernes
-        
-        # Generar horarios para cada día en el rango
-        current_date = fecha_inicio
-        while current_date <= fecha_fin:
-            # Solo generar horarios para días laborales
-            if current_date.weekday() in dias_laborales:
-                # Horarios de la mañana
-                horarios_manana = self._generar_horarios_dia(
-                    profesional_id, current_date, 
-                    horario_laboral['inicio_manana'], 
-                    horario_laboral['fin_manana'],
-                    citas_existentes
-                )
-                horarios.extend(horarios_manana)
-                
-                # Horarios de la tarde
-                horarios_tarde = self._generar_horarios_dia(
-                    profesional_id, current_date,
-                    horario_laboral['inicio_tarde'],
-                    horario_laboral['fin_tarde'],
-                    citas_existentes
+        return BloquesLibresResponse(
+            profesional_id=profesional['id'],
+            nombre_profesional=f"{profesional['nombre']} {profesional['apellido']}",
+            especialidad=profesional['especialidad'],
+            duracion_minutos=duracion_minutos,
+            bloques=bloques,
+            total_encontrados=len(bloques)
+        )
+    
+    def _normalizar_hora(self, hora: str) -> str:
+        try:
+            return datetime.strptime(hora, "%H:%M").time().strftime("%H:%M")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="La hora debe tener el formato HH:MM")
+    
+    def _filtrar_profesionales(self, profesionales: List[Dict[str, Any]], profesional_ids: Optional[List[int]], especialidad: Optional[str]) -> List[Dict[str, Any]]:
+        if profesional_ids is not None:
+            ids_filtrados = set(profesional_ids)
+            profesionales = [p for p in profesionales if p['id'] in ids_filtrados]
+        if especialidad:
+            profesionales = [p for p in profesionales if p['especialidad'].lower() == especialidad.lower()]
+        return profesionales
+    
+    def _armar_profesionales_disponibles(self, fecha: date, hora: str, profesionales: List[Dict[str, Any]], mapa: Optional[MapaOcupacion]) -> ProfesionalesDisponiblesResponse:
+        disponibles = []
+        if mapa is not None:
+            libres = set(mapa.profesionales_libres(fecha, hora))
+            disponibles = [
+                ProfesionalDisponible(
+                    profesional_id=profesional['id'],
+                    nombre_profesional=f"{profesional['nombre']} {profesional['apellido']}",
+                    especialidad=profesional['especialidad']
                 )
-                horarios.extend(horarios_tarde)
-            
-            current_date += timedelta(days=1)
+                for profesional in profesionales if profesional['id'] in libres
+            ]
         
-        return horarios
+        return ProfesionalesDisponiblesResponse(
+            fecha=fecha,
+            hora=hora,
+            profesionales=disponibles,
+            total_disponibles=len(disponibles)
+        )
     
-    def _generar_horarios_dia(self, profesional_id: int, fecha: date, hora_inicio: time, hora_fin: time, citas_existentes: List[Dict[str, Any]]) -> List[HorarioDisponible]:
-        horarios = []
-        duracion_cita = timedelta(minutes=30)  # Duración por defecto de las citas
-        # current_time = datetime.combine(fecha, hora_inicio)
-        current_time = datetime.combine(fecha, hora_inicio, tzinfo=timezone.utc)
-        # hora_fin_dt = datetime.combine(fecha, hora_fin)
-        hora_fin_dt = datetime.combine(fecha, hora_fin, tzinfo=timezone.utc)
-
+    def _validar_rango_especialidad(self, fecha_inicio: Optional[date], fecha_fin: Optional[date]) -> Tuple[date, date]:
+        fecha_inicio, fecha_fin = self._validar_rango(fecha_inicio, fecha_fin)
+        if fecha_fin < fecha_inicio:
+            raise HTTPException(status_code=400, detail="La fecha de fin debe ser posterior a la fecha de inicio")
+        return fecha_inicio, fecha_fin
+    
+    def _armar_especialidad(self, especialidad: str, profesionales: List[Dict[str, Any]], fecha_inicio: date, fecha_fin: date, mapa: MapaOcupacion, limite: Optional[int]) -> DisponibilidadEspecialidadResponse:
+        if not profesionales:
+            raise HTTPException(status_code=404, detail=f"No hay profesionales activos de {especialidad}")
+        nombres = {p['id']: f"{p['nombre']} {p['apellido']}" for p in profesionales}
         
-        while current_time + duracion_cita <= hora_fin_dt:
-            # Verificar si este horario está disponible
-            disponible = self._verificar_disponibilidad_horario(profesional_id, current_time, citas_existentes)
-            
-            horario = HorarioDisponible(
+        def horarios_profesional(profesional_id: int) -> Iterator[Tuple[date, str, int, str]]:
+            for fecha, libres in mapa.dias(profesional_id):
+                grilla = mapa.grilla(profesional_id, fecha)
+                for hora_inicio, hora_fin in grilla.horarios(libres):
+                    yield fecha, hora_inicio, profesional_id, hora_fin
+        
+        # Cada profesional ya está ordenado; se mezclan sin ordenar todo el conjunto
+        mezclados = heapq.merge(*(horarios_profesional(p['id']) for p in profesionales))
+        horarios = [
+            HorarioEspecialidad(
                 fecha=fecha,
-                hora_inicio=current_time.strftime("%H:%M"),
-                hora_fin=(current_time + duracion_cita).strftime("%H:%M"),
+                hora_inicio=hora_inicio,
+                hora_fin=hora_fin,
                 profesional_id=profesional_id,
-                disponible=disponible
+                nombre_profesional=nombres[profesional_id]
             )
-            horarios.append(horario)
+            for fecha, hora_inicio, profesional_id, hora_fin in islice(mezclados, limite)
+        ]
+        
+        return DisponibilidadEspecialidadResponse(
+            especialidad=profesionales[0]['especialidad'],
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            profesionales=[
+                ProfesionalDisponible(
+                    profesional_id=p['id'],
+                    nombre_profesional=nombres[p['id']],
+                    especialidad=p['especialidad']
+                )
+                for p in profesionales
+            ],
+            horarios_disponibles=horarios,
+            total_disponibles=len(horarios)
+        )
+    
+    def _ventana_sugerencias(self, fecha: date, hora: str, dias_ventana: int) -> Tuple[datetime, datetime, date, date]:
+        """Momento pedido, momento actual y días a revisar (±dias_ventana, sin incluir días pasados)"""
+        objetivo = datetime.combine(fecha, time.fromisoformat(hora), tzinfo=timezone.utc)
+        no_antes_de = datetime.now(timezone.utc)
+        desde = max(fecha - timedelta(days=dias_ventana), no_antes_de.date())
+        return objetivo, no_antes_de, desde, fecha + timedelta(days=dias_ventana)
+    
+    def _separar_solicitado(self, activos: List[Dict[str, Any]], profesional_id: Optional[int], misma_especialidad: bool) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Profesional pedido (o None) y los demás candidatos, de su misma especialidad si se indica"""
+        if profesional_id is None:
+            return None, activos
+        solicitado = self._validar_profesional(next((p for p in activos if p['id'] == profesional_id), None))
+        otros = [p for p in activos if p['id'] != profesional_id]
+        if misma_especialidad:
+            otros = self._filtrar_profesionales(otros, None, solicitado['especialidad'])
+        return solicitado, otros
+    
+    def _horarios_cercanos(self, mapa: MapaOcupacion, profesionales: List[Dict[str, Any]], objetivo: datetime, no_antes_de: datetime, cantidad: int) -> List[Tuple[timedelta, datetime, int, str, str]]:
+        """Los `cantidad` horarios libres más cercanos a `objetivo` entre todos los profesionales del mapa"""
+        candidatos = (
+            (abs(inicio - objetivo), inicio, profesional['id'], hora_inicio, hora_fin)
+            for profesional in profesionales
+            for inicio, hora_inicio, hora_fin in self._horarios_mapa(mapa, profesional['id'], no_antes_de)
+        )
+        return heapq.nsmallest(cantidad, candidatos)
+    
+    def _armar_sugerencias(self, fecha: date, hora: str, profesional_id: Optional[int], cercanos: List[Tuple[timedelta, datetime, int, str, str]], activos: List[Dict[str, Any]]) -> SugerenciasResponse:
+        por_id = {p['id']: p for p in activos}
+        sugerencias = [
+            SugerenciaHorario(
+                fecha=inicio.date(),
+                hora_inicio=hora_inicio,
+                hora_fin=hora_fin,
+                profesional_id=id_profesional,
+                nombre_profesional=f"{por_id[id_profesional]['nombre']} {por_id[id_profesional]['apellido']}",
+                especialidad=por_id[id_profesional]['especialidad'],
+                distancia_minutos=int(distancia.total_seconds() // 60)
+            )
+            for distancia, inicio, id_profesional, hora_inicio, hora_fin in cercanos
+        ]
+        return SugerenciasResponse(
+            profesional_id=profesional_id,
+            fecha=fecha,
+            hora=hora,
+            sugerencias=sugerencias,
+            total_sugerencias=len(sugerencias)
+        )
+    
+    def _armar_primer_dia(self, profesional: Dict[str, Any], minimo_libres: int, fecha_inicio: date, fecha_fin: date, mapa: MapaOcupacion) -> PrimerDiaDisponibleResponse:
+        fecha = mapa.primer_dia_con_libres(profesional['id'], minimo_libres)
+        horarios = [
+            HorarioDisponible(fecha=fecha, hora_inicio=hora_inicio, hora_fin=hora_fin, profesional_id=profesional['id'], disponible=True)
+            for hora_inicio, hora_fin in mapa.horarios(profesional['id'], fecha)
+        ] if fecha else []
+        return PrimerDiaDisponibleResponse(
+            profesional_id=profesional['id'],
+            nombre_profesional=f"{profesional['nombre']} {profesional['apellido']}",
+            especialidad=profesional['especialidad'],
+            minimo_libres=minimo_libres,
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            fecha=fecha,
+            horarios=horarios
+        )
+    
+    def _armar_proximos(self, profesional: Dict[str, Any], horarios: List[Tuple[datetime, str, str]]) -> ProximosHorariosResponse:
+        encontrados = [
+            HorarioDisponible(
+                fecha=inicio.date(),
+                hora_inicio=hora_inicio,
+                hora_fin=hora_fin,
+                profesional_id=profesional['id'],
+                disponible=True
+            )
+            for inicio, hora_inicio, hora_fin in horarios
+        ]
+        
+        return ProximosHorariosResponse(
+            profesional_id=profesional['id'],
+            nombre_profesional=f"{profesional['nombre']} {profesional['apellido']}",
+            especialidad=profesional['especialidad'],
+            horarios=encontrados,
+            total_encontrados=len(encontrados)
+        )
+    
+    def _horarios_mapa(self, mapa: MapaOcupacion, profesional_id: int, no_antes_de: datetime, dias_omitidos: Optional[Tuple[date, int]] = None) -> Iterator[Tuple[datetime, str, str]]:
+        """
+        Horarios libres del mapa a partir de `no_antes_de`. Con `dias_omitidos=(dia_objetivo, radio)`
+        se saltan los días que ya se recorrieron en una vuelta anterior de la búsqueda por cercanía.
+        """
+        for fecha, libres in mapa.dias(profesional_id):
+            if dias_omitidos and abs((fecha - dias_omitidos[0]).days) <= dias_omitidos[1]:
+                continue
+            for horario in self._horarios_mascara(mapa.grilla(profesional_id, fecha), fecha, libres):
+                if horario[0] >= no_antes_de:
+                    yield horario
+    
+    def _ventanas_cercanas(self, objetivo: datetime, no_antes_de: datetime, dias_maximos: int) -> Iterator[Tuple[Optional[date], Optional[date], int, Optional[timedelta]]]:
+        """
+        Ventanas de la búsqueda por cercanía, cada una del doble de días que la anterior.
+        Entrega (desde, hasta, radio ya cubierto antes de esta vuelta, distancia garantizada al terminarla);
+        desde/hasta son None si la ventana queda entera antes de `no_antes_de`. Una distancia None
+        indica que se llegó a `dias_maximos` y ya se puede entregar todo.
+        """
+        dia_objetivo = objetivo.date()
+        dia_minimo = no_antes_de.date()
+        radio_cubierto = -1
+        tamano = DIAS_BLOQUE_BUSQUEDA
+        
+        while radio_cubierto < dias_maximos:
+            radio = min(radio_cubierto + tamano, dias_maximos)
+            desde = max(dia_objetivo - timedelta(days=radio), dia_minimo)
+            hasta = dia_objetivo + timedelta(days=radio)
+            
+            # Distancia hasta la que ya se conocen todos los horarios
+            inicio_cubierto = datetime.combine(dia_objetivo - timedelta(days=radio), time.min, tzinfo=timezone.utc)
+            fin_cubierto = datetime.combine(hasta + timedelta(days=1), time.min, tzinfo=timezone.utc)
+            garantizada = fin_cubierto - objetivo
+            if inicio_cubierto > no_antes_de:
+                garantizada = min(garantizada, objetivo - inicio_cubierto)
+            if radio >= dias_maximos:
+                garantizada = None
             
-            current_time += duracion_cita
+            if hasta >= desde:
+                yield desde, hasta, radio_cubierto, garantizada
+            else:
+                yield None, None, radio_cubierto, garantizada
+            radio_cubierto = radio
+            tamano *= 2
+    
+    def _agrupar_grillas(self, plantilla: PlantillaSemanal) -> List[GrillaCompacta]:
+        """Grillas distintas de la plantilla, cada una enviada una sola vez con los días de la semana que la usan"""
+        grillas = {}
+        for dia_semana in plantilla.dias_laborales:
+            grilla = plantilla.grilla(dia_semana)
+            grillas.setdefault(id(grilla), (grilla, []))[1].append(dia_semana)
+        return [
+            GrillaCompacta(
+                dias_semana=dias_semana,
+                duracion_minutos=grilla.duracion,
+                horarios=[hora_inicio for hora_inicio, _ in grilla.etiquetas]
+            )
+            for grilla, dias_semana in grillas.values()
+        ]
+    
+    def _horarios_mascara(self, grilla: GrillaHorarios, fecha: date, libres: int) -> Iterator[Tuple[datetime, str, str]]:
+        """Horarios libres de un día como (inicio en UTC, hora_inicio, hora_fin); solo se desplazan los minutos precalculados"""
+        medianoche = datetime.combine(fecha, time.min, tzinfo=timezone.utc)
+        for indice in grilla.indices(libres):
+            hora_inicio, hora_fin = grilla.etiquetas[indice]
+            yield medianoche + timedelta(minutes=grilla.inicios[indice]), hora_inicio, hora_fin
+    
+    def _normalizar_utc(self, momento: datetime) -> datetime:
+        if momento.tzinfo is None:
+            return momento.replace(tzinfo=timezone.utc)
+        return momento.astimezone(timezone.utc)
+    
+    def _construir_mapa(self, profesionales: List[Dict[str, Any]], intervalos: Dict[int, Dict[date, List[Tuple[int, int]]]], fecha_inicio: date, fecha_fin: date) -> MapaOcupacion:
+        plantillas = {p['id']: self.obtener_plantilla(p) for p in profesionales}
+        return MapaOcupacion.construir_desde_intervalos(intervalos, fecha_inicio, fecha_fin, plantillas)
+    
+    def obtener_plantilla(self, profesional: Dict[str, Any]) -> PlantillaSemanal:
+        """
+        Plantilla semanal compilada del profesional. Se guarda junto con una firma de su `horario_laboral`,
+        así que si el horario cambia en la base de datos se recompila en la siguiente consulta.
+        """
+        horario = profesional.get('horario_laboral')
+        firma = json.dumps(horario, sort_keys=True, default=str) if horario else None
+        guardada = cache_plantillas.obtener(profesional['id'])
+        if guardada is not None and guardada[0] == firma:
+            return guardada[1]
         
+        try:
+            plantilla = compilar_plantilla(horario)
+        except (ValueError, TypeError) as e:
+            logger.error(f"Horario laboral inválido para profesional {profesional['id']}, se usa el estándar: {e}")
+            plantilla = PLANTILLA_ESTANDAR
+        cache_plantillas.guardar(profesional['id'], (firma, plantilla))
+        return plantilla
+    
+    def _intervalos_en_cache(self, profesional_ids: List[int], fecha_inicio: date, fecha_fin: date) -> Tuple[Dict[int, Dict[date, List[Tuple[int, int]]]], Dict[int, List[date]]]:
+        """Intervalos ocupados que ya están en el cache de disponibilidad y días que faltan por profesional"""
+        dias = [fecha_inicio + timedelta(days=n) for n in range((fecha_fin - fecha_inicio).days + 1)]
+        intervalos = {}
+        faltantes = {}
+        for profesional_id in profesional_ids:
+            por_dia = {}
+            for dia in dias:
+                valor = cache_disponibilidad.obtener((profesional_id, dia))
+                if valor is None:
+                    faltantes.setdefault(profesional_id, []).append(dia)
+                else:
+                    por_dia[dia] = valor
+            intervalos[profesional_id] = por_dia
+        return intervalos, faltantes
+    
+    def _rango_faltantes(self, faltantes: Dict[int, List[date]]) -> Tuple[datetime, datetime]:
+        desde = min(dias_faltantes[0] for dias_faltantes in faltantes.values())
+        hasta = max(dias_faltantes[-1] for dias_faltantes in faltantes.values())
+        return datetime.combine(desde, time.min), datetime.combine(hasta, time.max)
+    
+    def _completar_intervalos(self, intervalos: Dict[int, Dict[date, List[Tuple[int, int]]]], faltantes: Dict[int, List[date]], citas_por_profesional: Dict[int, List[Dict[str, Any]]], version: int):
+        """Agregar los días consultados a los intervalos y al cache (salvo que hubo escrituras desde `version`)"""
+        for profesional_id, dias_faltantes in faltantes.items():
+            por_dia = agrupar_intervalos_por_dia(citas_por_profesional.get(profesional_id, []))
+            for dia in dias_faltantes:
+                intervalos_dia = por_dia.get(dia, [])
+                intervalos[profesional_id][dia] = intervalos_dia
+                cache_disponibilidad.guardar((profesional_id, dia), intervalos_dia, version)
+    
+    def _construir_horarios(self, mapa: MapaOcupacion, profesional_id: int, solo_disponibles: bool = False) -> List[HorarioDisponible]:
+        """Convertir las máscaras de un profesional en la lista de horarios de la respuesta"""
+        horarios = []
+        for fecha, libres in mapa.dias(profesional_id):
+            grilla = mapa.grilla(profesional_id, fecha)
+            indices = grilla.indices(libres) if solo_disponibles else range(len(grilla))
+            for indice in indices:
+                hora_inicio, hora_fin = grilla.etiquetas[indice]
+                horarios.append(HorarioDisponible(
+                    fecha=fecha,
+                    hora_inicio=hora_inicio,
+                    hora_fin=hora_fin,
+                    profesional_id=profesional_id,
+                    disponible=bool(libres >> indice & 1)
+                ))
         return horarios
     
-    def _verificar_disponibilidad_horario(self, profesional_id: int, horario: datetime, citas_existentes: List[Dict[str, Any]]) -> bool:
-        for cita in citas_existentes:
-            cita_inicio = datetime.fromisoformat(cita['fecha_cita'].replace('Z', '+00:00'))
-            cita_duracion = timedelta(minutes=cita.get('duracion_minutos', 30))
-            cita_fin = cita_inicio + cita_duracion
-            
-            # Verificar superposición
-            if horario < cita_fin and (horario + timedelta(minutes=30)) > cita_inicio:
-                return False
+    # ------------------------------------------------------------ operaciones
+    
+    @_operacion
+    def obtener_horarios_disponibles(self, profesional_id: int, fecha_inicio: date = None, fecha_fin: date = None, solo_disponibles: bool = False) -> Plan[DisponibilidadResponse]:
+        profesional, fecha_inicio, fecha_fin = yield from self._preparar_consulta(profesional_id, fecha_inicio, fecha_fin)
+        
+        # Calcular la ocupación como máscaras y construir los horarios solo al responder
+        mapa = yield from self._mapa_ocupacion([profesional], fecha_inicio, fecha_fin)
+        return self._armar_horarios(profesional, fecha_inicio, fecha_fin, mapa, solo_disponibles)
+    
+    @_operacion
+    def obtener_disponibilidad_compacta(self, profesional_id: int, fecha_inicio: date = None, fecha_fin: date = None, solo_disponibles: bool = False) -> Plan[DisponibilidadCompactaResponse]:
+        """
+        Misma consulta que obtener_horarios_disponibles, pero enviando la grilla una sola vez
+        y cada día como una máscara de bits de horarios libres.
+        """
+        profesional, fecha_inicio, fecha_fin = yield from self._preparar_consulta(profesional_id, fecha_inicio, fecha_fin)
+        mapa = yield from self._mapa_ocupacion([profesional], fecha_inicio, fecha_fin)
+        return self._armar_compacta(profesional, fecha_inicio, fecha_fin, mapa, solo_disponibles)
+    
+    @_operacion
+    def obtener_horarios_paginados(self, profesional_id: int, fecha_inicio: date = None, fecha_fin: date = None, dias_por_pagina: int = DIAS_POR_PAGINA, cursor: Optional[str] = None, solo_disponibles: bool = False) -> Plan[DisponibilidadPaginadaResponse]:
+        """
+        Disponibilidad de rangos largos (hasta DIAS_MAXIMOS_PAGINADO días) calculada por páginas de días.
+        Cada respuesta trae un cursor opaco para la página siguiente; concatenar todas las páginas
+        da el mismo resultado que obtener_horarios_disponibles sobre el rango completo.
+        """
+        fecha_inicio, fecha_fin, dias_por_pagina, solo_disponibles = self._leer_paginacion(
+            profesional_id, fecha_inicio, fecha_fin, dias_por_pagina, cursor, solo_disponibles
+        )
+        profesional, fecha_inicio, fecha_fin = yield from self._preparar_consulta(
+            profesional_id, fecha_inicio, fecha_fin, DIAS_MAXIMOS_PAGINADO
+        )
+        
+        fin_pagina = min(fecha_inicio + timedelta(days=dias_por_pagina - 1), fecha_fin)
+        mapa = yield from self._mapa_ocupacion([profesional], fecha_inicio, fin_pagina)
+        return self._armar_pagina(profesional, fecha_inicio, fin_pagina, fecha_fin, mapa, dias_por_pagina, solo_disponibles)
+    
+    @_operacion
+    def buscar_bloques_libres(self, profesional_id: int, duracion_minutos: int, fecha_inicio: date = None, fecha_fin: date = None, limite: Optional[int] = None, paso_minutos: Optional[int] = None) -> Plan[BloquesLibresResponse]:
+        """Buscar los inicios donde cabe un bloque continuo libre de `duracion_minutos`"""
+        if duracion_minutos <= 0:
+            raise HTTPException(status_code=400, detail="La duración debe ser mayor a 0 minutos")
+        profesional, fecha_inicio, fecha_fin = yield from self._preparar_consulta(profesional_id, fecha_inicio, fecha_fin)
+        
+        intervalos = (yield from self._intervalos([profesional_id], fecha_inicio, fecha_fin))[profesional_id]
+        return self._armar_bloques(profesional, duracion_minutos, fecha_inicio, fecha_fin, intervalos, limite, paso_minutos)
+    
+    @_operacion
+    def obtener_horarios_libres_dia(self, profesional_id: int, fecha: date) -> Plan[Dict[str, Any]]:
+        """
+        Obtener solo los horarios libres de un profesional en una fecha, sin construir modelos de respuesta.
+        """
+        profesional = yield from self._profesional(profesional_id)
+        
+        mapa = yield from self._mapa_ocupacion([profesional], fecha, fecha)
+        return {
+            'profesional': profesional,
+            'horarios': mapa.horarios(profesional_id, fecha)
+        }
+    
+    @_operacion
+    def obtener_profesionales_disponibles(self, fecha: date, hora: str, profesional_ids: Optional[List[int]] = None, especialidad: Optional[str] = None) -> Plan[ProfesionalesDisponiblesResponse]:
+        """
+        Obtener los profesionales activos libres en una fecha y hora.
+        Usa una consulta para los profesionales y otra para las citas de todos ellos.
+        """
+        hora = self._normalizar_hora(hora)
+        activos = yield Consulta(self.repositorio_profesionales.obtener_profesionales_activos)
+        profesionales = self._filtrar_profesionales(activos, profesional_ids, especialidad)
+        mapa = (yield from self._mapa_ocupacion(profesionales, fecha, fecha)) if profesionales else None
+        return self._armar_profesionales_disponibles(fecha, hora, profesionales, mapa)
+    
+    @_operacion
+    def obtener_disponibilidad_especialidad(self, especialidad: str, fecha_inicio: date = None, fecha_fin: date = None, limite: Optional[int] = None) -> Plan[DisponibilidadEspecialidadResponse]:
+        """
+        Horarios libres de todos los profesionales activos de una especialidad, en un solo listado
+        ordenado por fecha y hora. Son dos consultas en total: profesionales y citas de todos ellos.
+        """
+        fecha_inicio, fecha_fin = self._validar_rango_especialidad(fecha_inicio, fecha_fin)
+        profesionales = yield Consulta(self.repositorio_profesionales.obtener_profesionales_por_especialidad, especialidad)
+        mapa = (yield from self._mapa_ocupacion(profesionales, fecha_inicio, fecha_fin)) if profesionales else None
+        return self._armar_especialidad(especialidad, profesionales, fecha_inicio, fecha_fin, mapa, limite)
+    
+    @_operacion
+    def sugerir_horarios(self, fecha: date, hora: str, profesional_id: Optional[int] = None, cantidad: int = 5, dias_ventana: int = DIAS_VENTANA_SUGERENCIAS, misma_especialidad: bool = True) -> Plan[SugerenciasResponse]:
+        """
+        Los `cantidad` horarios libres más cercanos a la fecha y hora pedidas dentro de ±`dias_ventana` días:
+        primero los del profesional pedido y, si no alcanzan, los de los demás profesionales activos.
+        Son a lo sumo tres consultas: profesionales activos, citas del pedido y citas de los demás.
+        """
+        hora = self._normalizar_hora(hora)
+        objetivo, no_antes_de, desde, hasta = self._ventana_sugerencias(fecha, hora, dias_ventana)
+        activos = yield Consulta(self.repositorio_profesionales.obtener_profesionales_activos)
+        solicitado, otros = self._separar_solicitado(activos, profesional_id, misma_especialidad)
+        
+        cercanos = []
+        if desde <= hasta:
+            if solicitado:
+                mapa = yield from self._mapa_ocupacion([solicitado], desde, hasta)
+                cercanos = self._horarios_cercanos(mapa, [solicitado], objetivo, no_antes_de, cantidad)
+            if len(cercanos) < cantidad and otros:
+                mapa = yield from self._mapa_ocupacion(otros, desde, hasta)
+                cercanos += self._horarios_cercanos(mapa, otros, objetivo, no_antes_de, cantidad - len(cercanos))
+        return self._armar_sugerencias(fecha, hora, profesional_id, cercanos, activos)
+    
+    @_operacion
+    def buscar_primer_dia_disponible(self, profesional_id: int, minimo_libres: int = 1, fecha_inicio: date = None, fecha_fin: date = None) -> Plan[PrimerDiaDisponibleResponse]:
+        """Primer día del rango (por defecto 4 semanas desde hoy) con al menos `minimo_libres` horarios libres"""
+        if minimo_libres < 1:
+            raise HTTPException(status_code=400, detail="minimo_libres debe ser mayor a 0")
+        profesional, fecha_inicio, fecha_fin = yield from self._preparar_consulta(profesional_id, fecha_inicio, fecha_fin)
+        mapa = yield from self._mapa_ocupacion([profesional], fecha_inicio, fecha_fin)
+        return self._armar_primer_dia(profesional, minimo_libres, fecha_inicio, fecha_fin, mapa)
+    
+    @_operacion
+    def buscar_proximos_horarios(self, profesional_id: int, cantidad: int = 5, desde: Optional[datetime] = None, alrededor_de: Optional[datetime] = None, dias_maximos: int = DIAS_MAXIMOS_BUSQUEDA) -> Plan[ProximosHorariosResponse]:
+        """
+        Buscar los próximos `cantidad` horarios libres de un profesional sin construir todo el rango.
+        Con `alrededor_de` se ordenan por cercanía a esa fecha y hora en lugar de cronológicamente.
+        """
+        profesional = yield from self._profesional(profesional_id)
+        
+        desde = self._normalizar_utc(desde) if desde else datetime.now(timezone.utc)
+        if alrededor_de:
+            recorrido = self._recorrer_horarios_cercanos(profesional, self._normalizar_utc(alrededor_de), desde, dias_maximos)
+        else:
+            recorrido = self._recorrer_horarios_libres(profesional, desde, dias_maximos)
+        
+        return self._armar_proximos(profesional, (yield from self._tomar(recorrido, cantidad)))
+    
+    # ------------------------------------------------------------ pasos con lecturas
+    
+    def _preparar_consulta(self, profesional_id: int, fecha_inicio: Optional[date], fecha_fin: Optional[date], dias_maximos: int = 60) -> Plan[Tuple[Dict[str, Any], date, date]]:
+        """Verificar el profesional y normalizar el rango de fechas de una consulta de disponibilidad"""
+        profesional = yield from self._profesional(profesional_id)
+        return (profesional, *self._validar_rango(fecha_inicio, fecha_fin, dias_maximos))
+    
+    def _profesional(self, profesional_id: int) -> Plan[Dict[str, Any]]:
+        return self._validar_profesional((yield Consulta(self.repositorio_profesionales.obtener_profesional, profesional_id)))
+    
+    def _recorrer_horarios_libres(self, profesional: Dict[str, Any], desde: datetime, dias_maximos: int) -> Iterator[Union[Consulta, Tuple[datetime, str, str]]]:
+        """
+        Recorrer hacia adelante los horarios libres a partir de `desde`.
+        Las citas se consultan por bloques que se duplican (7, 14, 28... días) a medida que se avanza.
+        """
+        inicio_bloque = desde.date()
+        limite = inicio_bloque + timedelta(days=dias_maximos)
+        tamano = DIAS_BLOQUE_BUSQUEDA
         
-        return True
\ No newline at end of file
+        while inicio_bloque <= limite:
+            fin_bloque = min(inicio_bloque + timedelta(days=tamano - 1), limite)
+            mapa = yield from self._mapa_ocupacion([profesional], inicio_bloque, fin_bloque)
+            yield from self._horarios_mapa(mapa, profesional['id'], desde)
+            inicio_bloque = fin_bloque + timedelta(days=1)
+            tamano *= 2
+    
+    def _recorrer_horarios_cercanos(self, profesional: Dict[str, Any], objetivo: datetime, no_antes_de: datetime, dias_maximos: int) -> Iterator[Union[Consulta, Tuple[datetime, str, str]]]:
+        """
+        Recorrer los horarios libres ordenados por distancia a `objetivo`, expandiendo la ventana
+        hacia ambos lados. Un horario se entrega solo cuando ya no puede aparecer otro más cercano.
+        """
+        candidatos = []
+        for desde, hasta, radio_cubierto, garantizada in self._ventanas_cercanas(objetivo, no_antes_de, dias_maximos):
+            if desde is not None:
+                mapa = yield from self._mapa_ocupacion([profesional], desde, hasta)
+                # Solo los días que no se habían cubierto en la vuelta anterior
+                for horario in self._horarios_mapa(mapa, profesional['id'], no_antes_de, (objetivo.date(), radio_cubierto)):
+                    heapq.heappush(candidatos, (abs(horario[0] - objetivo), horario))
+            
+            while candidatos and (garantizada is None or candidatos[0][0] <= garantizada):
+                yield heapq.heappop(candidatos)[1]
+    
+    def _tomar(self, recorrido: Iterator[Union[Consulta, Tuple[datetime, str, str]]], cantidad: int) -> Plan[List[Tuple[datetime, str, str]]]:
+        """Los primeros `cantidad` horarios de un recorrido, pasando sus lecturas al servicio; no lee más bloques que los necesarios"""
+        encontrados = []
+        valor = None
+        try:
+            while len(encontrados) < cantidad:
+                try:
+                    paso = recorrido.send(valor)
+                except StopIteration:
+                    break
+                if isinstance(paso, Consulta):
+                    valor = yield paso
+                else:
+                    valor = None
+                    encontrados.append(paso)
+        finally:
+            recorrido.close()
+        return encontrados
+    
+    def _mapa_ocupacion(self, profesionales: List[Dict[str, Any]], fecha_inicio: date, fecha_fin: date) -> Plan[MapaOcupacion]:
+        """
+        Construir las máscaras de horarios libres de varios profesionales (filas de `profesionales`)
+        con a lo sumo una consulta de citas, usando el horario laboral de cada uno.
+        """
+        intervalos = yield from self._intervalos([p['id'] for p in profesionales], fecha_inicio, fecha_fin)
+        return self._construir_mapa(profesionales, intervalos, fecha_inicio, fecha_fin)
+    
+    def _intervalos(self, profesional_ids: List[int], fecha_inicio: date, fecha_fin: date) -> Plan[Dict[int, Dict[date, List[Tuple[int, int]]]]]:
+        """
+        Intervalos ocupados por profesional y día, leídos del cache de disponibilidad.
+        Los días que faltan se consultan en bloque (una sola consulta para todos los profesionales).
+        """
+        intervalos, faltantes = self._intervalos_en_cache(profesional_ids, fecha_inicio, fecha_fin)
+        if faltantes:
+            version = cache_disponibilidad.version()
+            citas_por_profesional = yield Consulta(
+                self.repositorio_citas.obtener_citas_por_profesionales, list(faltantes), *self._rango_faltantes(faltantes)
+            )
+            self._completar_intervalos(intervalos, faltantes, citas_por_profesional, version)
+        return intervalos
+
+
+class ServicioDisponibilidad(BaseDisponibilidad):
+    """Disponibilidad sobre los repositorios síncronos, para las herramientas del asistente"""
+    def __init__(self, repositorio_citas: RepositorioCitas, repositorio_profesionales: RepositorioMedicos):
+        super().__init__(repositorio_citas, repositorio_profesionales)
+    
+    def _ejecutar(self, plan: Plan[Any]) -> Any:
+        valor = None
+        while True:
+            try:
+                consulta = plan.send(valor)
+            except StopIteration as fin:
+                return fin.value
+            valor = consulta.funcion(*consulta.argumentos)
+
+
+class ServicioDisponibilidadAsync(BaseDisponibilidad):
+    """
+    Misma API que ServicioDisponibilidad sobre los repositorios asíncronos, para los routers:
+    cada operación devuelve una corrutina.
+    """
+    def __init__(self, repositorio_citas: RepositorioCitasAsync, repositorio_profesionales: RepositorioMedicosAsync):
+        super().__init__(repositorio_citas, repositorio_profesionales)
+    
+    async def _ejecutar(self, plan: Plan[Any]) -> Any:
+        valor = None
+        while True:
+            try:
+                consulta = plan.send(valor)
+            except StopIteration as fin:
+                return fin.value
+            valor = await consulta.funcion(*consulta.argumentos)
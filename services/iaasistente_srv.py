@@ -1,126 +1,248 @@
 from crewai import LLM, Agent, Task, Crew, Process
-from groq import Groq
-from typing import Dict, Any
-import json
-from datetime import date, timedelta
+from crewai.crews.crew_output import CrewOutput
+from crewai.llms.base_llm import BaseLLM
+from typing import Dict, Any, Callable, Optional, List, Iterator, Tuple, Union
+from contextlib import contextmanager
+import copy
+import queue
+import re
+import threading
+from datetime import date, datetime
 import logging
 from ai.tools import (
     BuscarProfesionalTool,
     ObtenerProfesionalesTool,
     ObtenerHorariosTool,
+    BuscarProximosHorariosTool,
+    SugerirHorariosTool,
+    BuscarBloquesLibresTool,
+    BuscarHorariosEspecialidadTool,
     BuscarDisponibleTool,
     CrearCitaTool,
-    VerificarPacienteTool
+    VerificarPacienteTool,
+    receptor_eventos,
+    memo_ejecucion,
+    MemoEjecucion,
+    crear_cita_medica,
+    obtener_profesionales_activos,
+    obtener_servicio_disponibilidad,
+    emitir_evento
 )
+from ai.prompts import obtener_plantilla
+from ai.salida import extraer_respuesta, extraer_respuesta_parcial
+from schemas.iaasistente_sch import AssistantResponse
+from ai.intencion import interpretar_solicitud, interpretar_consulta, interpretar_seguimiento, pide_reserva, es_pregunta
 from config import settings
+from utils.ejecutor import EjecutorAcotado
+from utils.consumo import RegistroConsumoLLM
+from utils.cache import CacheLRU
+from utils.sesiones import AlmacenSesiones, AlmacenSesionesMemoria
+from services.disponibilidad_srv import al_invalidar_disponibilidad, DIAS_VENTANA_SUGERENCIAS
+from repositories.medicos_rep import al_invalidar_profesionales
 import os
 os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY", "dummy")
 
 logger = logging.getLogger(__name__)
 
-class ServicioAssistant:
-    def __init__(self):
-        self.groq_client = Groq(api_key=settings.GROQ_API_KEY)
-        
+# Pool exclusivo del asistente: una ráfaga de conversaciones con Groq no consume los hilos del resto de la API
+ejecutor_assistant = EjecutorAcotado(
+    max_hilos=settings.ASSISTANT_MAX_WORKERS,
+    max_cola=settings.ASSISTANT_MAX_QUEUE,
+    nombre="assistant",
+    reintentar_en_defecto=settings.ASSISTANT_RETRY_AFTER_SECONDS
+)
+
+class PoolAgentes:
+    """
+    Componentes del asistente que se construyen una sola vez por proceso: el LLM, las herramientas
+    y hasta `max_agentes` agentes. crewAI guarda en el agente el estado de la ejecución en curso
+    (crew, executor, resultados de herramientas), así que cada agente se presta a una ejecución a la vez.
+    """
+    
+    def __init__(self, max_agentes: int, fabrica_llm: Optional[Callable[[], BaseLLM]] = None, version_prompt: Optional[str] = None):
+        self.max_agentes = max_agentes
+        self.plantilla = obtener_plantilla(version_prompt or settings.ASSISTANT_PROMPT_VERSION)
+        self._fabrica_llm = fabrica_llm or self._crear_llm
+        self._lock = threading.Lock()
+        self._libres: "queue.LifoQueue[Agent]" = queue.LifoQueue()
+        self._creados = 0
+        self._llm: Optional[BaseLLM] = None
+        self._herramientas: Optional[List] = None
+    
+    def _crear_llm(self) -> BaseLLM:
+        return LLM(
+            model=settings.AI_MODEL_NAME,
+            api_key=settings.GROQ_API_KEY,
+            temperature=0.1
+        )
+    
+    def llm(self) -> BaseLLM:
+        with self._lock:
+            if self._llm is None:
+                self._llm = self._fabrica_llm()
+            return self._llm
+    
+    def herramientas(self) -> List:
+        # Las herramientas no guardan estado por ejecución; todos los agentes comparten las mismas instancias
+        with self._lock:
+            if self._herramientas is None:
+                self._herramientas = [
+                    BuscarProfesionalTool(),
+                    ObtenerProfesionalesTool(),
+                    ObtenerHorariosTool(),
+                    BuscarProximosHorariosTool(),
+                    SugerirHorariosTool(),
+                    BuscarBloquesLibresTool(),
+                    BuscarHorariosEspecialidadTool(),
+                    BuscarDisponibleTool(),
+                    CrearCitaTool(),
+                    VerificarPacienteTool()
+                ]
+            return self._herramientas
+    
+    @contextmanager
+    def prestar(self) -> Iterator[Agent]:
+        """Tomar un agente libre (o crear uno si no se llegó a `max_agentes`) y devolverlo al terminar"""
+        agente = self._tomar()
+        try:
+            yield agente
+        finally:
+            agente.tools_results = []
+            self._libres.put(agente)
+    
+    def precalentar(self, cantidad: int = 1):
+        """Construir por adelantado hasta `cantidad` agentes para que la primera solicitud no pague el costo"""
+        agentes = []
+        while len(agentes) < cantidad:
+            with self._lock:
+                if self._creados >= self.max_agentes:
+                    break
+                self._creados += 1
+            agentes.append(self.crear_agente_asistente())
+        for agente in agentes:
+            self._libres.put(agente)
+    
+    def estadisticas(self) -> Dict[str, Any]:
+        return {
+            "max_agentes": self.max_agentes,
+            "agentes_creados": self._creados,
+            "agentes_libres": self._libres.qsize()
+        }
+    
+    def consumo(self, agente: Agent) -> Dict[str, int]:
+        """
+        Tokens y vueltas con el LLM acumulados por el agente. crewAI los suma en el agente (el LLM es
+        compartido), y como cada agente atiende una ejecución a la vez, la diferencia entre antes y
+        después de una ejecución es lo que consumió esa solicitud.
+        """
+        resumen = agente._token_process.get_summary()
+        return {
+            "prompt_tokens": resumen.prompt_tokens,
+            "completion_tokens": resumen.completion_tokens,
+            "llamadas_llm": resumen.successful_requests
+        }
+    
+    def _tomar(self) -> Agent:
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            crear = self._creados < self.max_agentes
+            if crear:
+                self._creados += 1
+        if not crear:
+            return self._libres.get()
+        try:
+            return self.crear_agente_asistente()
+        except Exception:
+            with self._lock:
+                self._creados -= 1
+            raise
+    
     def crear_agente_asistente(self) -> Agent:
-        """Crear el agente asistente con todas las herramientas"""
-        
-        # Inicializar herramientas
-        herramientas = [
-            # BuscarProfesionalTool(),
-            ObtenerProfesionalesTool(),
-            ObtenerHorariosTool(),
-            BuscarDisponibleTool(),
-            CrearCitaTool(),
-            VerificarPacienteTool()
-        ]
+        """Crear el agente asistente con el LLM y las herramientas compartidos"""
         
         agente = Agent(
-            role='Asistente Médico Senior',
-            goal="""Agendar citas médicas de forma eficiente, precisa y segura. 
-                Prioriza la verificación mediante las herramientas disponibles, evita cualquier invención 
-                de nombres o IDs, y siempre devuelve la respuesta final en el JSON requerido.
-            """,
-            backstory="""Eres un Asistente Médico Senior virtual, profesional, preciso y orientado a procedimientos. 
-            Tu objetivo es ayudar a pacientes a verificar disponibilidad y agendar citas médicas utilizando
-            exclusivamente las herramientas autorizadas (por ejemplo: buscar_profesional_por_nombre,
-            obtener_profesionales_activos, obtener_horarios_disponibles, crear_cita_medica, verificar_paciente).
-
-            Reglas de comportamiento (seguir al pie de la letra):
-            - NUNCA inventes nombres, apellidos, IDs, horarios o resultados. Usa únicamente los valores
-            que devuelvan las herramientas.
-            - Si una herramienta devuelve "No se encontraron profesionales" o una lista vacía, detén
-            inmediatamente el proceso y retorna el JSON final indicando el error (cita_creada: false).
-            - Si un nombre produce múltiples coincidencias, NO escojas por tu cuenta: informa la ambigüedad
-            y solicita aclaración en el campo "mensaje" (detén el flujo).
-            - Tras obtener un profesional_id, valida INMEDIATAMENTE la disponibilidad para la fecha solicitada
-            llamando a obtener_horarios_disponibles(profesional_id, fecha). Si la hora solicitada no está
-            disponible, detén el proceso y devuelve hasta 5 sugerencias cercanas basadas en las salidas
-            de las herramientas (no inventadas).
-            - Si paciente_id no está presente, no crees la cita; solo informas disponibilidad y dejas cita_creada:false.
-            - La salida FINAL debe ser siempre un JSON con las keys obligatorias:
-            nombre_doctor, fecha (YYYY-MM-DD), hora (HH:MM), profesional_id, disponible (bool),
-            cita_creada (bool), cita_id (int|null), mensaje (str).
-            - El mensaje debe ser claro, explicar la acción tomada o la razón por la cual no se pudo completar
-            la solicitud, e incluir las sugerencias cuando apliquen.
-            - Si ocurre un error de herramienta o fallo inesperado, devuelve un JSON válido con cita_creada:false
-            y un mensaje explicativo (no caigas en respuestas incompletas ni en texto libre sin JSON).
-
-            Tono: profesional, directo y empático. Prioriza seguridad y precisión por encima de completar acciones
-            sin confirmación. Si se requiere interacción adicional con el usuario (por ejemplo aclarar nombre),
-            menciona exactamente qué información falta en el campo "mensaje".
-            """,
-            tools=herramientas,
+            role=self.plantilla.rol,
+            goal=self.plantilla.objetivo,
+            backstory=self.plantilla.historia,
+            tools=self.herramientas(),
             verbose=True,
             allow_delegation=False,
-            # llm=self._get_llm()
-            llm= LLM(
-                model=settings.AI_MODEL_NAME,
-                api_key=settings.GROQ_API_KEY,
-                temperature=0.1
-            ),
-            max_iter = 5
+            llm=self.llm(),
+            max_iter = 5,
+            # El agente vive en el pool: su cache de herramientas duraría entre solicitudes y no se invalida
+            # al crear citas. Dentro de una ejecución lo reemplaza MemoEjecucion
+            cache=False
         )
         
         return agente
 
+
+# Un agente por hilo del pool del asistente: nunca hay más ejecuciones simultáneas que agentes
+pool_agentes = PoolAgentes(max_agentes=settings.ASSISTANT_MAX_WORKERS)
+
+registro_consumo = RegistroConsumoLLM()
+
+# Respuestas del asistente que no agendaron, por (profesional_id, fecha, hora, con_paciente, version_prompt)
+cache_respuestas_assistant = CacheLRU(
+    max_entradas=settings.ASSISTANT_RESPONSE_CACHE_MAX_ENTRIES,
+    ttl_segundos=settings.ASSISTANT_RESPONSE_CACHE_TTL_SECONDS
+)
+
+@al_invalidar_disponibilidad
+def invalidar_respuestas_assistant(profesional_id: int, dias: Optional[List[date]]):
+    """
+    Descartar las respuestas afectadas por un cambio de agenda. Las sugerencias incluyen otros profesionales
+    y días cercanos, así que se descarta toda respuesta cuya ventana de sugerencias contiene un día afectado.
+    """
+    if dias is None:
+        cache_respuestas_assistant.limpiar()
+        return
+    cache_respuestas_assistant.invalidar_si(
+        lambda clave: any(abs((clave[1] - dia).days) <= DIAS_VENTANA_SUGERENCIAS for dia in dias)
+    )
+
+@al_invalidar_profesionales
+def descartar_respuestas_assistant():
+    """Un profesional nuevo, editado o desactivado puede cambiar cualquier respuesta guardada"""
+    cache_respuestas_assistant.limpiar()
+
+# Conversaciones en curso: profesional, fecha y horarios ya resueltos y un resumen de los últimos turnos
+almacen_sesiones = AlmacenSesionesMemoria(
+    max_entradas=settings.ASSISTANT_SESSION_MAX_ENTRIES,
+    ttl_segundos=settings.ASSISTANT_SESSION_TTL_SECONDS
+)
+
+# Turnos que se conservan en el resumen de la sesión y largo máximo de cada línea
+TURNOS_RESUMEN_SESION = 3
+LARGO_LINEA_RESUMEN = 200
+
+
+class ServicioAssistant:
+    def __init__(self, pool: PoolAgentes = None, sesiones: AlmacenSesiones = None):
+        self.pool = pool or pool_agentes
+        self.sesiones = sesiones or almacen_sesiones
     
-    def procesar_solicitud(self, mensaje: str, paciente_id: int = None) -> Dict[str, Any]:
-        """Procesar la solicitud del usuario usando crewAI"""
+    def procesar_solicitud(self, mensaje: str, paciente_id: int = None, al_evento: Optional[Callable[[str, Dict[str, Any]], None]] = None, sesion_id: Optional[str] = None, crear_sesion: bool = True) -> Dict[str, Any]:
+        """
+        Procesar la solicitud del usuario usando crewAI.
+        `al_evento(tipo, datos)` recibe el progreso de las herramientas (modo trabajo del asistente).
+        Con `sesion_id` continúa la conversación anterior; la respuesta trae el id de la sesión a usar.
+        Con `crear_sesion=False` solo se continúa una sesión existente y, si no la hay, sesion_id es None.
+        """
+        token_eventos = receptor_eventos.set(al_evento)
+        token_memo = memo_ejecucion.set(MemoEjecucion())
+        sesion = None
         try:
-            # Crear agente y tarea
-            agente = self.crear_agente_asistente()
-            
-            tarea = Task(
-                description=self._crear_descripcion_tarea(mensaje, paciente_id),
-                agent=agente,
-                expected_output="""Un JSON con el siguiente formato exacto:
-                {
-                    "nombre_doctor": "Nombre del doctor",
-                    "fecha": "YYYY-MM-DD",
-                    "hora": "HH:MM",
-                    "profesional_id": id_del_profesional,
-                    "disponible": true/false,
-                    "cita_creada": true/false,
-                    "cita_id": id_de_la_cita_si_se_creo,
-                    "mensaje": "Mensaje detallado al usuario"
-                }"""
-            )
-            
-            # Crear crew y ejecutar
-            crew = Crew(
-                agents=[agente],
-                tasks=[tarea],
-                process=Process.sequential,
-                verbose=True
-            )
-            
-            resultado = crew.kickoff()
-            
-            # Parsear la respuesta
-            final_result = self._parsear_respuesta_crewai(str(resultado))
-            return final_result
-            
+            sesion = self._abrir_sesion(sesion_id, paciente_id, crear_sesion)
+            respuesta = self._responder(mensaje, paciente_id, sesion)
+            if sesion is None:
+                return {**respuesta, "sesion_id": None}
+            self._cerrar_sesion(sesion, mensaje, respuesta)
+            return {**respuesta, "sesion_id": sesion["sesion_id"]}
+
         except Exception as e:
             logger.error(f"Error procesando solicitud del asistente: {e}")
             return {
@@ -131,124 +253,247 @@ class ServicioAssistant:
                 "disponible": False,
                 "cita_creada": False,
                 "cita_id": None,
-                "mensaje": f"Error procesando la solicitud: {str(e)}"
+                "mensaje": f"Error procesando la solicitud: {str(e)}",
+                "sesion_id": sesion["sesion_id"] if sesion else sesion_id
             }
+        finally:
+            memo = memo_ejecucion.get()
+            if memo.aciertos or memo.fallos:
+                logger.info(f"Memo de herramientas del asistente: {memo.estadisticas()}")
+            memo_ejecucion.reset(token_memo)
+            receptor_eventos.reset(token_eventos)
     
-    def _crear_descripcion_tarea(self, mensaje: str, paciente_id: int = None) -> str:
-        """Crear la descripción de la tarea para el agente"""
+    def _responder(self, mensaje: str, paciente_id: int = None, sesion: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        resultado_rapido = self._via_rapida(mensaje, paciente_id, sesion)
+        if resultado_rapido:
+            return resultado_rapido
         
-        descripcion = f"""
-            INFORMACIÓN DEL PACIENTE:
-            - ID del paciente: {paciente_id or "No especificado"}
-
-            SOLICITUD DEL USUARIO:
-            "{mensaje}"
-
-            INSTRUCCIONES CLAVE (leer con atención — seguir al pie de la letra):
-
-            0) FORMATO DE SALIDA OBLIGATORIO: siempre devolver un JSON con estas keys:
-            {{
-                "nombre_doctor": str,         # Nombre EXACTO proveniente ÚNICAMENTE de la lista de profesionales activos
-                "fecha": "YYYY-MM-DD",        # Fecha en formato ISO
-                "hora": "HH:MM",              # 24h (ej. "10:00")
-                "profesional_id": int,        # ID EXACTO proveniente ÚNICAMENTE de la lista de profesionales activos
-                "disponible": bool,
-                "cita_creada": bool,
-                "cita_id": int|null,
-                "mensaje": str                # Aquí se incluirán las 5 sugerencias si aplica
-            }}
-
-            1) Detectar información en el mensaje:
-            - Extraer nombre del doctor (nombre y/o apellido) si existe.
-            - Extraer fecha (convertir "hoy", "mañana", "el lunes", etc. a YYYY-MM-DD).
-            - Extraer hora (normalizar a formato HH:MM 24h).
-            -> Si no puedes identificar fecha/hora, indicarlo claramente en "mensaje" y terminar (cita_creada: false).
-
-            2) Si se menciona un doctor:
-            a) Llamar a buscar_profesional_por_nombre(nombre_detectado).
-            b) Si la herramienta devuelve error o lista vacía -> **DETENER**: retornar JSON con disponible:false, cita_creada:false y mensaje "No se encontró el doctor X".
-            c) Si la herramienta devuelve múltiples coincidencias:
-                - Intentar emparejar por coincidencia exacta (case-insensitive) con el nombre completo.
-                - Si queda ambigüedad -> **DETENER** y pedir aclaración en "mensaje" (no adivinar).
-            d) Si hay una sola coincidencia clara: tomar `profesional_id` y `nombre` EXACTOS tal como devuelve la herramienta.
-
-            3) VALIDACIÓN INMEDIATA DE HORARIO (nueva regla importante):
-            - Tras obtener `profesional_id` (ya sea porque el usuario pidió ese doctor o porque lo seleccionaste de la lista), **ANTES** de continuar:
-                1. Llamar `obtener_horarios_disponibles(profesional_id, fecha)` con la fecha solicitada.
-                2. Si la herramienta devuelve error o lista vacía -> **NO** continuar. Retornar JSON con:
-                    - "disponible": false
-                    - "cita_creada": false
-                    - "cita_id": null
-                    - "mensaje": explicar que no hay horarios en la fecha solicitada y **ofrecer hasta 5 sugerencias** cercanas (ver formato abajo).
-                3. Si la hora solicitada **no está** entre los horarios disponibles -> mismo comportamiento: detener y devolver hasta 5 sugerencias cercanas.
-                4. Si la hora está disponible -> continuar al paso 5.
-            - REGLA para las 5 sugerencias:
-                * Buscar disponibilidad en fechas cercanas a la solicitada (por ejemplo, rango ±7 días alrededor de la fecha solicitada).
-                * Recopilar las horas disponibles encontradas para ese `profesional_id` (o, si no hay suficientes, buscar en otros profesionales de la lista `obtener_profesionales_activos()` y devolver alternativas, siempre SIN inventar nombres ni IDs).
-                * Ordenar las opciones por cercanía a la fecha solicitada y devolver **hasta 5** opciones.
-                * Si no hay sugerencias suficientes, devolver las que existan y mencionarlo en el mensaje.
-                * Formato de cada sugerencia dentro del mensaje: "1) YYYY-MM-DD HH:MM — Dr. Nombre Apellido (ID: X)".
-
-            4) Si NO se menciona doctor:
-            a) Llamar a obtener_profesionales_activos().
-            b) Si la lista está vacía o la herramienta falla -> **DETENER** y retornar JSON con disponible:false, cita_creada:false y mensaje explicando la situación.
-            c) Si la lista contiene profesionales: **SELECCIONAR UNO Y SOLO UNO** de la lista (regla: elegir el primer profesional de la lista tal como fue devuelta). Usar ese profesional_id y nombre EXACTOS.
-            d) Antes de crear cita, aplicar la regla del paso 3 (validar horarios para ese profesional_id y la fecha solicitada). Si no hay disponibilidad, detener y devolver hasta 5 sugerencias (ver reglas arriba).
-
-            5) Crear cita:
-            - Si paciente_id está presente Y la hora fue validada como disponible -> llamar crear_cita_medica(paciente_id, profesional_id, fecha, hora).
-                * Si la creación falla -> retornar JSON con disponible:true, cita_creada:false y mensaje con el error.
-                * Si la creación succeed -> retornar JSON con cita_creada:true y cita_id devuelto por la herramienta.
-            - Si paciente_id NO está presente -> **NO crear** la cita. Retornar disponible:true/false según verificación y cita_creada:false con mensaje explicando que falta paciente_id para crear la cita.
-
-            6) REGLAS ABSOLUTAS (no negociables):
-            - Nunca inventar ni modificar nombres o IDs: solo usar valores EXACTOS retornados por las herramientas.
-            - Si alguna herramienta devuelve "No se encontraron profesionales", tratar eso como ausencia y detener el proceso.
-            - Si hay ambigüedad (múltiples profesionales para un nombre), pedir aclaración y detener.
-            - El campo "cita_creada" debe existir siempre: true si se creó, false en cualquier otro caso.
-            - Las 5 sugerencias deben estar contenidas en "mensaje" en formato legible (listas numeradas) y deben provenir exclusivamente de las salidas de las herramientas.
-            - Si se ofrecen sugerencias de otros profesionales, indicar el nombre y ID tal como aparecen en la herramienta.
-
-            EJEMPLOS (salida esperada):
-            - Si hora NO disponible y se generan sugerencias:
-            {{
-                "nombre_doctor": "Ana Martinez",
-                "fecha": "2025-10-27",
-                "hora": "10:00",
-                "profesional_id": 2,
-                "disponible": false,
-                "cita_creada": false,
-                "cita_id": null,
-                "mensaje": "La hora 10:00 del 2025-10-27 no está disponible. Sugerencias cercanas:\\n1) 2025-10-28 09:30 — Dr. Ana Martinez (ID: 2)\\n2) 2025-10-29 11:00 — Dr. Ana Martinez (ID: 2)\\n3) 2025-10-29 14:00 — Dr. Juan Pérez (ID: 5)\\n4) 2025-10-30 10:00 — Dr. Ana Martinez (ID: 2)\\n5) 2025-11-01 08:00 — Dr. Laura Gómez (ID: 8)"
-            }}
-
-            FECHAS DE REFERENCIA:
-            - Hoy: {date.today()}
-            - Mañana: {date.today() + timedelta(days=1)}
-            """
-
-        return descripcion
+        clave = self._clave_respuesta(mensaje, paciente_id)
+        if clave:
+            respuesta_guardada = cache_respuestas_assistant.obtener(clave)
+            if respuesta_guardada:
+                emitir_evento("respuesta_en_cache", {"profesional_id": clave[0], "fecha": clave[1].isoformat(), "hora": clave[2]})
+                return copy.deepcopy(respuesta_guardada)
+        # Si una cita cambia la agenda mientras corre el crew, la respuesta ya no se guarda
+        version_cache = cache_respuestas_assistant.version()
+        
+        # Solo la tarea y el crew se crean por solicitud; el agente, el LLM y las herramientas vienen del pool
+        with self.pool.prestar() as agente:
+            consumo_inicial = self.pool.consumo(agente)
+            try:
+                resultado = self._crear_crew(agente, mensaje, paciente_id, sesion).kickoff()
+            finally:
+                self._registrar_consumo(consumo_inicial, self.pool.consumo(agente))
+        
+        # Parsear la respuesta
+        final_result = self._parsear_respuesta_crewai(resultado)
+        if clave and self._respuesta_reutilizable(final_result, clave, paciente_id):
+            cache_respuestas_assistant.guardar(clave, copy.deepcopy(final_result), version_cache)
+        return final_result
+    
+    def _abrir_sesion(self, sesion_id: Optional[str], paciente_id: int = None, crear: bool = True) -> Optional[Dict[str, Any]]:
+        """Sesión a continuar, o una nueva (None si `crear` es False) si no se indicó, ya venció o es de otro paciente"""
+        if sesion_id:
+            sesion = self.sesiones.obtener(sesion_id)
+            if sesion and sesion.get("paciente_id") == paciente_id:
+                return sesion
+        if not crear:
+            return None
+        return self.sesiones.crear({
+            "paciente_id": paciente_id,
+            "profesional_id": None,
+            "nombre_doctor": None,
+            "fecha": None,
+            "hora": None,
+            "disponibilidad": None,
+            "cita_creada": False,
+            "cita_id": None,
+            "intento_reserva": False,
+            "resumen": []
+        })
+    
+    def _cerrar_sesion(self, sesion: Dict[str, Any], mensaje: str, respuesta: Dict[str, Any]):
+        """Guardar en la sesión lo que resolvió el turno y agregarlo al resumen de la conversación"""
+        resumen = sesion["resumen"] + [
+            f"Paciente: {mensaje}"[:LARGO_LINEA_RESUMEN],
+            f"Asistente: {respuesta.get('mensaje', '')}"[:LARGO_LINEA_RESUMEN]
+        ]
+        sesion["resumen"] = resumen[-2 * TURNOS_RESUMEN_SESION:]
+        # La conversación sigue siendo una reserva hasta que el paciente pasa a preguntar
+        sesion["intento_reserva"] = pide_reserva(mensaje) or (bool(sesion.get("intento_reserva")) and not es_pregunta(mensaje))
+        
+        profesional_id = respuesta.get("profesional_id") or 0
+        try:
+            fecha = date.fromisoformat(str(respuesta.get("fecha")))
+        except ValueError:
+            fecha = None
+        if profesional_id and fecha:
+            sesion.update(
+                profesional_id=profesional_id,
+                nombre_doctor=respuesta.get("nombre_doctor"),
+                fecha=fecha.isoformat(),
+                hora=respuesta.get("hora"),
+                cita_creada=bool(respuesta.get("cita_creada")),
+                cita_id=respuesta.get("cita_id") or sesion.get("cita_id")
+            )
+        self.sesiones.guardar(sesion)
+    
+    def _contexto_sesion(self, sesion: Dict[str, Any]) -> Optional[str]:
+        """
+        Texto con lo ya resuelto en la sesión para el prompt de seguimiento, o None si no hay nada resuelto.
+        Los horarios libres se releen (normalmente del cache de disponibilidad) para no ofrecer uno ya tomado.
+        """
+        if not sesion.get("profesional_id") or not sesion.get("fecha"):
+            return None
+        fecha = date.fromisoformat(sesion["fecha"])
+        lineas = [
+            f"- Profesional: {sesion['nombre_doctor']} (ID: {sesion['profesional_id']})",
+            f"- Fecha consultada: {sesion['fecha']}, hora: {sesion.get('hora') or 'sin hora'}"
+        ]
+        if fecha >= date.today():
+            libres = [
+                hora_inicio for hora_inicio, _ in
+                obtener_servicio_disponibilidad().obtener_horarios_libres_dia(sesion["profesional_id"], fecha)['horarios']
+            ]
+            sesion["disponibilidad"] = {"fecha": sesion["fecha"], "horarios": libres}
+            lineas.append(f"- Horarios libres del {sesion['fecha']}: {', '.join(libres) or 'ninguno'}")
+        if sesion.get("cita_creada"):
+            lineas.append(f"- En el turno anterior se creó la cita {sesion.get('cita_id')}")
+        if sesion.get("resumen"):
+            lineas.append("- Conversación:\n" + "\n".join(f"  {linea}" for linea in sesion["resumen"]))
+        return "\n".join(lineas)
+    
+    def _clave_respuesta(self, mensaje: str, paciente_id: int = None) -> Optional[Tuple]:
+        """
+        Clave de cache de la solicitud: profesional, fecha y hora ya resueltos (así "mañana a las 10" y
+        "2025-01-16 10:00" coinciden), si viene paciente y la versión del prompt. None si no es unívoca.
+        """
+        try:
+            intencion = interpretar_consulta(mensaje, obtener_profesionales_activos(), date.today())
+        except Exception as e:
+            logger.warning(f"No se pudo interpretar la consulta para el cache del asistente: {e}")
+            return None
+        if intencion is None:
+            return None
+        return (intencion.profesional['id'], intencion.fecha, intencion.hora, bool(paciente_id), self.pool.plantilla.version)
+    
+    def _respuesta_reutilizable(self, respuesta: Dict[str, Any], clave: Tuple, paciente_id: int = None) -> bool:
+        """
+        Solo se reutilizan respuestas que no cambiaron nada y que hablan del mismo profesional, fecha y hora
+        de la clave. Con paciente y horario disponible sin cita creada, la creación falló y se reintenta.
+        """
+        profesional_id, fecha, hora = clave[:3]
+        if respuesta.get("cita_creada") or respuesta.get("nombre_doctor") == "Error":
+            return False
+        if paciente_id and respuesta.get("disponible"):
+            return False
+        return (
+            respuesta.get("profesional_id") == profesional_id
+            and respuesta.get("fecha") == fecha.isoformat()
+            and respuesta.get("hora") == hora
+        )
     
-    def _parsear_respuesta_crewai(self, respuesta: str) -> Dict[str, Any]:
-        """Parsear la respuesta de crewAI al formato requerido"""
+    def _registrar_consumo(self, inicial: Dict[str, int], final: Dict[str, int]):
+        version = self.pool.plantilla.version
+        consumo = {campo: final[campo] - inicial[campo] for campo in final}
+        registro_consumo.registrar(version, consumo)
+        emitir_evento("consumo_llm", {"version_prompt": version, **consumo})
+        logger.info(f"Consumo del asistente con prompt {version}: {consumo}")
+    
+    def _via_rapida(self, mensaje: str, paciente_id: int = None, sesion: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Agendar sin llamar al LLM cuando el mensaje pide la cita con doctor, fecha y hora sin ambigüedad y el
+        horario está libre. En una sesión que intentaba reservar sin lograrlo, doctor y fecha pueden venir de
+        ella ("entonces a las 11"). Devuelve None en cualquier otro caso para que decida el agente.
+        """
+        if not settings.ASSISTANT_FAST_PATH_ENABLED or not paciente_id:
+            return None
         try:
-            # Buscar JSON en la respuesta
-            import re
-            json_match = re.search(r'\{[^{}]*\{.*\}[^{}]*\}|\{[^{}]*\}', respuesta, re.DOTALL)
+            profesionales = obtener_profesionales_activos()
+            intencion = interpretar_solicitud(mensaje, profesionales, date.today())
+            if intencion is None and sesion and sesion.get("fecha") and not sesion.get("cita_creada"):
+                profesional_sesion = next((p for p in profesionales if p['id'] == sesion.get("profesional_id")), None)
+                if profesional_sesion:
+                    intencion = interpretar_seguimiento(
+                        mensaje, profesionales, date.today(), profesional_sesion, date.fromisoformat(sesion["fecha"]),
+                        bool(sesion.get("intento_reserva"))
+                    )
+            if intencion is None:
+                return None
             
-            if json_match:
-                json_str = json_match.group()
-                # Limpiar el JSON string
-                json_str = json_str.replace('\\n', ' ').replace('\\t', ' ').replace('`', '').strip()
-                
-                # Buscar el JSON más interno si hay múltiples niveles
-                inner_json_match = re.search(r'\{[^{}]*\{.*\}[^{}]*\}|\{[^{}]*\}', json_str)
-                if inner_json_match:
-                    json_str = inner_json_match.group()
-                
-                datos = json.loads(json_str)
-                
-                print("\n\n2\nResultado crewAI:", datos)
+            profesional = intencion.profesional
+            fecha = intencion.fecha.isoformat()
+            if datetime.strptime(f"{fecha} {intencion.hora}", "%Y-%m-%d %H:%M") <= datetime.now():
+                return None
+            libres = obtener_servicio_disponibilidad().obtener_horarios_libres_dia(profesional['id'], intencion.fecha)
+            if intencion.hora not in {hora_inicio for hora_inicio, _ in libres['horarios']}:
+                return None
+            
+            emitir_evento("via_rapida", {"profesional_id": profesional['id'], "fecha": fecha, "hora": intencion.hora})
+            cita = crear_cita_medica(paciente_id, profesional['id'], fecha, intencion.hora)
+            if not cita['success']:
+                return None
+        except Exception as e:
+            logger.error(f"Error en la vía rápida del asistente: {e}")
+            return None
+        
+        nombre_doctor = f"{profesional['nombre']} {profesional['apellido']}"
+        return {
+            "nombre_doctor": nombre_doctor,
+            "fecha": fecha,
+            "hora": intencion.hora,
+            "profesional_id": profesional['id'],
+            "disponible": True,
+            "cita_creada": True,
+            "cita_id": cita['cita_id'],
+            "mensaje": f"Cita creada exitosamente con {nombre_doctor} para el {fecha} a las {intencion.hora}"
+        }
+    
+    def _crear_crew(self, agente: Agent, mensaje: str, paciente_id: int = None, sesion: Optional[Dict[str, Any]] = None) -> Crew:
+        """Crear la tarea y el crew de una solicitud sobre un agente ya construido"""
+        tarea = Task(
+            description=self._crear_descripcion_tarea(mensaje, paciente_id, sesion),
+            agent=agente,
+            expected_output=self.pool.plantilla.salida_esperada
+        )
+        
+        return Crew(
+            agents=[agente],
+            tasks=[tarea],
+            process=Process.sequential,
+            # El cache de herramientas de crewAI no se invalida al crear una cita; lo reemplaza MemoEjecucion
+            cache=False,
+            verbose=True
+        )
+    
+    def _crear_descripcion_tarea(self, mensaje: str, paciente_id: int = None, sesion: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Crear la descripción de la tarea para el agente con la plantilla configurada. Si la sesión ya
+        resolvió profesional y fecha, solo se envía ese contexto y el mensaje nuevo.
+        """
+        contexto = self._contexto_sesion(sesion) if sesion else None
+        if contexto:
+            return self.pool.plantilla.descripcion_seguimiento(mensaje, paciente_id, date.today(), contexto)
+        return self.pool.plantilla.descripcion_tarea(mensaje, paciente_id, date.today())
+    
+    def _parsear_respuesta_crewai(self, resultado: Union[CrewOutput, str]) -> Dict[str, Any]:
+        """
+        Parsear la respuesta de crewAI al formato requerido. Usa la salida estructurada de la tarea si
+        crewAI la generó y, si no, extrae del texto la última respuesta JSON válida en una sola pasada.
+        """
+        try:
+            # Tareas con output_pydantic: crewAI ya validó la salida (no se activa por defecto porque
+            # agrega el esquema al prompt de cada vuelta con el LLM)
+            if isinstance(getattr(resultado, "pydantic", None), AssistantResponse):
+                return resultado.pydantic.model_dump()
+            respuesta = getattr(resultado, "raw", None) or str(resultado)
+            
+            valida = extraer_respuesta(respuesta)
+            if valida:
+                return valida.model_dump()
+            
+            datos = extraer_respuesta_parcial(respuesta)
+            if datos:
                 return {
                     "nombre_doctor": datos.get("nombre_doctor", "No especificado"),
                     "fecha": datos.get("fecha", "No especificada"),
@@ -259,26 +504,10 @@ class ServicioAssistant:
                     "cita_id": datos.get("cita_id"),
                     "mensaje": datos.get("mensaje", "Solicitud procesada")
                 }
-            else:
-                # Si no encuentra JSON, usar valores por defecto
-                return {
-                    "nombre_doctor": "No identificado",
-                    "fecha": "No identificada",
-                    "hora": "No identificada",
-                    "profesional_id": 0,
-                    "disponible": False,
-                    "cita_creada": False,
-                    "cita_id": None,
-                    "mensaje": f"No pude procesar tu solicitud. Respuesta del sistema: {respuesta[:200]}..."
-                }
-                
-        except json.JSONDecodeError as e:
-            logger.error(f"Error decodificando JSON de crewAI: {e}")
-            # Intentar extraer información básica del texto
-            import re
+            
+            # Sin JSON: extraer lo básico del texto
             fecha_match = re.search(r'(\d{4}-\d{2}-\d{2})', respuesta)
             hora_match = re.search(r'(\d{1,2}:\d{2})', respuesta)
-            
             return {
                 "nombre_doctor": "No identificado",
                 "fecha": fecha_match.group(1) if fecha_match else "No identificada",
@@ -287,8 +516,9 @@ class ServicioAssistant:
                 "disponible": False,
                 "cita_creada": False,
                 "cita_id": None,
-                "mensaje": f"Respuesta del asistente: {respuesta[:200]}..."
+                "mensaje": f"No pude procesar tu solicitud. Respuesta del sistema: {respuesta[:200]}..."
             }
+                
         except Exception as e:
             logger.error(f"Error parseando respuesta de crewAI: {e}")
             return {
@@ -300,4 +530,4 @@ class ServicioAssistant:
                 "cita_creada": False,
                 "cita_id": None,
                 "mensaje": f"Error procesando la respuesta: {str(e)}"
-            }
\ No newline at end of file
+            }
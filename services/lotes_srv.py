@@ -0,0 +1,89 @@
+from typing import Dict, Any, AsyncIterator, List, Set
+from fastapi import HTTPException
+from ai.tools import profesionales_compartidos
+from services.iaasistente_srv import ServicioAssistant, ejecutor_assistant
+from schemas.iaasistente_sch import AssistantRequest, AssistantResponse, ResultadoLoteAssistant
+from repositories.pacientes_rep import RepositorioPacientesAsync
+from repositories.medicos_rep import RepositorioMedicosAsync
+from utils.ejecutor import EjecutorAcotado, ColaLlenaError
+from config import settings
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ServicioLotesAssistant:
+    """
+    Varias solicitudes al asistente en una sola llamada (call center). Los pacientes se validan con una
+    consulta y los profesionales activos se leen una vez para todo el lote. A lo sumo `max_paralelo`
+    solicitudes ocupan el pool del asistente a la vez, para no dejar sin hilos al resto de usuarios.
+    """
+
+    def __init__(self, repositorio_pacientes: RepositorioPacientesAsync, repositorio_profesionales: RepositorioMedicosAsync, ejecutor: EjecutorAcotado = ejecutor_assistant, max_paralelo: int = settings.ASSISTANT_BATCH_CONCURRENCY):
+        self.repositorio_pacientes = repositorio_pacientes
+        self.repositorio_profesionales = repositorio_profesionales
+        self.ejecutor = ejecutor
+        self.max_paralelo = max_paralelo
+
+    async def procesar(self, items: List[AssistantRequest]) -> AsyncIterator[str]:
+        """
+        Validar el lote y devolver el stream NDJSON con una línea (ResultadoLoteAssistant) por solicitud,
+        a medida que terminan. Los errores del lote completo se lanzan aquí, antes de empezar el stream.
+        """
+        if not items:
+            raise HTTPException(status_code=400, detail="El lote no tiene solicitudes")
+        if len(items) > settings.ASSISTANT_BATCH_MAX_ITEMS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"El lote admite hasta {settings.ASSISTANT_BATCH_MAX_ITEMS} solicitudes"
+            )
+
+        ids_pacientes = sorted({item.paciente_id for item in items})
+        try:
+            existentes = {p['id'] for p in await self.repositorio_pacientes.obtener_pacientes_por_ids(ids_pacientes)}
+        except Exception as e:
+            logger.error(f"Error validando los pacientes del lote del asistente: {e}")
+            raise HTTPException(status_code=503, detail="No se pudieron validar los pacientes, intenta de nuevo más tarde")
+        profesionales = await self.repositorio_profesionales.obtener_profesionales_activos()
+        return self._resultados(items, existentes, profesionales)
+
+    async def _resultados(self, items: List[AssistantRequest], existentes: Set[int], profesionales: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        semaforo = asyncio.Semaphore(self.max_paralelo)
+
+        async def procesar_item(indice: int, item: AssistantRequest) -> ResultadoLoteAssistant:
+            if item.paciente_id not in existentes:
+                return ResultadoLoteAssistant(indice=indice, paciente_id=item.paciente_id, error="Paciente no encontrado")
+            async with semaforo:
+                try:
+                    resultado = await self.ejecutor.ejecutar(self._ejecutar_item, item, profesionales)
+                except ColaLlenaError as e:
+                    return ResultadoLoteAssistant(
+                        indice=indice,
+                        paciente_id=item.paciente_id,
+                        error="El asistente está atendiendo demasiadas solicitudes, intenta de nuevo más tarde",
+                        reintentar_en=e.reintentar_en
+                    )
+                except Exception as e:
+                    logger.error(f"Error en la solicitud {indice} del lote del asistente: {e}")
+                    return ResultadoLoteAssistant(indice=indice, paciente_id=item.paciente_id, error=str(e))
+            return ResultadoLoteAssistant(indice=indice, paciente_id=item.paciente_id, resultado=AssistantResponse(**resultado))
+
+        tareas = [asyncio.ensure_future(procesar_item(indice, item)) for indice, item in enumerate(items)]
+        try:
+            for siguiente in asyncio.as_completed(tareas):
+                resultado = await siguiente
+                yield resultado.model_dump_json() + "\n"
+        finally:
+            # Si el cliente se desconecta, las solicitudes que no empezaron salen de la cola del pool
+            for tarea in tareas:
+                tarea.cancel()
+
+    def _ejecutar_item(self, item: AssistantRequest, profesionales: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # Las ContextVar no pasan del event loop a los hilos del pool: se fijan dentro del hilo
+        token = profesionales_compartidos.set(profesionales)
+        try:
+            # Sin sesion_id no se abre una sesión: un lote grande expulsaría las conversaciones interactivas
+            return ServicioAssistant().procesar_solicitud(item.mensaje, item.paciente_id, None, item.sesion_id, crear_sesion=False)
+        finally:
+            profesionales_compartidos.reset(token)
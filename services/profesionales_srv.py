@@ -0,0 +1,48 @@
+from typing import List, Dict, Any, Callable
+from fastapi import HTTPException
+from repositories.medicos_rep import RepositorioMedicosAsync, al_invalidar_profesionales
+from schemas.profesionales_sch import ProfesionalEncontrado, BusquedaProfesionalesResponse
+from utils.indice_profesionales import IndiceProfesionales
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Índice de nombres compartido por el endpoint de búsqueda y la herramienta del asistente
+indice_profesionales = IndiceProfesionales(ttl_segundos=settings.PROFESSIONAL_INDEX_TTL_SECONDS)
+al_invalidar_profesionales(indice_profesionales.invalidar)
+
+# Máximo de resultados por búsqueda
+LIMITE_BUSQUEDA_MAXIMO = 50
+
+def _a_encontrado(profesional: Dict[str, Any], puntaje: float) -> ProfesionalEncontrado:
+    return ProfesionalEncontrado(
+        id=profesional['id'],
+        nombre_completo=f"{profesional['nombre']} {profesional['apellido']}",
+        especialidad=profesional.get('especialidad'),
+        email=profesional.get('email'),
+        telefono=profesional.get('telefono'),
+        puntaje=puntaje
+    )
+
+def buscar_profesionales(nombre: str, limite: int, cargar: Callable[[], List[Dict[str, Any]]], indice: IndiceProfesionales = indice_profesionales) -> List[ProfesionalEncontrado]:
+    """Búsqueda síncrona (herramientas del asistente); `cargar` lee los profesionales activos si el índice venció"""
+    if indice.vencido():
+        indice.actualizar(cargar())
+    return [_a_encontrado(profesional, puntaje) for profesional, puntaje in indice.buscar(nombre, limite)]
+
+
+class ServicioProfesionalesAsync:
+    def __init__(self, repositorio: RepositorioMedicosAsync, indice: IndiceProfesionales = indice_profesionales):
+        self.repositorio = repositorio
+        self.indice = indice
+
+    async def buscar(self, nombre: str, limite: int = 10) -> BusquedaProfesionalesResponse:
+        """Profesionales activos cuyo nombre se parece a `nombre`, sin distinguir tildes y tolerando errores de tipeo"""
+        if not nombre or not nombre.strip():
+            raise HTTPException(status_code=400, detail="Debe indicar el nombre a buscar")
+
+        if self.indice.vencido():
+            self.indice.actualizar(await self.repositorio.obtener_profesionales_activos())
+        resultados = [_a_encontrado(profesional, puntaje) for profesional, puntaje in self.indice.buscar(nombre, limite)]
+        return BusquedaProfesionalesResponse(consulta=nombre, resultados=resultados, total=len(resultados))
@@ -0,0 +1,94 @@
+from typing import Dict, Any, AsyncIterator, Optional
+from fastapi import HTTPException
+from services.iaasistente_srv import ServicioAssistant, ejecutor_assistant
+from schemas.iaasistente_sch import TrabajoAssistant
+from utils.ejecutor import EjecutorAcotado
+from utils.trabajos import AlmacenTrabajos, AlmacenTrabajosMemoria, EN_EJECUCION, COMPLETADO, FALLIDO, ESTADOS_FINALES
+from config import settings
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Cada cuánto revisa el stream SSE si el trabajo tiene eventos nuevos
+INTERVALO_EVENTOS_SEGUNDOS = 0.5
+
+almacen_trabajos = AlmacenTrabajosMemoria(
+    max_entradas=settings.ASSISTANT_JOB_MAX_ENTRIES,
+    ttl_segundos=settings.ASSISTANT_JOB_TTL_SECONDS
+)
+
+# Referencias a las tareas que esperan el resultado de cada trabajo, para que no las recolecte el GC
+_tareas_activas = set()
+
+
+class ServicioTrabajosAssistant:
+    """Ejecución del asistente como trabajo en segundo plano, consultable por polling o SSE"""
+
+    def __init__(self, almacen: AlmacenTrabajos, ejecutor: EjecutorAcotado = ejecutor_assistant):
+        self.almacen = almacen
+        self.ejecutor = ejecutor
+
+    def enviar(self, mensaje: str, paciente_id: int, sesion_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Registrar el trabajo y encolarlo en el pool del asistente.
+        Propaga ColaLlenaError si el pool no admite más trabajos.
+        """
+        trabajo = self.almacen.crear({"paciente_id": paciente_id})
+        trabajo_id = trabajo["trabajo_id"]
+
+        def al_evento(tipo: str, datos: Dict[str, Any]):
+            self.almacen.agregar_evento(trabajo_id, tipo, datos)
+
+        def ejecutar() -> Dict[str, Any]:
+            self.almacen.actualizar(trabajo_id, estado=EN_EJECUCION)
+            al_evento("iniciado", {})
+            return ServicioAssistant().procesar_solicitud(mensaje, paciente_id, al_evento, sesion_id)
+
+        try:
+            futuro = self.ejecutor.enviar(ejecutar)
+        except Exception as e:
+            self.almacen.actualizar(trabajo_id, estado=FALLIDO, error=str(e))
+            raise
+
+        tarea = asyncio.ensure_future(self._registrar_resultado(trabajo_id, futuro))
+        _tareas_activas.add(tarea)
+        tarea.add_done_callback(_tareas_activas.discard)
+        return trabajo
+
+    async def _registrar_resultado(self, trabajo_id: str, futuro: "asyncio.Future"):
+        try:
+            resultado = await futuro
+        except Exception as e:
+            logger.error(f"Error en trabajo del asistente {trabajo_id}: {e}")
+            self.almacen.agregar_evento(trabajo_id, "error", {"error": str(e)})
+            self.almacen.actualizar(trabajo_id, estado=FALLIDO, error=str(e))
+            return
+        # El evento final va antes del cambio de estado para que el stream SSE lo entregue antes de cerrar
+        self.almacen.agregar_evento(trabajo_id, "resultado", resultado)
+        self.almacen.actualizar(trabajo_id, estado=COMPLETADO, resultado=resultado)
+
+    def obtener(self, trabajo_id: str) -> TrabajoAssistant:
+        trabajo = self.almacen.obtener(trabajo_id)
+        if not trabajo:
+            raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+        return TrabajoAssistant(**trabajo)
+
+    async def eventos_sse(self, trabajo_id: str, desde: int = 0) -> AsyncIterator[str]:
+        """
+        Eventos del trabajo en formato server-sent events a partir del índice `desde`.
+        El id de cada evento es su índice, así el cliente puede reanudar con Last-Event-ID.
+        """
+        indice = desde
+        while True:
+            trabajo = self.almacen.eventos_desde(trabajo_id, indice)
+            if trabajo is None:
+                return
+            for evento in trabajo["eventos"]:
+                datos = json.dumps(evento["datos"], ensure_ascii=False, default=str)
+                yield f"id: {indice}\nevent: {evento['tipo']}\ndata: {datos}\n\n"
+                indice += 1
+            if trabajo["estado"] in ESTADOS_FINALES:
+                return
+            await asyncio.sleep(INTERVALO_EVENTOS_SEGUNDOS)
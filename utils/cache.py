@@ -0,0 +1,254 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+from collections import OrderedDict
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_AUSENTE = object()
+
+
+class CacheLRU:
+    """
+    Cache en memoria del proceso con límite de entradas (se expulsa la menos usada)
+    y expiración por TTL. Es seguro para usarse desde varios hilos.
+    """
+
+    def __init__(self, max_entradas: int, ttl_segundos: float, reloj: Callable[[], float] = time.monotonic):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self._reloj = reloj
+        self._datos: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Cambia con cada invalidación; permite descartar datos leídos antes de una escritura
+        self._version = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self.invalidaciones = 0
+
+    def version(self) -> int:
+        return self._version
+
+    def obtener(self, clave: Hashable, defecto: Any = None) -> Any:
+        with self._lock:
+            entrada = self._datos.get(clave, _AUSENTE)
+            if entrada is _AUSENTE:
+                self.fallos += 1
+                return defecto
+            expira, valor = entrada
+            if expira <= self._reloj():
+                del self._datos[clave]
+                self.fallos += 1
+                return defecto
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def guardar(self, clave: Hashable, valor: Any, version: int = None) -> bool:
+        """
+        Guardar un valor. Si se indica `version` y hubo invalidaciones desde entonces,
+        el valor se descarta porque pudo leerse antes de la escritura que lo invalidó.
+        """
+        with self._lock:
+            if version is not None and version != self._version:
+                return False
+            self._datos[clave] = (self._reloj() + self.ttl_segundos, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+                self.expulsiones += 1
+            return True
+
+    def invalidar(self, clave: Hashable) -> bool:
+        with self._lock:
+            self._version += 1
+            if self._datos.pop(clave, _AUSENTE) is _AUSENTE:
+                return False
+            self.invalidaciones += 1
+            return True
+
+    def invalidar_si(self, predicado: Callable[[Hashable], bool]) -> int:
+        """Invalidar todas las claves que cumplan el predicado"""
+        with self._lock:
+            self._version += 1
+            claves = [clave for clave in self._datos if predicado(clave)]
+            for clave in claves:
+                del self._datos[clave]
+            self.invalidaciones += len(claves)
+            return len(claves)
+
+    def limpiar(self):
+        with self._lock:
+            self._version += 1
+            self._datos.clear()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._datos),
+                "max_entradas": self.max_entradas,
+                "ttl_segundos": self.ttl_segundos,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else 0.0,
+                "expulsiones": self.expulsiones,
+                "invalidaciones": self.invalidaciones
+            }
+
+
+class FuenteNoDisponibleError(Exception):
+    """Supabase (o la fuente de un CacheInstantanea) falló y no hay un valor bueno que servir"""
+
+
+class CacheInstantanea:
+    """
+    Último valor leído de una fuente lenta o poco confiable (stale-while-revalidate). Mientras está
+    fresco se sirve tal cual; vencido, se sirve igual y se relee en segundo plano (una lectura a la vez).
+    Tras `invalidar` la siguiente consulta relee antes de responder. Si la fuente falla se sigue
+    sirviendo el último valor bueno y no se reintenta antes de `reintento_segundos`. Sin ningún valor
+    todavía, quien llega durante la primera lectura la espera hasta `espera_segundos`.
+    """
+
+    def __init__(self, ttl_segundos: float, reintento_segundos: float, espera_segundos: float = 10, reloj: Callable[[], float] = time.monotonic):
+        self.ttl_segundos = ttl_segundos
+        self.reintento_segundos = reintento_segundos
+        self.espera_segundos = espera_segundos
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._valor: Any = _AUSENTE
+        self._vence = 0.0
+        self._invalidado = False
+        self._no_antes = 0.0
+        self._leyendo = False
+        # Se marca al terminar cada lectura; lo esperan las consultas que llegan sin ningún valor
+        self._lectura_terminada = threading.Event()
+        self._version = 0
+        # Referencias a los refrescos asíncronos en curso para que no los recolecte el GC
+        self._tareas: Set[asyncio.Task] = set()
+        self.aciertos = 0
+        self.vencidos = 0
+        self.lecturas = 0
+        self.fallos_fuente = 0
+        self.invalidaciones = 0
+
+    def obtener(self, cargar: Callable[[], Any]) -> Any:
+        """
+        Valor actual; `cargar` lee la fuente y lanza excepción si falla. Lanza FuenteNoDisponibleError
+        si la fuente nunca se pudo leer.
+        """
+        valor, version, en_segundo_plano = self._consultar()
+        if version is None:
+            if valor is None:
+                self._lectura_terminada.wait(self.espera_segundos)
+                return self._valor_o_error()
+            return valor
+        if en_segundo_plano:
+            threading.Thread(target=self._refrescar, args=(cargar, version), daemon=True).start()
+            return valor
+        return self._refrescar(cargar, version)
+
+    async def obtener_async(self, cargar: Callable[[], Awaitable[Any]]) -> Any:
+        """Igual que `obtener`, con una fuente asíncrona; el refresco en segundo plano es una tarea del event loop"""
+        valor, version, en_segundo_plano = self._consultar()
+        if version is None:
+            if valor is None:
+                # La lectura en curso puede ser de un hilo: se espera fuera del event loop
+                await asyncio.to_thread(self._lectura_terminada.wait, self.espera_segundos)
+                return self._valor_o_error()
+            return valor
+        if en_segundo_plano:
+            tarea = asyncio.get_running_loop().create_task(self._refrescar_async(cargar, version))
+            self._tareas.add(tarea)
+            tarea.add_done_callback(self._tareas.discard)
+            return valor
+        return await self._refrescar_async(cargar, version)
+
+    def invalidar(self):
+        """La próxima consulta relee la fuente; el valor anterior queda como respaldo si la fuente falla"""
+        with self._lock:
+            self._version += 1
+            self._invalidado = True
+            self._no_antes = 0.0
+            self.invalidaciones += 1
+
+    def _consultar(self):
+        """(valor, versión si a quien consulta le toca leer la fuente o None, si la lectura es en segundo plano)"""
+        with self._lock:
+            ahora = self._reloj()
+            valor = None if self._valor is _AUSENTE else self._valor
+            if valor is not None and not self._invalidado and self._vence > ahora:
+                self.aciertos += 1
+                return valor, None, False
+            if self._leyendo or self._no_antes > ahora:
+                # Otra lectura en curso o la fuente falló hace poco: se sirve lo que haya
+                self.vencidos += valor is not None
+                return valor, None, False
+            self._leyendo = True
+            self._lectura_terminada.clear()
+            self.lecturas += 1
+            en_segundo_plano = valor is not None and not self._invalidado
+            self.vencidos += en_segundo_plano
+            return valor, self._version, en_segundo_plano
+
+    def _refrescar(self, cargar: Callable[[], Any], version: int) -> Any:
+        try:
+            valor = cargar()
+        except Exception as e:
+            return self._fallar(e)
+        return self._completar(valor, version)
+
+    async def _refrescar_async(self, cargar: Callable[[], Awaitable[Any]], version: int) -> Any:
+        try:
+            valor = await cargar()
+        except Exception as e:
+            return self._fallar(e)
+        return self._completar(valor, version)
+
+    def _completar(self, valor: Any, version: int) -> Any:
+        with self._lock:
+            self._leyendo = False
+            self._lectura_terminada.set()
+            # Si hubo una invalidación durante la lectura, el valor puede ser anterior al cambio
+            if version == self._version:
+                self._valor = valor
+                self._vence = self._reloj() + self.ttl_segundos
+                self._invalidado = False
+                self._no_antes = 0.0
+            elif self._valor is _AUSENTE:
+                # Sin nada mejor que servir se guarda igual; sigue invalidado y la próxima consulta relee
+                self._valor = valor
+        return valor
+
+    def _fallar(self, error: Exception) -> Any:
+        logger.error(f"Error leyendo la fuente del cache: {error}")
+        with self._lock:
+            self._leyendo = False
+            self._lectura_terminada.set()
+            self.fallos_fuente += 1
+            self._no_antes = self._reloj() + self.reintento_segundos
+        return self._valor_o_error(error)
+
+    def _valor_o_error(self, error: Optional[Exception] = None) -> Any:
+        with self._lock:
+            if self._valor is _AUSENTE:
+                raise FuenteNoDisponibleError("La fuente no respondió y no hay un valor anterior") from error
+            return self._valor
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            ahora = self._reloj()
+            cargado = self._valor is not _AUSENTE
+            return {
+                "cargado": cargado,
+                "fresco": cargado and not self._invalidado and self._vence > ahora,
+                "ttl_segundos": self.ttl_segundos,
+                "aciertos": self.aciertos,
+                "vencidos": self.vencidos,
+                "lecturas": self.lecturas,
+                "fallos_fuente": self.fallos_fuente,
+                "invalidaciones": self.invalidaciones
+            }
@@ -0,0 +1,32 @@
+from typing import Any, Dict
+import threading
+
+CAMPOS_CONSUMO = ("prompt_tokens", "completion_tokens", "llamadas_llm")
+
+
+class RegistroConsumoLLM:
+    """
+    Acumula por versión de prompt los tokens y las vueltas con el LLM de cada solicitud del asistente,
+    para comparar plantillas con el mismo corpus de solicitudes. Es seguro entre hilos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_version: Dict[str, Dict[str, int]] = {}
+
+    def registrar(self, version: str, consumo: Dict[str, int]):
+        with self._lock:
+            totales = self._por_version.setdefault(version, {"solicitudes": 0, **{campo: 0 for campo in CAMPOS_CONSUMO}})
+            totales["solicitudes"] += 1
+            for campo in CAMPOS_CONSUMO:
+                totales[campo] += consumo.get(campo, 0)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                version: {
+                    **totales,
+                    **{f"promedio_{campo}": round(totales[campo] / totales["solicitudes"], 2) for campo in CAMPOS_CONSUMO}
+                }
+                for version, totales in self._por_version.items()
+            }
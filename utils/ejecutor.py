@@ -0,0 +1,117 @@
+from typing import Any, Callable, Dict
+from concurrent.futures import ThreadPoolExecutor, Future
+import asyncio
+import math
+import threading
+import time
+
+
+class ColaLlenaError(Exception):
+    """La cola del ejecutor está llena; `reintentar_en` es una estimación en segundos"""
+
+    def __init__(self, reintentar_en: int):
+        super().__init__(f"Cola llena, reintentar en {reintentar_en} segundos")
+        self.reintentar_en = reintentar_en
+
+
+class EjecutorAcotado:
+    """
+    Pool de hilos propio, con cantidad de hilos y tamaño de cola limitados, para trabajos
+    síncronos largos (crewAI) que no deben ocupar el event loop ni el threadpool de los routers.
+    Si ya hay `max_hilos + max_cola` trabajos pendientes, `enviar`/`ejecutar` rechazan con ColaLlenaError.
+    """
+
+    def __init__(self, max_hilos: int, max_cola: int, nombre: str = "ejecutor", reintentar_en_defecto: int = 10, reloj: Callable[[], float] = time.monotonic):
+        self.max_hilos = max_hilos
+        self.max_cola = max_cola
+        self.reintentar_en_defecto = reintentar_en_defecto
+        self._reloj = reloj
+        self._pool = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix=nombre)
+        self._lock = threading.Lock()
+        self.en_cola = 0
+        self.en_ejecucion = 0
+        self.completadas = 0
+        self.fallidas = 0
+        self.rechazadas = 0
+        self.canceladas = 0
+        self._espera_total = 0.0
+        self._espera_maxima = 0.0
+        self._duracion_total = 0.0
+
+    async def ejecutar(self, funcion: Callable[..., Any], *args, **kwargs) -> Any:
+        """Ejecutar `funcion` en el pool y esperar su resultado sin bloquear el event loop"""
+        return await self.enviar(funcion, *args, **kwargs)
+
+    def enviar(self, funcion: Callable[..., Any], *args, **kwargs) -> "asyncio.Future":
+        """
+        Encolar `funcion` y devolver un futuro de asyncio con su resultado.
+        El rechazo por cola llena ocurre aquí mismo, antes de devolver el futuro.
+        """
+        with self._lock:
+            if self.en_cola + self.en_ejecucion >= self.max_hilos + self.max_cola:
+                self.rechazadas += 1
+                raise ColaLlenaError(self._estimar_reintento())
+            self.en_cola += 1
+
+        encolada = self._reloj()
+
+        def trabajo():
+            inicio = self._reloj()
+            with self._lock:
+                self.en_cola -= 1
+                self.en_ejecucion += 1
+                espera = inicio - encolada
+                self._espera_total += espera
+                self._espera_maxima = max(self._espera_maxima, espera)
+            exito = False
+            try:
+                resultado = funcion(*args, **kwargs)
+                exito = True
+                return resultado
+            finally:
+                with self._lock:
+                    self.en_ejecucion -= 1
+                    self._duracion_total += self._reloj() - inicio
+                    if exito:
+                        self.completadas += 1
+                    else:
+                        self.fallidas += 1
+
+        futuro = self._pool.submit(trabajo)
+        futuro.add_done_callback(self._al_cancelar)
+        return asyncio.wrap_future(futuro)
+
+    def _al_cancelar(self, futuro: Future):
+        # Un trabajo cancelado antes de empezar (el cliente se desconectó) nunca descuenta su lugar en la cola
+        if futuro.cancelled():
+            with self._lock:
+                self.en_cola -= 1
+                self.canceladas += 1
+
+    def _estimar_reintento(self) -> int:
+        terminadas = self.completadas + self.fallidas
+        if not terminadas:
+            return self.reintentar_en_defecto
+        duracion_promedio = self._duracion_total / terminadas
+        return max(1, math.ceil(duracion_promedio * (self.en_cola + 1) / self.max_hilos))
+
+    def cerrar(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            iniciadas = self.en_ejecucion + self.completadas + self.fallidas
+            terminadas = self.completadas + self.fallidas
+            return {
+                "max_hilos": self.max_hilos,
+                "max_cola": self.max_cola,
+                "en_cola": self.en_cola,
+                "en_ejecucion": self.en_ejecucion,
+                "completadas": self.completadas,
+                "fallidas": self.fallidas,
+                "rechazadas": self.rechazadas,
+                "canceladas": self.canceladas,
+                "espera_promedio_segundos": round(self._espera_total / iniciadas, 4) if iniciadas else 0.0,
+                "espera_maxima_segundos": round(self._espera_maxima, 4),
+                "duracion_promedio_segundos": round(self._duracion_total / terminadas, 4) if terminadas else 0.0
+            }
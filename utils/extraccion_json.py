@@ -0,0 +1,45 @@
+from typing import Iterator
+import re
+
+# Una llave abre un objeto solo si la sigue una clave o un cierre: "{nombre}" en prosa no cuenta
+_APERTURA = re.compile(r'\{\s*["}]')
+# Dentro de un objeto: una cadena completa en una línea (con sus escapes), una llave o una comilla que no se cierra.
+# JSON no admite saltos de línea sin escapar en las cadenas, así que una cadena truncada termina en su línea.
+_SIMBOLO = re.compile(r'"[^"\\\n]*(?:\\.[^"\\\n]*)*"|[{}"]')
+
+
+def objetos_json(texto: str) -> Iterator[str]:
+    """
+    Fragmentos con llaves balanceadas de primer nivel del texto, en orden, recorriéndolo una sola vez.
+    Las comillas solo cuentan dentro de un objeto, así que la prosa que lo rodea no desordena el conteo.
+    Si un objeto no se cierra (una observación truncada, por ejemplo) se entregan los objetos completos
+    que había dentro y la búsqueda sigue después de la cadena sin cerrar, o termina si el texto se acabó;
+    ningún carácter se vuelve a recorrer.
+    """
+    posicion = 0
+    while True:
+        apertura = _APERTURA.search(texto, posicion)
+        if apertura is None:
+            return
+        abiertos = []
+        # Objetos ya cerrados dentro del de primer nivel, sin los que están contenidos en otro de la lista
+        cerrados = []
+        posicion = len(texto)
+        for simbolo in _SIMBOLO.finditer(texto, apertura.start()):
+            caracter = simbolo.group()
+            if caracter == '{':
+                abiertos.append(simbolo.start())
+            elif caracter == '}':
+                inicio = abiertos.pop()
+                if not abiertos:
+                    cerrados = [(inicio, simbolo.end())]
+                    posicion = simbolo.end()
+                    break
+                while cerrados and cerrados[-1][0] > inicio:
+                    cerrados.pop()
+                cerrados.append((inicio, simbolo.end()))
+            elif caracter == '"':
+                posicion = simbolo.end()
+                break
+        for inicio, fin in cerrados:
+            yield texto[inicio:fin]
@@ -0,0 +1,126 @@
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from collections import defaultdict
+import re
+import threading
+import time
+import unicodedata
+
+# Puntaje mínimo (0 a 1) para que un profesional aparezca en los resultados
+PUNTAJE_MINIMO = 0.5
+
+
+def plegar(texto: str) -> str:
+    """Minúsculas, sin tildes y solo letras y números separados por un espacio ("Pérez-Gómez" -> "perez gomez")"""
+    sin_tildes = "".join(
+        caracter for caracter in unicodedata.normalize("NFD", (texto or "").lower())
+        if unicodedata.category(caracter) != "Mn"
+    )
+    return " ".join(re.findall(r"[a-z0-9ñ]+", sin_tildes))
+
+
+def trigramas(token: str) -> Set[str]:
+    relleno = f"  {token} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+def _a_una_edicion(a: str, b: str) -> bool:
+    """True si `a` y `b` difieren en a lo sumo una letra cambiada, agregada, quitada o dos letras vecinas invertidas"""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    inicio = 0
+    while inicio < min(len(a), len(b)) and a[inicio] == b[inicio]:
+        inicio += 1
+    resto_a, resto_b = a[inicio:], b[inicio:]
+    if len(a) == len(b):
+        return (
+            resto_a[1:] == resto_b[1:]
+            or (len(resto_a) >= 2 and resto_a[0] == resto_b[1] and resto_a[1] == resto_b[0] and resto_a[2:] == resto_b[2:])
+        )
+    return resto_a[1:] == resto_b if len(a) > len(b) else resto_a == resto_b[1:]
+
+
+def similitud(consulta: str, token: str) -> float:
+    """Parecido entre una palabra buscada y una del nombre: exacta 1, prefijo 0.9, un error de tipeo 0.8, o trigramas"""
+    if consulta == token:
+        return 1.0
+    if len(consulta) >= 3 and token.startswith(consulta):
+        return 0.9
+    de_consulta, de_token = trigramas(consulta), trigramas(token)
+    dice = 2 * len(de_consulta & de_token) / (len(de_consulta) + len(de_token))
+    if len(consulta) >= 4 and _a_una_edicion(consulta, token):
+        return max(dice, 0.8)
+    return dice
+
+
+class IndiceProfesionales:
+    """
+    Índice en memoria de los nombres de los profesionales activos: tokens sin tildes y un índice
+    invertido de trigramas para encontrar candidatos sin recorrer toda la lista. Se reconstruye con
+    `actualizar` cuando vence su TTL o tras `invalidar`; quien lo usa decide de qué repositorio leer.
+    """
+
+    def __init__(self, ttl_segundos: float, reloj: Callable[[], float] = time.monotonic):
+        self.ttl_segundos = ttl_segundos
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._profesionales: List[Dict[str, Any]] = []
+        self._tokens: List[List[str]] = []
+        self._por_trigrama: Dict[str, Set[int]] = {}
+        self._vence: Optional[float] = None
+
+    def vencido(self) -> bool:
+        return self._vence is None or self._vence <= self._reloj()
+
+    def invalidar(self):
+        self._vence = None
+
+    def actualizar(self, profesionales: List[Dict[str, Any]]):
+        tokens = []
+        por_trigrama: Dict[str, Set[int]] = defaultdict(set)
+        for posicion, profesional in enumerate(profesionales):
+            palabras = plegar(f"{profesional.get('nombre') or ''} {profesional.get('apellido') or ''}").split()
+            tokens.append(palabras)
+            for palabra in palabras:
+                for trigrama in trigramas(palabra):
+                    por_trigrama[trigrama].add(posicion)
+        with self._lock:
+            self._profesionales = list(profesionales)
+            self._tokens = tokens
+            self._por_trigrama = dict(por_trigrama)
+            # Un listado vacío suele ser una lectura fallida: el índice sigue vencido y se relee en la próxima búsqueda
+            self._vence = self._reloj() + self.ttl_segundos if profesionales else None
+
+    def buscar(self, consulta: str, limite: int = 10, puntaje_minimo: float = PUNTAJE_MINIMO) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Profesionales cuyo nombre se parece a `consulta`, con su puntaje, del más parecido al menos.
+        Cada palabra buscada se compara con la palabra más parecida del nombre y se promedia.
+        """
+        palabras = plegar(consulta).split()
+        if not palabras:
+            return []
+        with self._lock:
+            profesionales, tokens, por_trigrama = self._profesionales, self._tokens, self._por_trigrama
+
+        candidatos: Set[int] = set()
+        for palabra in palabras:
+            for trigrama in trigramas(palabra):
+                candidatos |= por_trigrama.get(trigrama, set())
+
+        resultados = []
+        for posicion in candidatos:
+            if not tokens[posicion]:
+                continue
+            puntaje = sum(max(similitud(palabra, token) for token in tokens[posicion]) for palabra in palabras) / len(palabras)
+            if puntaje >= puntaje_minimo:
+                resultados.append((profesionales[posicion], round(puntaje, 3)))
+        resultados.sort(key=lambda resultado: (-resultado[1], plegar(f"{resultado[0].get('apellido')} {resultado[0].get('nombre')}")))
+        return resultados[:limite]
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "profesionales": len(self._profesionales),
+                "trigramas": len(self._por_trigrama),
+                "ttl_segundos": self.ttl_segundos,
+                "vencido": self.vencido()
+            }
@@ -0,0 +1,336 @@
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator
+from datetime import datetime, date, time, timedelta, timezone
+import json
+
+# Horario laboral por defecto: bloques de mañana y tarde, de lunes a viernes
+BLOQUES_LABORALES = ((time(8, 0), time(12, 0)), (time(14, 0), time(18, 0)))
+DIAS_LABORALES = (0, 1, 2, 3, 4)
+DURACION_HORARIO = 30
+
+MINUTOS_DIA = 24 * 60
+UN_MINUTO = timedelta(minutes=1)
+
+
+def formatear_minutos(minutos: int) -> str:
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+def contar_libres(mascara: int) -> int:
+    """Cantidad de horarios libres en una máscara"""
+    return mascara.bit_count()
+
+
+class GrillaHorarios:
+    """
+    Horarios de un día laboral. El bit i de una máscara corresponde al horario i de la grilla,
+    de modo que la ocupación de un día completo cabe en un entero.
+    """
+
+    def __init__(self, bloques: Iterable[Tuple[time, time]] = BLOQUES_LABORALES, duracion_minutos: int = DURACION_HORARIO):
+        self.duracion = duracion_minutos
+        # Bloques laborales en minutos desde la medianoche, ordenados
+        self.bloques: Tuple[Tuple[int, int], ...] = tuple(sorted(
+            (hora_inicio.hour * 60 + hora_inicio.minute, hora_fin.hour * 60 + hora_fin.minute)
+            for hora_inicio, hora_fin in bloques
+        ))
+        inicios = []
+        for actual, fin in self.bloques:
+            while actual + duracion_minutos <= fin:
+                inicios.append(actual)
+                actual += duracion_minutos
+        self.inicios: Tuple[int, ...] = tuple(inicios)
+        self.etiquetas: Tuple[Tuple[str, str], ...] = tuple(
+            (formatear_minutos(inicio), formatear_minutos(inicio + duracion_minutos)) for inicio in self.inicios
+        )
+        self.completa = (1 << len(self.inicios)) - 1
+        self._indices = {etiqueta[0]: indice for indice, etiqueta in enumerate(self.etiquetas)}
+
+    def __len__(self) -> int:
+        return len(self.inicios)
+
+    def indice(self, hora: str) -> Optional[int]:
+        """Posición del horario que empieza a la hora HH:MM, o None si no pertenece a la grilla"""
+        return self._indices.get(hora)
+
+    def mascara_ocupada(self, intervalos_dia: List[Tuple[int, int]]) -> int:
+        """
+        Máscara de horarios que se superponen con los intervalos del día.
+        Los intervalos (minuto_inicio, minuto_fin) deben estar ordenados y fusionados.
+        """
+        mascara = 0
+        cursor = 0
+        total = len(intervalos_dia)
+        for indice, inicio in enumerate(self.inicios):
+            # Descartar los intervalos que terminan antes de que empiece este horario
+            while cursor < total and intervalos_dia[cursor][1] <= inicio:
+                cursor += 1
+            if cursor == total:
+                break
+            if intervalos_dia[cursor][0] < inicio + self.duracion:
+                mascara |= 1 << indice
+        return mascara
+
+    def indices(self, mascara: int) -> Iterator[int]:
+        """Posiciones de los bits encendidos, en orden cronológico"""
+        while mascara:
+            bit = mascara & -mascara
+            yield bit.bit_length() - 1
+            mascara ^= bit
+
+    def horarios(self, mascara: int) -> Iterator[Tuple[str, str]]:
+        """Horarios (hora_inicio, hora_fin) cuyos bits están encendidos"""
+        for indice in self.indices(mascara):
+            yield self.etiquetas[indice]
+
+
+GRILLA_ESTANDAR = GrillaHorarios()
+
+NOMBRES_DIAS = {
+    "lunes": 0, "martes": 1, "miercoles": 2, "miércoles": 2, "jueves": 3,
+    "viernes": 4, "sabado": 5, "sábado": 5, "domingo": 6
+}
+
+# Máximo de grillas distintas compartidas; pasado el límite las nuevas se compilan sin guardarse
+MAX_GRILLAS_COMPILADAS = 256
+
+_grillas_compiladas: Dict[Tuple, GrillaHorarios] = {(BLOQUES_LABORALES, DURACION_HORARIO): GRILLA_ESTANDAR}
+
+
+def obtener_grilla(bloques: Tuple[Tuple[time, time], ...], duracion_minutos: int = DURACION_HORARIO) -> GrillaHorarios:
+    """Grilla compartida para unos bloques y duración; los profesionales con el mismo horario reutilizan la misma"""
+    clave = (bloques, duracion_minutos)
+    grilla = _grillas_compiladas.get(clave)
+    if grilla is None:
+        grilla = GrillaHorarios(bloques, duracion_minutos)
+        if len(_grillas_compiladas) < MAX_GRILLAS_COMPILADAS:
+            grilla = _grillas_compiladas.setdefault(clave, grilla)
+    return grilla
+
+
+class PlantillaSemanal:
+    """Grilla de horarios precompilada para cada día laboral de la semana (0=Lunes, 6=Domingo)"""
+
+    def __init__(self, grillas: Dict[int, GrillaHorarios]):
+        self._grillas = grillas
+
+    @property
+    def dias_laborales(self) -> List[int]:
+        return sorted(self._grillas)
+
+    def grilla(self, dia_semana: int) -> Optional[GrillaHorarios]:
+        return self._grillas.get(dia_semana)
+
+
+PLANTILLA_ESTANDAR = PlantillaSemanal({dia: GRILLA_ESTANDAR for dia in DIAS_LABORALES})
+
+
+def compilar_plantilla(horario_laboral: Optional[Any]) -> PlantillaSemanal:
+    """
+    Compilar el horario laboral de un profesional. Formato esperado (JSON o dict):
+        {"duracion_minutos": 30, "dias": {"lunes": [["08:00", "12:00"], ["14:00", "18:00"]], "5": [["08:00", "12:00"]]}}
+    Los días se indican por nombre o por número (0=Lunes). Sin horario se usa la plantilla estándar.
+    Lanza ValueError si el formato no es válido o si los bloques de un día están vacíos o se superponen.
+    """
+    if not horario_laboral:
+        return PLANTILLA_ESTANDAR
+    if isinstance(horario_laboral, str):
+        horario_laboral = json.loads(horario_laboral)
+    if not isinstance(horario_laboral, dict):
+        raise ValueError("El horario laboral debe ser un objeto JSON")
+
+    duracion = int(horario_laboral.get("duracion_minutos", DURACION_HORARIO))
+    if duracion <= 0:
+        raise ValueError("La duración de los horarios debe ser positiva")
+
+    grillas = {}
+    for clave, bloques in (horario_laboral.get("dias") or {}).items():
+        clave = str(clave).strip().lower()
+        dia = int(clave) if clave.isdigit() else NOMBRES_DIAS.get(clave)
+        if dia is None or not 0 <= dia <= 6:
+            raise ValueError(f"Día de la semana no reconocido: {clave}")
+        bloques_dia = tuple(sorted((time.fromisoformat(inicio), time.fromisoformat(fin)) for inicio, fin in bloques))
+        for posicion, (inicio, fin) in enumerate(bloques_dia):
+            if inicio >= fin:
+                raise ValueError(f"Bloque vacío o invertido el día {clave}: {inicio}-{fin}")
+            if posicion and inicio < bloques_dia[posicion - 1][1]:
+                raise ValueError(f"Bloques superpuestos el día {clave}: {bloques_dia[posicion - 1][0]}-{bloques_dia[posicion - 1][1]} y {inicio}-{fin}")
+        grilla = obtener_grilla(bloques_dia, duracion)
+        if len(grilla):
+            grillas[dia] = grilla
+    return PlantillaSemanal(grillas)
+
+
+def intervalos_libres(bloques: Iterable[Tuple[int, int]], ocupados: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    Restar los intervalos ocupados (ordenados y fusionados) de los bloques laborales (ordenados).
+    Devuelve los intervalos libres en minutos desde la medianoche.
+    """
+    libres = []
+    cursor = 0
+    total = len(ocupados)
+    for inicio, fin in bloques:
+        actual = inicio
+        # Descartar los ocupados que terminan antes del bloque
+        while cursor < total and ocupados[cursor][1] <= actual:
+            cursor += 1
+        indice = cursor
+        while indice < total and ocupados[indice][0] < fin:
+            ocupado_inicio, ocupado_fin = ocupados[indice]
+            if ocupado_inicio > actual:
+                libres.append((actual, ocupado_inicio))
+            actual = max(actual, ocupado_fin)
+            if actual >= fin:
+                break
+            indice += 1
+        if actual < fin:
+            libres.append((actual, fin))
+    return libres
+
+
+def inicios_bloque(libres: List[Tuple[int, int]], duracion_minutos: int, inicio_grilla: int, paso_minutos: int) -> Iterator[int]:
+    """
+    Minutos de inicio donde cabe un bloque continuo de `duracion_minutos` dentro de los intervalos libres.
+    Se prueba el inicio de cada intervalo y luego los minutos alineados a la grilla (inicio_grilla + k*paso).
+    """
+    for inicio, fin in libres:
+        ultimo = fin - duracion_minutos
+        if ultimo < inicio:
+            continue
+        yield inicio
+        desfase = (inicio - inicio_grilla) % paso_minutos
+        siguiente = inicio + (paso_minutos - desfase if desfase else paso_minutos)
+        while siguiente <= ultimo:
+            yield siguiente
+            siguiente += paso_minutos
+
+
+def agrupar_intervalos_por_dia(citas: List[Dict[str, Any]]) -> Dict[date, List[Tuple[int, int]]]:
+    """
+    Convertir las citas en intervalos de minutos (UTC) agrupados por día, ordenados y fusionados.
+    Las citas que cruzan la medianoche se reparten entre los días que ocupan.
+    """
+    por_dia: Dict[date, List[Tuple[int, int]]] = {}
+    for cita in citas:
+        inicio = datetime.fromisoformat(cita['fecha_cita'].replace('Z', '+00:00'))
+        if inicio.tzinfo is None:
+            inicio = inicio.replace(tzinfo=timezone.utc)
+        inicio = inicio.astimezone(timezone.utc)
+        fin = inicio + timedelta(minutes=cita.get('duracion_minutos', 30))
+
+        while inicio < fin:
+            dia = inicio.date()
+            medianoche = datetime.combine(dia, time.min, tzinfo=timezone.utc)
+            siguiente_dia = medianoche + timedelta(days=1)
+            # El inicio se redondea hacia abajo y el fin hacia arriba para no perder solapamientos
+            minuto_inicio = (inicio - medianoche) // UN_MINUTO
+            minuto_fin = -((medianoche - fin) // UN_MINUTO) if fin <= siguiente_dia else MINUTOS_DIA
+            por_dia.setdefault(dia, []).append((minuto_inicio, minuto_fin))
+            inicio = siguiente_dia
+
+    for dia, intervalos in por_dia.items():
+        intervalos.sort()
+        fusionados = []
+        for inicio, fin in intervalos:
+            if fusionados and inicio <= fusionados[-1][1]:
+                if fin > fusionados[-1][1]:
+                    fusionados[-1] = (fusionados[-1][0], fin)
+            else:
+                fusionados.append((inicio, fin))
+        por_dia[dia] = fusionados
+
+    return por_dia
+
+
+class MapaOcupacion:
+    """
+    Horarios libres por profesional y día como máscaras de bits sobre la grilla de ese día.
+    Las consultas se resuelven con AND/OR/popcount sobre enteros; los días no laborales no tienen máscara.
+    """
+
+    def __init__(self, plantillas: Dict[int, PlantillaSemanal], libres: Dict[int, Dict[date, int]]):
+        self._plantillas = plantillas
+        self._libres = libres
+
+    @classmethod
+    def construir(
+        cls,
+        citas_por_profesional: Dict[int, List[Dict[str, Any]]],
+        fecha_inicio: date,
+        fecha_fin: date,
+        plantillas: Optional[Dict[int, PlantillaSemanal]] = None
+    ) -> "MapaOcupacion":
+        intervalos_por_profesional = {
+            profesional_id: agrupar_intervalos_por_dia(citas)
+            for profesional_id, citas in citas_por_profesional.items()
+        }
+        return cls.construir_desde_intervalos(intervalos_por_profesional, fecha_inicio, fecha_fin, plantillas)
+
+    @classmethod
+    def construir_desde_intervalos(
+        cls,
+        intervalos_por_profesional: Dict[int, Dict[date, List[Tuple[int, int]]]],
+        fecha_inicio: date,
+        fecha_fin: date,
+        plantillas: Optional[Dict[int, PlantillaSemanal]] = None
+    ) -> "MapaOcupacion":
+        """
+        Construir el mapa a partir de intervalos ya agrupados por día (ver agrupar_intervalos_por_dia).
+        Los profesionales sin plantilla usan PLANTILLA_ESTANDAR.
+        """
+        plantillas = {
+            profesional_id: (plantillas or {}).get(profesional_id, PLANTILLA_ESTANDAR)
+            for profesional_id in intervalos_por_profesional
+        }
+        dias = [fecha_inicio + timedelta(days=n) for n in range((fecha_fin - fecha_inicio).days + 1)]
+
+        libres = {}
+        for profesional_id, intervalos in intervalos_por_profesional.items():
+            plantilla = plantillas[profesional_id]
+            libres_profesional = {}
+            for dia in dias:
+                grilla = plantilla.grilla(dia.weekday())
+                if grilla is not None:
+                    libres_profesional[dia] = grilla.completa & ~grilla.mascara_ocupada(intervalos.get(dia, []))
+            libres[profesional_id] = libres_profesional
+        return cls(plantillas, libres)
+
+    def profesionales(self) -> List[int]:
+        return list(self._libres)
+
+    def grilla(self, profesional_id: int, fecha: date) -> Optional[GrillaHorarios]:
+        """Grilla del profesional para esa fecha (None si no trabaja ese día de la semana)"""
+        return self._plantillas.get(profesional_id, PLANTILLA_ESTANDAR).grilla(fecha.weekday())
+
+    def libres(self, profesional_id: int, fecha: date) -> int:
+        """Máscara de horarios libres (0 si el día no es laboral o está fuera del rango)"""
+        return self._libres.get(profesional_id, {}).get(fecha, 0)
+
+    def dias(self, profesional_id: int) -> List[Tuple[date, int]]:
+        """Pares (fecha, máscara de libres) del profesional en orden cronológico"""
+        return sorted(self._libres.get(profesional_id, {}).items())
+
+    def horarios(self, profesional_id: int, fecha: date) -> List[Tuple[str, str]]:
+        """Horarios libres (hora_inicio, hora_fin) del profesional en la fecha"""
+        grilla = self.grilla(profesional_id, fecha)
+        return list(grilla.horarios(self.libres(profesional_id, fecha))) if grilla else []
+
+    def esta_libre(self, profesional_id: int, fecha: date, hora: str) -> bool:
+        """Si el horario que empieza a la hora HH:MM existe en la grilla del profesional y está libre"""
+        grilla = self.grilla(profesional_id, fecha)
+        indice = grilla.indice(hora) if grilla else None
+        return indice is not None and bool(self.libres(profesional_id, fecha) >> indice & 1)
+
+    def profesionales_libres(self, fecha: date, hora: str, profesional_ids: Optional[Iterable[int]] = None) -> List[int]:
+        """Profesionales con el horario de la hora HH:MM libre en la fecha"""
+        candidatos = self._libres if profesional_ids is None else profesional_ids
+        return [pid for pid in candidatos if self.esta_libre(pid, fecha, hora)]
+
+    def total_libres(self, profesional_id: int) -> int:
+        return sum(contar_libres(mascara) for mascara in self._libres.get(profesional_id, {}).values())
+
+    def primer_dia_con_libres(self, profesional_id: int, minimo: int = 1) -> Optional[date]:
+        """Primer día del rango con al menos `minimo` horarios libres"""
+        for fecha, mascara in self.dias(profesional_id):
+            if contar_libres(mascara) >= minimo:
+                return fecha
+        return None
@@ -0,0 +1,90 @@
+from typing import Any, Callable, Dict, Optional
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timezone
+import copy
+import threading
+import time
+import uuid
+
+
+class AlmacenSesiones(ABC):
+    """
+    Interfaz del almacenamiento de sesiones del asistente. Una sesión es un diccionario con sesion_id,
+    paciente_id, creada, actualizada y lo que el asistente resolvió en los turnos anteriores.
+    Para compartir sesiones entre instancias basta otra implementación (Redis, Supabase...).
+    """
+
+    @abstractmethod
+    def crear(self, datos: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def obtener(self, sesion_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def guardar(self, sesion: Dict[str, Any]) -> bool:
+        ...
+
+
+class AlmacenSesionesMemoria(AlmacenSesiones):
+    """
+    Almacén en memoria del proceso. Cada sesión vence `ttl_segundos` después de su último uso y,
+    si se supera `max_entradas`, se expulsan primero las usadas hace más tiempo. Es seguro entre hilos.
+    """
+
+    def __init__(self, max_entradas: int, ttl_segundos: float, reloj: Callable[[], float] = time.monotonic):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self._reloj = reloj
+        self._sesiones: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.expulsiones = 0
+
+    def crear(self, datos: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        ahora = datetime.now(timezone.utc)
+        sesion = {
+            "sesion_id": uuid.uuid4().hex,
+            "creada": ahora,
+            "actualizada": ahora,
+            **(datos or {})
+        }
+        with self._lock:
+            self._insertar(sesion)
+            return copy.deepcopy(sesion)
+
+    def obtener(self, sesion_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entrada = self._sesiones.get(sesion_id)
+            if entrada is None:
+                return None
+            vence, sesion = entrada
+            if vence <= self._reloj():
+                del self._sesiones[sesion_id]
+                return None
+            self._sesiones[sesion_id] = (self._reloj() + self.ttl_segundos, sesion)
+            self._sesiones.move_to_end(sesion_id)
+            return copy.deepcopy(sesion)
+
+    def guardar(self, sesion: Dict[str, Any]) -> bool:
+        sesion = {**copy.deepcopy(sesion), "actualizada": datetime.now(timezone.utc)}
+        with self._lock:
+            self._insertar(sesion)
+            return True
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sesiones": len(self._sesiones),
+                "max_entradas": self.max_entradas,
+                "ttl_segundos": self.ttl_segundos,
+                "expulsiones": self.expulsiones
+            }
+
+    def _insertar(self, sesion: Dict[str, Any]):
+        self._sesiones[sesion["sesion_id"]] = (self._reloj() + self.ttl_segundos, sesion)
+        self._sesiones.move_to_end(sesion["sesion_id"])
+        while len(self._sesiones) > self.max_entradas:
+            self._sesiones.popitem(last=False)
+            self.expulsiones += 1
@@ -0,0 +1,131 @@
+from typing import Any, Callable, Dict, Optional
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timezone
+import copy
+import threading
+import time
+import uuid
+
+# Estados de un trabajo
+PENDIENTE = "pendiente"
+EN_EJECUCION = "en_ejecucion"
+COMPLETADO = "completado"
+FALLIDO = "fallido"
+ESTADOS_FINALES = (COMPLETADO, FALLIDO)
+
+
+class AlmacenTrabajos(ABC):
+    """
+    Interfaz del almacenamiento de trabajos en segundo plano. Un trabajo es un diccionario con
+    trabajo_id, estado, creado, actualizado, resultado, error y la lista de eventos emitidos.
+    Para compartir trabajos entre instancias basta otra implementación (Redis, Supabase...).
+    """
+
+    @abstractmethod
+    def crear(self, datos: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def obtener(self, trabajo_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def actualizar(self, trabajo_id: str, **cambios) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def agregar_evento(self, trabajo_id: str, tipo: str, datos: Optional[Dict[str, Any]] = None) -> bool:
+        ...
+
+    @abstractmethod
+    def eventos_desde(self, trabajo_id: str, desde: int) -> Optional[Dict[str, Any]]:
+        """Estado del trabajo y sus eventos a partir del índice `desde`, sin copiar el trabajo completo"""
+        ...
+
+
+class AlmacenTrabajosMemoria(AlmacenTrabajos):
+    """
+    Almacén en memoria del proceso. Los trabajos terminados se eliminan al vencer su TTL y,
+    si se supera `max_entradas`, se expulsan primero los terminados más antiguos. Los trabajos
+    pendientes o en ejecución nunca se expulsan. Es seguro entre hilos.
+    """
+
+    def __init__(self, max_entradas: int, ttl_segundos: float, reloj: Callable[[], float] = time.monotonic):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self._reloj = reloj
+        self._trabajos: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._vencimientos: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def crear(self, datos: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        ahora = datetime.now(timezone.utc)
+        trabajo = {
+            "trabajo_id": uuid.uuid4().hex,
+            "estado": PENDIENTE,
+            "creado": ahora,
+            "actualizado": ahora,
+            "resultado": None,
+            "error": None,
+            "eventos": [],
+            **(datos or {})
+        }
+        with self._lock:
+            self._purgar()
+            self._trabajos[trabajo["trabajo_id"]] = trabajo
+            self._expulsar_terminados()
+            return copy.deepcopy(trabajo)
+
+    def obtener(self, trabajo_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._purgar()
+            trabajo = self._trabajos.get(trabajo_id)
+            return copy.deepcopy(trabajo) if trabajo else None
+
+    def actualizar(self, trabajo_id: str, **cambios) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            trabajo = self._trabajos.get(trabajo_id)
+            if trabajo is None:
+                return None
+            trabajo.update(cambios)
+            trabajo["actualizado"] = datetime.now(timezone.utc)
+            if trabajo["estado"] in ESTADOS_FINALES:
+                self._vencimientos[trabajo_id] = self._reloj() + self.ttl_segundos
+            return copy.deepcopy(trabajo)
+
+    def agregar_evento(self, trabajo_id: str, tipo: str, datos: Optional[Dict[str, Any]] = None) -> bool:
+        with self._lock:
+            trabajo = self._trabajos.get(trabajo_id)
+            if trabajo is None:
+                return False
+            trabajo["eventos"].append({
+                "tipo": tipo,
+                "datos": datos or {},
+                "momento": datetime.now(timezone.utc)
+            })
+            return True
+
+    def eventos_desde(self, trabajo_id: str, desde: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._purgar()
+            trabajo = self._trabajos.get(trabajo_id)
+            if trabajo is None:
+                return None
+            return {"estado": trabajo["estado"], "eventos": copy.deepcopy(trabajo["eventos"][desde:])}
+
+    def _expulsar_terminados(self):
+        sobrantes = len(self._trabajos) - self.max_entradas
+        if sobrantes <= 0:
+            return
+        terminados = [trabajo_id for trabajo_id, trabajo in self._trabajos.items() if trabajo["estado"] in ESTADOS_FINALES]
+        for trabajo_id in terminados[:sobrantes]:
+            del self._trabajos[trabajo_id]
+            self._vencimientos.pop(trabajo_id, None)
+
+    def _purgar(self):
+        ahora = self._reloj()
+        vencidos = [trabajo_id for trabajo_id, vence in self._vencimientos.items() if vence <= ahora]
+        for trabajo_id in vencidos:
+            del self._vencimientos[trabajo_id]
+            self._trabajos.pop(trabajo_id, None)